@@ -1,13 +1,17 @@
 import streamlit as st
-import importlib.util
+import crew_ai_app  # Regular import, cached in sys.modules across reruns
+from conversation_memory import MemoryConfig
+from job_queue import get_job_queue
+from llm_gateway import ROLES, GatewayConfig, get_gateway
+from retrieval import RetrievalConfig
+from router import RouterConfig
+from telemetry import get_telemetry
 
 # Initialize session state variables
 if "selected_model" not in st.session_state:
     st.session_state.selected_model = ""  # Initialize selected model in session state
 if "api_key" not in st.session_state:
     st.session_state.api_key = ""  # Initialize Groq API key in session state
-if "messages" not in st.session_state:
-    st.session_state.messages = []  # Store chat history
 if "qdrant_key" not in st.session_state:
     st.session_state.qdrant_key = ""  # Initialize Qdrant API key in session state
 if "qdrant_url" not in st.session_state:
@@ -64,6 +68,78 @@ with col2:
             placeholder="Your Groq API Key here"  # Placeholder for guidance
         )
 
+# How the agent tasks are executed; parallel runs independent tasks at the same time
+execution_mode = st.sidebar.radio(
+    "Crew execution:",
+    ["parallel", "sequential"],
+    help="Parallel runs independent agent tasks concurrently and shows a latency breakdown per stage."
+)
+
+# Fast path: simple questions get one direct LLM call instead of the full agent crew
+with st.sidebar.expander("Fast path router"):
+    router_config = RouterConfig(
+        enabled=st.toggle("Answer simple questions directly", value=True, help="With documents or web search on, only greetings skip the crew."),
+        max_words=st.slider("Max words for a simple question", 3, 40, 12),
+    )
+    if "router_stats" in st.session_state:
+        st.table(st.session_state.router_stats.summary())
+
+# Semantic cache: reuse answers to questions that mean the same as an earlier one; the shared
+# cache's store, threshold, TTL and size are set by the operator through BRAMBOT_CACHE_* variables
+with st.sidebar.expander("Semantic cache"):
+    use_cache = st.toggle("Reuse answers to similar questions", value=True)
+
+# Document retrieval: dense search fused with BM25, optionally re-ranked by a cross-encoder
+with st.sidebar.expander("Document retrieval"):
+    retrieval_config = RetrievalConfig(
+        top_k=st.slider("Chunks per question", 1, 10, 5),
+        use_sparse=st.toggle("Hybrid keyword + vector search", value=True),
+        rerank=st.toggle("Re-rank with a cross-encoder", value=False, help="More precise, adds model inference per question."),
+        budget_ms=st.number_input("Latency budget (ms)", 100, 5000, 800, step=100),
+    )
+
+# LLM gateway: a model per agent role, with rate limiting, retries and fallback to other models
+with st.sidebar.expander("Models per agent"):
+    same_model = "Selected model"
+    role_models = {}
+    for role in ROLES:
+        choice = st.selectbox(role.replace("_", " "), [same_model] + list(MODEL_PROVIDERS), key=f"role_model_{role}")
+        if choice != same_model:
+            role_models[role] = choice
+    # Only this session's agents use these settings; the gateway shares rate limits and stats
+    gateway_config = GatewayConfig(
+        role_models=role_models,
+        fallbacks=st.multiselect("Fallback models", list(MODEL_PROVIDERS), help="Tried in order when a model is rate limited or failing."),
+        max_retries=st.slider("Retries per model", 0, 6, 3),
+    )
+    gateway = get_gateway(MODEL_PROVIDERS)
+    if gateway.stats:
+        st.table(gateway.summary())
+
+# Conversation memory: recent messages verbatim, older ones summarized in the background
+with st.sidebar.expander("Conversation memory"):
+    memory_config = MemoryConfig(
+        max_history_tokens=st.slider("Recent history budget (tokens)", 200, 6000, 1500, 100),
+        render_last=st.slider("Messages shown", 5, 100, 20, 5),
+        persist=st.toggle("Keep chats across restarts", value=False, help="Stores this session locally; the URL's session parameter reopens it."),
+    )
+
+# Background jobs: questions are answered on shared worker threads, taken round-robin per user;
+# the server's capacity is set with BRAMBOT_JOB_WORKERS and BRAMBOT_JOBS_PER_USER
+with st.sidebar.expander("Background jobs"):
+    st.table(get_job_queue().summary())
+
+# Telemetry: spans for every pipeline stage, as an in-app panel; the trace log and Prometheus
+# endpoint are set by the operator through BRAMBOT_TRACE_LOG and BRAMBOT_METRICS_PORT
+with st.sidebar.expander("Telemetry"):
+    show_panel = st.toggle("Show latency panel", value=False)
+    telemetry = get_telemetry()
+    if telemetry.metrics_error:
+        st.warning(telemetry.metrics_error)
+    if show_panel:
+        st.table(telemetry.span_summary())
+        st.table(telemetry.counter_summary())
+
 #Place Checkbox here
 colcheckbox1, colcheckbox2 = st.columns([3,3])
 with colcheckbox1:
@@ -97,71 +173,41 @@ if use_internet:
 
 # Reset the API key and chat history if a new model is selected
 if st.session_state.selected_model != selected_model:
-    st.session_state.messages = []  # Reset chat history
+    if "memory" in st.session_state:
+        st.session_state.memory.clear()  # Reset chat history
 
 st.session_state.selected_model = selected_model  # Update the selected model in session state
 
-# Validate Input
-if use_docs:
-    if st.session_state.api_key and st.session_state.qdrant_key and st.session_state.qdrant_url:
-        st.success(f"API Key provided! Selected model: {st.session_state.selected_model}")
-        spec = importlib.util.spec_from_file_location("crew_ai_app", "crew_ai_app.py")
-        crew_ai_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(crew_ai_module)
-
-        # Call the Crew AI function with selected model and API key
-        if hasattr(crew_ai_module, "run_crew_ai_app"):
-            selected_model_config = MODEL_PROVIDERS[st.session_state.selected_model]
-            crew_ai_module.run_crew_ai_app(
-                api_key= st.session_state.api_key,
-                qdrant_key= st.session_state.qdrant_key,
-                qdrant_url= st.session_state.qdrant_url,
-                model_config= selected_model_config,
-                use_docs = use_docs,
-                use_internet = use_internet,
-                exa_api_key=st.session_state.exa_api_key
-            )
-    else:
-        st.warning("Please enter your API key to proceed.")
-if use_internet:
-    if st.session_state.exa_api_key:
-        st.success(f"API Key provided! Selected model: {st.session_state.selected_model}")
-        spec = importlib.util.spec_from_file_location("crew_ai_app", "crew_ai_app.py")
-        crew_ai_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(crew_ai_module)
-
-        # Call the Crew AI function with selected model and API key
-        if hasattr(crew_ai_module, "run_crew_ai_app"):
-            selected_model_config = MODEL_PROVIDERS[st.session_state.selected_model]
-            crew_ai_module.run_crew_ai_app(
-                api_key= st.session_state.api_key,
-                qdrant_key= st.session_state.qdrant_key,
-                qdrant_url= st.session_state.qdrant_url,
-                model_config= selected_model_config,
-                use_docs = use_docs,
-                use_internet = use_internet,
-                exa_api_key=st.session_state.exa_api_key
-            )
-    else:
-        st.warning("Please enter your API key to proceed.")
+# Validate Input: every enabled feature needs its keys, then the crew is dispatched exactly once
+missing_keys = []
+if not st.session_state.api_key:
+    missing_keys.append("Groq API key")
+if use_docs and not (st.session_state.qdrant_key and st.session_state.qdrant_url):
+    missing_keys.append("Qdrant URL and API key")
+if use_internet and not st.session_state.exa_api_key:
+    missing_keys.append("EXA key")
+
+if missing_keys:
+    st.warning(f"Please enter your {', '.join(missing_keys)} to proceed.")
 else:
-    if st.session_state.api_key:
-        st.success(f"API Key provided! Selected model: {st.session_state.selected_model}")
-        spec = importlib.util.spec_from_file_location("crew_ai_app", "crew_ai_app.py")
-        crew_ai_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(crew_ai_module)
-
-        # Call the Crew AI function with selected model and API key
-        if hasattr(crew_ai_module, "run_crew_ai_app"):
-            selected_model_config = MODEL_PROVIDERS[st.session_state.selected_model]
-            crew_ai_module.run_crew_ai_app(
-                api_key= st.session_state.api_key,
-                qdrant_key= st.session_state.qdrant_key,
-                qdrant_url= st.session_state.qdrant_url,
-                model_config= selected_model_config,
-                use_docs = use_docs,
-                use_internet = use_internet,
-                exa_api_key=st.session_state.exa_api_key
-            )
-    else:
-        st.warning("Please enter your API key to proceed.")
\ No newline at end of file
+    st.success(f"API Key provided! Selected model: {st.session_state.selected_model}")
+
+    # Call the Crew AI function with selected model and API key
+    selected_model_config = MODEL_PROVIDERS[st.session_state.selected_model]
+    crew_ai_app.run_crew_ai_app(
+        api_key= st.session_state.api_key,
+        qdrant_key= st.session_state.qdrant_key,
+        qdrant_url= st.session_state.qdrant_url,
+        model_config= selected_model_config,
+        use_docs = use_docs,
+        use_internet = use_internet,
+        exa_api_key=st.session_state.exa_api_key,
+        execution_mode=execution_mode,
+        router_config=router_config,
+        use_cache=use_cache,
+        retrieval_config=retrieval_config,
+        memory_config=memory_config,
+        gateway=gateway,
+        gateway_config=gateway_config,
+        show_trace=show_panel
+    )
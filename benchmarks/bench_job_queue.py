@@ -0,0 +1,94 @@
+"""
+Load test for the background job queue: throughput and latency with N simultaneous users.
+
+Every simulated user submits questions one after another, like a chat session, through
+job_queue.JobQueue. A job stands in for one crew run: a fixed amount of LLM waiting
+(sleep) plus a little CPU work. One "heavy" user can be added who queues several questions
+at once, to show that round-robin scheduling keeps the other users' latency down.
+
+Run from the repository root:
+    python benchmarks/bench_job_queue.py --users 20 --questions 3 --workers 1 4 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from job_queue import JobQueue, JobQueueConfig
+
+
+def fake_answer(job, llm_seconds, steps):
+    """A crew run: several LLM calls with a cancellation checkpoint between them."""
+    for step in range(steps):
+        job.check_cancelled()
+        job.update(label=f"step {step + 1}")
+        time.sleep(llm_seconds / steps)
+        job.write("token " * 5)
+    return job.text
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_load(workers, users, questions, llm_seconds, heavy_questions):
+    queue = JobQueue(JobQueueConfig(max_workers=workers, max_pending_per_user=max(heavy_questions, 1)))
+    latencies = {"light": [], "heavy": []}
+    lock = threading.Lock()
+
+    def light_user(index):
+        for _ in range(questions):
+            job = queue.submit(f"user-{index}", fake_answer, llm_seconds, 3)
+            job.wait()
+            with lock:
+                latencies["light"].append(job.finished - job.submitted)
+
+    def heavy_user():
+        jobs = [queue.submit("heavy", fake_answer, llm_seconds, 3) for _ in range(heavy_questions)]
+        for job in jobs:
+            job.wait()
+            with lock:
+                latencies["heavy"].append(job.finished - job.submitted)
+
+    threads = [threading.Thread(target=light_user, args=(i,)) for i in range(users)]
+    if heavy_questions:
+        threads.insert(0, threading.Thread(target=heavy_user))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    queue.resize(0)
+    return wall, latencies, queue.summary()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="Simultaneous chat users.")
+    parser.add_argument("--questions", type=int, default=3, help="Questions each user asks, one after another.")
+    parser.add_argument("--llm-seconds", type=float, default=0.5, help="Simulated LLM time per question.")
+    parser.add_argument("--heavy", type=int, default=10, help="Questions queued at once by one heavy user (0 for none).")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Worker counts to compare.")
+    args = parser.parse_args()
+
+    total = args.users * args.questions + args.heavy
+    print(f"{args.users} users x {args.questions} questions + heavy user x {args.heavy}, {args.llm_seconds:.2f}s per question")
+    print(f"{'workers':>8}{'wall s':>9}{'jobs/s':>9}{'light p50':>11}{'light p95':>11}{'heavy p95':>11}{'mean wait':>11}")
+    for workers in args.workers:
+        wall, latencies, summary = run_load(workers, args.users, args.questions, args.llm_seconds, args.heavy)
+        print(
+            f"{workers:>8}{wall:>9.2f}{total / wall:>9.2f}"
+            f"{statistics.median(latencies['light']):>11.2f}{percentile(latencies['light'], 0.95):>11.2f}"
+            f"{percentile(latencies['heavy'], 0.95):>11.2f}{summary['mean wait (s)']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Storage benchmark: recall@5, search latency and memory for each collection storage preset.
+
+Loads the same synthetic 384-dim embeddings into one collection per StorageConfig preset,
+then compares approximate search (with the preset's search params) against exact search.
+Memory is reported as the estimated RAM of vectors plus graph, and as the change in the
+server's resident memory while the collection exists.
+
+Needs a local Qdrant server (the in-process client ignores quantization and on-disk settings):
+    docker run -p 6333:6333 qdrant/qdrant
+    python benchmarks/bench_quantization.py --points 50000 --queries 200
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from qdrant_client import QdrantClient, models
+
+from collection_config import STORAGE_PRESETS, create_collection
+from embedding_service import EMBEDDING_SIZE
+
+COLLECTION_PREFIX = "bench_storage_"
+TOP_K = 5
+
+
+def synthetic_embeddings(count, dim, clusters=64, seed=0):
+    """Normalised vectors scattered around random topic centres, roughly like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    vectors = centres[rng.integers(0, clusters, count)] + rng.normal(scale=0.6, size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def resident_memory(url):
+    """The server's resident memory in bytes from its Prometheus endpoint, or None."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/metrics", timeout=5) as response:
+            match = re.search(r"^memory_resident_bytes (\d+)", response.read().decode(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match.group(1)) if match else None
+
+
+def wait_until_indexed(client, collection_name, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f"{collection_name} was not indexed within {timeout}s")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_preset(client, url, name, storage, vectors, queries, batch_size):
+    collection_name = COLLECTION_PREFIX + name.replace("-", "_")
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+
+    memory_before = resident_memory(url)
+    create_collection(client, collection_name, vectors.shape[1], storage)
+    load_start = time.perf_counter()
+    for start in range(0, len(vectors), batch_size):
+        batch = vectors[start:start + batch_size]
+        client.upsert(
+            collection_name,
+            points=models.Batch(ids=list(range(start, start + len(batch))), vectors=batch.tolist()),
+            wait=True,
+        )
+    wait_until_indexed(client, collection_name)
+    load_seconds = time.perf_counter() - load_start
+    memory_after = resident_memory(url)
+
+    search_params = storage.search_params()
+    exact = models.SearchParams(exact=True)
+    recalls, latencies = [], []
+    for query in queries:
+        query = query.tolist()
+        truth = {p.id for p in client.query_points(collection_name, query=query, limit=TOP_K, search_params=exact).points}
+        start = time.perf_counter()
+        found = client.query_points(collection_name, query=query, limit=TOP_K, search_params=search_params).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(truth & {p.id for p in found}) / TOP_K)
+
+    client.delete_collection(collection_name)
+    return {
+        "preset": name,
+        "recall_at_5": statistics.mean(recalls),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "estimated_ram_mb": storage.estimated_ram_bytes(len(vectors), vectors.shape[1]) / 2**20,
+        "server_rss_delta_mb": (memory_after - memory_before) / 2**20 if memory_before and memory_after else None,
+        "load_seconds": load_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--qdrant-url", default=os.environ.get("QDRANT_URL", "http://localhost:6333"))
+    parser.add_argument("--qdrant-key", default=os.environ.get("QDRANT_API_KEY"))
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--presets", nargs="+", choices=list(STORAGE_PRESETS), default=list(STORAGE_PRESETS))
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url, api_key=args.qdrant_key, timeout=120)
+    vectors = synthetic_embeddings(args.points, EMBEDDING_SIZE)
+    queries = synthetic_embeddings(args.queries, EMBEDDING_SIZE, seed=1)
+
+    print(f"{args.points} points, {args.queries} queries, top {TOP_K}")
+    print(f"{'preset':<16}{'recall@5':>9}{'p50 ms':>9}{'p99 ms':>9}{'est. RAM MB':>13}{'RSS delta MB':>14}{'load s':>8}")
+    results = []
+    for name in args.presets:
+        result = run_preset(client, args.qdrant_url, name, STORAGE_PRESETS[name], vectors, queries, args.batch_size)
+        results.append(result)
+        rss = f"{result['server_rss_delta_mb']:.1f}" if result["server_rss_delta_mb"] is not None else "n/a"
+        print(
+            f"{name:<16}{result['recall_at_5']:>9.3f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+            f"{result['estimated_ram_mb']:>13.1f}{rss:>14}{result['load_seconds']:>8.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"points": args.points, "queries": args.queries, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
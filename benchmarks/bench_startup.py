@@ -0,0 +1,93 @@
+"""
+Startup benchmark: what a Streamlit rerun pays before reaching crew.kickoff().
+
+Compares the old importlib re-execution of crew_ai_app.py plus a full agent rebuild
+against a cached import and a warm CrewFactory. No network calls are made; dummy keys
+are enough because LLM and Agent construction is local.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py --reruns 20
+"""
+import argparse
+import importlib
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODEL_CONFIG = {
+    "model": "groq/llama3-70b-8192",
+    "base_url": "https://api.groq.com/openai/v1",
+    "api_key_env": "GROQ_API_KEY",
+}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def exec_module_from_file():
+    # What Brambot.py used to do on every rerun
+    spec = importlib.util.spec_from_file_location("crew_ai_app", os.path.join(ROOT, "crew_ai_app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+
+def cached_import():
+    importlib.import_module("crew_ai_app")
+
+
+def warm_median(samples):
+    """Median without the first (cold) sample, or of the only sample when there is just one."""
+    return statistics.median(samples[1:] or samples)
+
+
+def report(label, samples):
+    samples_ms = [s * 1000 for s in samples]
+    print(f"{label:<32} first={samples_ms[0]:9.2f} ms  warm median={warm_median(samples_ms):9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20, help="Number of simulated reruns.")
+    args = parser.parse_args()
+    if args.reruns < 1:
+        parser.error("--reruns must be at least 1")
+
+    from crew_factory import CrewFactory, build_agents
+
+    # Warm the heavy third-party imports once so both paths are measured on equal terms
+    cold_import = timed(cached_import)
+    print(f"{'first import (crewai, qdrant, ...)':<32} {cold_import * 1000:9.2f} ms\n")
+
+    old_import = [timed(exec_module_from_file) for _ in range(args.reruns)]
+    new_import = [timed(cached_import) for _ in range(args.reruns)]
+
+    old_build = [
+        timed(lambda: build_agents(MODEL_CONFIG, "dummy", use_internet=True, exa_api_key="dummy"))
+        for _ in range(args.reruns)
+    ]
+    factory = CrewFactory()
+    new_build = [
+        timed(lambda: factory.get_agents(MODEL_CONFIG, "dummy", False, True, "dummy"))
+        for _ in range(args.reruns)
+    ]
+
+    report("importlib exec_module", old_import)
+    report("cached import", new_import)
+    report("rebuild LLM + agents", old_build)
+    report("CrewFactory.get_agents", new_build)
+
+    old_rerun = warm_median(old_import) + warm_median(old_build)
+    new_rerun = warm_median(new_import) + warm_median(new_build)
+    print(f"\nper-rerun overhead: before {old_rerun * 1000:.2f} ms, after {new_rerun * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
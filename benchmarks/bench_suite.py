@@ -0,0 +1,450 @@
+"""
+Offline benchmark and regression suite: ingestion throughput, retrieval recall and answer latency and cost.
+
+Everything runs locally: the fixture corpus is generated (fixture_corpus.py), Qdrant runs
+in memory (or at --qdrant-url), the LLM is the stub OpenAI-compatible server
+(fake_llm_server.py) behind the LLM gateway, and internet search goes to the fake Exa
+server. Three sections are measured:
+
+- ingestion: the Upload PDF page's path (ingest_pdf per file), first pass and unchanged re-upload;
+- retrieval: recall@k and MRR of dense and hybrid search on the fixture questions;
+- answers: answer_question() for every combination of the run_crew_ai_app toggles
+  (documents, internet, execution mode, fast path router), with latency, time to first
+  token, LLM requests, tokens and cost per question.
+
+Results are written as JSON named after the git commit. Pass an earlier file with
+--compare to print the differences and exit with status 1 on a regression.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --compare benchmarks/results/<baseline>.json
+
+Embeddings default to a deterministic hashing embedder so no model download is needed;
+--embedder minilm uses the app's SentenceTransformer when it is available locally.
+Chunking defaults to the app's chunker (chunking.DEFAULT_CHUNKER). When its tokenizer is not
+available locally the suite falls back to the fixed-size chunker, says so, and records it in
+the results under "chunker". Only compare results produced with the same settings.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from qdrant_client import QdrantClient
+
+from fake_exa_server import start_server as start_exa_server
+from fake_llm_server import start_server as start_llm_server
+from fixture_corpus import build_corpus
+
+SUITE_VERSION = 1
+COLLECTION_NAME = "pdf_chunks"  # answer_question() reads this collection
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Groq list prices for llama3-70b-8192, USD per million tokens
+DEFAULT_PRICE_PROMPT = 0.59
+DEFAULT_PRICE_COMPLETION = 0.79
+
+# Metric name suffix -> (better direction, allowed relative change, or absolute change for scores,
+# smallest absolute change that counts: sub-millisecond timer jitter is not a regression)
+REGRESSION_RULES = {
+    "pages_per_second": ("higher", 0.20, 0.0),
+    "chunks_per_second": ("higher", 0.20, 0.0),
+    "recall_at_k": ("higher", 0.02, 0.0),
+    "mrr": ("higher", 0.02, 0.0),
+    "p50_ms": ("lower", 0.30, 1.0),
+    "p95_ms": ("lower", 0.30, 1.0),
+    "p50_s": ("lower", 0.20, 0.05),
+    "p95_s": ("lower", 0.20, 0.05),
+    "ttft_p50_s": ("lower", 0.20, 0.05),
+    "llm_requests_per_question": ("lower", 0.10, 0.0),
+    "tokens_per_question": ("lower", 0.10, 0.0),
+    "cost_usd_per_question": ("lower", 0.10, 0.0),
+}
+ABSOLUTE_RULES = ("recall_at_k", "mrr")
+
+
+class HashEmbedder:
+    """
+    Deterministic stand-in for the sentence-transformer: hashed word unigrams and bigrams,
+    L2-normalised, in the same 384 dimensions. Needs no download and gives stable recall.
+    """
+
+    def __init__(self, size=384):
+        self.size = size
+
+    def _vector(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.size), dtype=np.float32)
+
+
+def load_chunker(name):
+    """
+    Builds the chunker to measure and describes it for the results.
+
+    Without an explicit name this is the app's default chunker; if that cannot load its
+    tokenizer (no network and no local copy), the fixed-size chunker is measured instead.
+    """
+    from chunking import DEFAULT_CHUNKER, SentenceChunker, make_chunker
+
+    requested = name or DEFAULT_CHUNKER
+    chunker = make_chunker(requested)
+    note = None
+    if isinstance(chunker, SentenceChunker):
+        try:
+            chunker.tokenizer
+        except Exception as e:
+            if name:
+                raise
+            chunker = make_chunker("fixed")
+            note = f"'{requested}' needs its tokenizer locally ({type(e).__name__}); measured 'fixed' instead"
+    description = {
+        "name": chunker.name,
+        "spec": chunker.spec()[1],
+        "production": chunker.name == DEFAULT_CHUNKER,
+        "note": note,
+    }
+    return chunker, description
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def run_ingestion(args, qdrant, async_qdrant, paths, embedder, chunker, manifest, index_key):
+    from embedding_service import EMBEDDING_SIZE
+    from ingestion import ensure_collection, ingest_pdf
+
+    ensure_collection(qdrant, COLLECTION_NAME, EMBEDDING_SIZE)
+
+    def ingest_all():
+        start = time.perf_counter()
+        totals = {"pages": 0, "chunks": 0, "embedded": 0}
+        for path in paths:
+            # One call per file, as the Upload PDF page does
+            stats = ingest_pdf(path, os.path.basename(path), qdrant, COLLECTION_NAME, embedder.encode,
+                               chunker=chunker, manifest=manifest, async_qdrant=async_qdrant, index_key=index_key)
+            totals["pages"] += stats.pages
+            totals["chunks"] += stats.chunks
+            totals["embedded"] += stats.embedded
+        return totals, time.perf_counter() - start
+
+    totals, seconds = ingest_all()
+    _, reupload_seconds = ingest_all()
+    return {
+        "documents": len(paths),
+        "pages": totals["pages"],
+        "chunks": totals["chunks"],
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(totals["pages"] / seconds, 2),
+        "chunks_per_second": round(totals["chunks"] / seconds, 2),
+        "unchanged_reupload_seconds": round(reupload_seconds, 3),
+    }
+
+
+def run_retrieval(args, qdrant, questions, embedder, index_key):
+    from retrieval import RetrievalConfig, Retriever
+
+    configs = {
+        "dense": RetrievalConfig(top_k=args.top_k, use_sparse=False),
+        "hybrid": RetrievalConfig(top_k=args.top_k, use_sparse=True),
+    }
+    if args.rerank:
+        configs["hybrid_rerank"] = RetrievalConfig(top_k=args.top_k, use_sparse=True, rerank=True, budget_ms=100000)
+
+    results = {}
+    for name, config in configs.items():
+        retriever = Retriever(qdrant, COLLECTION_NAME, index_key=index_key, config=config)
+        hits, reciprocal_ranks, latencies = 0, [], []
+        for item in questions:
+            vector = embedder.encode(item["question"])
+            start = time.perf_counter()
+            retrieved = retriever.retrieve(item["question"], vector)
+            latencies.append((time.perf_counter() - start) * 1000)
+            rank = next((
+                position for position, chunk in enumerate(retrieved.chunks, start=1)
+                if chunk.payload.get("Source") == item["source"]
+                and chunk.payload.get("page_start", 0) <= item["page"] <= chunk.payload.get("page_end", 0)
+            ), None)
+            hits += rank is not None
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+        results[name] = {
+            "questions": len(questions),
+            "recall_at_k": round(hits / len(questions), 4),
+            "mrr": round(statistics.mean(reciprocal_ranks), 4),
+            "p50_ms": round(percentile(latencies, 0.5), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+        }
+    return results
+
+
+def run_answers(args, qdrant, questions, embedder, index_key, llm_server, exa_server):
+    from conversation_memory import ConversationMemory, MemoryConfig
+    from crew_ai_app import answer_question
+    from crew_factory import build_agents
+    from job_queue import Job
+    from llm_gateway import GatewayConfig, LLMGateway
+    from retrieval import RetrievalConfig, Retriever
+    from router import PATH_CREW, PATH_DIRECT, RouterConfig, RouterStats
+    from web_search import get_web_search
+
+    os.environ["EXA_BASE_URL"] = exa_server.url
+    providers = {"Stub": {
+        "model": "openai/stub-model",
+        "base_url": llm_server.url,
+        "api_key_env": "BENCH_LLM_KEY",
+        "rpm": 1000000,
+        "tpm": 1000000000,
+    }}
+    gateway = LLMGateway(providers)
+    gateway_config = GatewayConfig(max_retries=0)
+    model_config = providers["Stub"]
+    retriever = Retriever(qdrant, COLLECTION_NAME, index_key=index_key, config=RetrievalConfig(top_k=args.top_k))
+    asked = questions[:args.questions_per_combination]
+
+    def ask(name, item, crew_agents, memory, router_stats, use_docs, use_internet, mode, router):
+        history = memory.context()
+        memory.add("user", item["question"])
+        # crewai prints task panels to stdout even for non-verbose agents
+        with contextlib.redirect_stdout(io.StringIO()):
+            answer_question(
+                Job(name, answer_question, (), {}),
+                user_input=item["question"],
+                history=history,
+                memory=memory,
+                crew_agents=crew_agents,
+                model_config=model_config,
+                api_key="offline",
+                embedding_model=embedder,
+                retriever=retriever if use_docs else None,
+                selected_sources=[],
+                use_docs=use_docs,
+                use_internet=use_internet,
+                execution_mode=mode,
+                router_config=RouterConfig(enabled=router),
+                use_cache=False,
+                router_stats=router_stats,
+            )
+
+    # Warm-up: first-use costs (imports, agent executors, connections) are not part of any combination
+    warm_agents = build_agents(model_config, "offline", True, "offline", gateway, gateway_config)
+    ask("warm-up", questions[-1], warm_agents, ConversationMemory("bench-warm-up"), RouterStats(), True, True, "parallel", False)
+
+    results = {}
+    for use_docs, use_internet, mode, router in itertools.product([False, True], [False, True], ["parallel", "sequential"], [False, True]):
+        name = f"docs={'on' if use_docs else 'off'},internet={'on' if use_internet else 'off'},{mode},router={'on' if router else 'off'}"
+        crew_agents = build_agents(model_config, "offline", use_internet, "offline", gateway, gateway_config)
+        memory = ConversationMemory(f"bench-{name}", MemoryConfig())
+        router_stats = RouterStats()
+        get_web_search().clear()  # Every combination starts with a cold search cache
+        before_llm, before_exa = llm_server.stats(), exa_server.requests
+
+        latencies, failures = [], 0
+        for item in asked:
+            start = time.perf_counter()
+            try:
+                ask(name, item, crew_agents, memory, router_stats, use_docs, use_internet, mode, router)
+            except Exception as e:
+                failures += 1
+                print(f"  {name}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+        after_llm = llm_server.stats()
+        answered = max(1, len(latencies))
+        prompt_tokens = after_llm["prompt_tokens"] - before_llm["prompt_tokens"]
+        completion_tokens = after_llm["completion_tokens"] - before_llm["completion_tokens"]
+        ttfts = router_stats.paths[PATH_CREW].ttfts + router_stats.paths[PATH_DIRECT].ttfts
+        results[name] = {
+            "questions": len(asked),
+            "failures": failures,
+            "direct_answers": router_stats.paths[PATH_DIRECT].count,
+            "p50_s": round(percentile(latencies, 0.5), 3),
+            "p95_s": round(percentile(latencies, 0.95), 3),
+            "ttft_p50_s": round(percentile(ttfts, 0.5), 3),
+            "llm_requests_per_question": round((after_llm["requests"] - before_llm["requests"]) / answered, 2),
+            "tokens_per_question": round((prompt_tokens + completion_tokens) / answered, 1),
+            "cost_usd_per_question": round(
+                (prompt_tokens * args.price_prompt + completion_tokens * args.price_completion) / 1e6 / answered, 6
+            ),
+            "exa_requests_per_question": round((exa_server.requests - before_exa) / answered, 2),
+        }
+        print(f"  {name}: p50 {results[name]['p50_s']:.2f}s, {results[name]['llm_requests_per_question']} LLM calls/question")
+    return results
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Prints every tracked metric next to the baseline; returns the regressed metric names."""
+    if baseline.get("settings") != current.get("settings"):
+        print("Warning: the baseline was produced with different settings; differences may not be regressions.")
+    if baseline.get("chunker", {}).get("name") != current["chunker"]["name"]:
+        print(f"Warning: the baseline used the '{baseline.get('chunker', {}).get('name', 'unknown')}' chunker, "
+              f"this run '{current['chunker']['name']}'; ingestion and retrieval numbers are not comparable.")
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    regressions = []
+    print(f"\nCompared with {baseline['commit']}{' (dirty)' if baseline.get('dirty') else ''}:")
+    print(f"{'metric':<78}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric in sorted(new):
+        rule = next((rule for suffix, rule in REGRESSION_RULES.items() if metric.endswith("." + suffix)), None)
+        if rule is None or metric not in old:
+            continue
+        direction, tolerance, floor = rule
+        before, after = old[metric], new[metric]
+        if metric.rsplit(".", 1)[1] in ABSOLUTE_RULES:
+            worse_by = (before - after) if direction == "higher" else (after - before)
+            change = f"{after - before:+.3f}"
+        else:
+            relative = (after - before) / before if before else 0.0
+            worse_by = -relative if direction == "higher" else relative
+            change = f"{relative:+.0%}"
+        flag = ""
+        if worse_by > tolerance and abs(after - before) > floor:
+            regressions.append(metric)
+            flag = "  REGRESSION"
+        print(f"{metric:<78}{before:>12}{after:>12}{change:>10}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=8, help="Fixture PDFs to generate.")
+    parser.add_argument("--pages", type=int, default=6, help="Pages per fixture PDF.")
+    parser.add_argument("--seed", type=int, default=0, help="Fixture corpus seed.")
+    parser.add_argument("--embedder", choices=["hash", "minilm"], default="hash", help="hash needs no model download.")
+    parser.add_argument("--chunker", help="chunking.CHUNKERS name; defaults to the app's chunker, or 'fixed' when its tokenizer is not available.")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rerank", action="store_true", help="Also measure cross-encoder re-ranking (needs the model locally).")
+    parser.add_argument("--qdrant-url", help="Use this Qdrant server (and concurrent upserts) instead of an in-memory instance.")
+    parser.add_argument("--questions-per-combination", type=int, default=3)
+    parser.add_argument("--llm-ttft", type=float, default=0.05, help="Stub LLM seconds to first token.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=800.0, help="Stub LLM generation speed.")
+    parser.add_argument("--exa-latency", type=float, default=0.05, help="Fake Exa seconds per search.")
+    parser.add_argument("--price-prompt", type=float, default=DEFAULT_PRICE_PROMPT, help="USD per million prompt tokens.")
+    parser.add_argument("--price-completion", type=float, default=DEFAULT_PRICE_COMPLETION, help="USD per million completion tokens.")
+    parser.add_argument("--skip-answers", action="store_true", help="Only measure ingestion and retrieval.")
+    parser.add_argument("--out", help="Results file; defaults to benchmarks/results/<commit>.json.")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    parser.add_argument("--no-fail", action="store_true", help="Exit with status 0 even when --compare finds regressions.")
+    args = parser.parse_args()
+
+    from index_manifest import IndexManifest
+
+    commit, dirty = git_commit()
+    if args.embedder == "minilm":
+        from embedding_service import get_embedding_model
+        embedder = get_embedding_model()
+    else:
+        embedder = HashEmbedder()
+    chunker, chunker_description = load_chunker(args.chunker)
+    if not chunker_description["production"]:
+        print(f"Warning: not benchmarking the app's chunker. {chunker_description['note'] or ''}".rstrip())
+
+    with tempfile.TemporaryDirectory(prefix="brambot-bench-") as workdir:
+        paths, questions = build_corpus(os.path.join(workdir, "corpus"), args.documents, args.pages, args.seed)
+        manifest = IndexManifest(os.path.join(workdir, "manifest.json"))
+        if args.qdrant_url:
+            from qdrant_pool import get_async_qdrant_client
+            qdrant = QdrantClient(url=args.qdrant_url)
+            if qdrant.collection_exists(COLLECTION_NAME):
+                qdrant.delete_collection(COLLECTION_NAME)
+            async_qdrant = get_async_qdrant_client(args.qdrant_url)
+            index_key = args.qdrant_url
+        else:
+            qdrant, async_qdrant, index_key = QdrantClient(":memory:"), None, f"bench-memory-{os.getpid()}"
+
+        results = {}
+        print(f"Ingesting {len(paths)} fixture PDFs...")
+        results["ingestion"] = run_ingestion(args, qdrant, async_qdrant, paths, embedder, chunker, manifest, index_key)
+        print(f"  {results['ingestion']['pages_per_second']} pages/s, {results['ingestion']['chunks_per_second']} chunks/s")
+
+        print(f"Retrieval on {len(questions)} questions...")
+        results["retrieval"] = run_retrieval(args, qdrant, questions, embedder, index_key)
+        for name, row in results["retrieval"].items():
+            print(f"  {name}: recall@{args.top_k} {row['recall_at_k']:.2f}, MRR {row['mrr']:.2f}, p95 {row['p95_ms']:.1f} ms")
+
+        if not args.skip_answers:
+            print("Answering per toggle combination...")
+            llm_server = start_llm_server(ttft=args.llm_ttft, tokens_per_second=args.llm_tokens_per_second)
+            exa_server = start_exa_server(latency=args.exa_latency)
+            try:
+                results["answers"] = run_answers(args, qdrant, questions, embedder, index_key, llm_server, exa_server)
+            finally:
+                llm_server.shutdown()
+                exa_server.shutdown()
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("out", "compare", "no_fail")}
+    report = {
+        "suite_version": SUITE_VERSION,
+        "commit": commit,
+        "dirty": dirty,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": settings,
+        "chunker": chunker_description,
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s).")
+            if not args.no_fail:
+                sys.exit(1)
+        else:
+            print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
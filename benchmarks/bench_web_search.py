@@ -0,0 +1,63 @@
+"""
+Web search benchmark: sequential uncached searches versus the cached, parallel search layer.
+
+Simulates users asking overlapping questions, each with a few query phrasings, against the
+local fake Exa server. Reports wall time, Exa requests made and characters of page text
+that would reach the LLM.
+
+Run from the repository root:
+    python benchmarks/bench_web_search.py --users 20 --latency 0.3
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_exa_server import start_server
+from web_search import WebSearch, WebSearchConfig, format_results
+
+QUESTIONS = [
+    ["latest qdrant release", "Qdrant newest version", "what is new in qdrant"],
+    ["groq llama 3 pricing", "Groq Llama3 price per token"],
+    ["streamlit fragments", "Streamlit st.fragment rerun", "partial reruns streamlit"],
+    ["sentence transformers minilm", "all-MiniLM-L6-v2 dimensions"],
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="Questions asked, cycling through the question set.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake Exa latency per request in seconds.")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    asked = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.users)]
+
+    # Baseline: every phrasing searched one after another, full page text, nothing reused
+    untrimmed = WebSearch("fake", server.url, WebSearchConfig(max_chars_per_result=100000, ttl_seconds=0))
+    start, before, chars = time.perf_counter(), server.requests, 0
+    for queries in asked:
+        for query in queries:
+            chars += len(format_results(untrimmed._fetch(query)))
+    baseline = (time.perf_counter() - start, server.requests - before, chars)
+
+    search = WebSearch("fake", server.url)
+    start, before, chars = time.perf_counter(), server.requests, 0
+    for queries in asked:
+        chars += len(format_results(search.search_many(queries)))
+    layered = (time.perf_counter() - start, server.requests - before, chars)
+
+    print(f"{args.users} questions, {args.latency:.2f}s per Exa request")
+    print(f"{'':<28}{'wall s':>8}{'requests':>10}{'chars to LLM':>14}")
+    print(f"{'sequential, uncached':<28}{baseline[0]:>8.2f}{baseline[1]:>10}{baseline[2]:>14}")
+    print(f"{'parallel, cached, trimmed':<28}{layered[0]:>8.2f}{layered[1]:>10}{layered[2]:>14}")
+    print(f"cache hits {search.hits}, misses {search.misses}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
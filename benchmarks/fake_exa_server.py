@@ -0,0 +1,105 @@
+"""
+Local stand-in for the Exa search API, for tests and benchmarks without network access.
+
+Answers POST /search with deterministic results derived from the query, after an
+artificial delay, and counts the requests it served (GET /stats).
+
+Run it on its own:
+    python benchmarks/fake_exa_server.py --port 8765 --latency 0.4
+and point BramBot at it with EXA_BASE_URL=http://127.0.0.1:8765 (any EXA_API_KEY works).
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARAGRAPH = (
+    "This page discusses {query} in depth. Experts explain the background of {query} and "
+    "how it developed over the years. Unrelated filler text about site navigation, cookie "
+    "banners and newsletter sign-ups follows here to pad the page. "
+)
+
+
+def fake_results(query, num_results, max_characters):
+    digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+    results = []
+    for i in range(num_results):
+        text = (PARAGRAPH.format(query=query) + "\n\n") * 12
+        results.append({
+            "id": f"{digest[:12]}-{i}",
+            "url": f"https://example.com/{digest[:8]}/{i}",
+            "title": f"Result {i + 1} for {query}",
+            "score": 1.0 - i / 10,
+            "publishedDate": "2026-01-01T00:00:00.000Z",
+            "text": text[:max_characters] if max_characters else text,
+        })
+    return results
+
+
+class FakeExaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.3):
+        super().__init__(address, FakeExaHandler)
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeExaHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply({"requests": self.server.requests})
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def do_POST(self):
+        if self.path != "/search":
+            self._reply({"error": "not found"}, 404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        text_options = (body.get("contents") or {}).get("text") or {}
+        max_characters = text_options.get("maxCharacters") if isinstance(text_options, dict) else None
+        self._reply({
+            "requestId": "fake",
+            "resolvedSearchType": "neural",
+            "results": fake_results(body.get("query", ""), body.get("numResults") or 5, max_characters),
+        })
+
+
+def start_server(port=0, latency=0.3):
+    """Starts the fake server on a background thread; returns it (see .url and .requests)."""
+    server = FakeExaServer(("127.0.0.1", port), latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds added to every search.")
+    args = parser.parse_args()
+    server = FakeExaServer(("127.0.0.1", args.port), args.latency)
+    print(f"Fake Exa API on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,170 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API (Groq, OpenAI), for offline benchmarks.
+
+Answers POST /v1/chat/completions with deterministic text, either as one JSON response
+or as a server-sent event stream with a final usage chunk. Latency is simulated as a fixed
+time to first token plus completion tokens at a fixed rate. Prompts written in crewai's
+ReAct format get "Final Answer:" replies, and agents that have the web_search tool first
+get one tool call. GET /stats reports requests and token usage.
+
+Run it on its own:
+    python benchmarks/fake_llm_server.py --port 8766 --ttft 0.2 --tokens-per-second 400
+and use http://127.0.0.1:8766/v1 as the base_url of a MODEL_PROVIDERS entry (any API key works).
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the answer depends on the documents and the question so here is a careful explanation "
+    "covering background details trade offs sources and a short summary at the end"
+).split()
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def fake_text(seed, tokens):
+    """Deterministic filler of roughly `tokens` tokens, different per prompt."""
+    digest = int(hashlib.sha256(seed.encode("utf-8")).hexdigest(), 16)
+    words = [WORDS[(digest >> (i % 64)) % len(WORDS)] for i in range(max(1, tokens * 3 // 4))]
+    return " ".join(words).capitalize() + "."
+
+
+def reply_for(messages, completion_tokens):
+    """The assistant text for a conversation: a tool call, a ReAct final answer or plain text."""
+    prompt = "\n".join(str(m.get("content") or "") for m in messages)
+    text = fake_text(prompt, completion_tokens)
+    if "Final Answer:" not in prompt:
+        return text
+    # The tool format instructions mention "Observation:" once; a tool result adds another
+    if "web_search" in prompt and prompt.count("Observation:") < 2:
+        task = re.search(r"Current Task: (.+)", prompt)
+        query = " ".join((task.group(1) if task else text).split()[-8:])
+        return (
+            "Thought: I should search the web for this.\n"
+            "Action: web_search\n"
+            f"Action Input: {json.dumps({'queries': [query, query + ' latest']})}"
+        )
+    return f"Thought: I now can give a great answer\nFinal Answer: {text}"
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, ttft=0.2, tokens_per_second=400.0, completion_tokens=120):
+        super().__init__(address, FakeLLMHandler)
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "prompt_tokens": self.prompt_tokens, "completion_tokens": self.output_tokens}
+
+    def record(self, prompt_tokens, completion_tokens):
+        with self.lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += completion_tokens
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body, status=200):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._reply(self.server.stats())
+        else:
+            self._reply({"error": {"message": "not found"}}, 404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._reply({"error": {"message": "not found"}}, 404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        messages = body.get("messages") or []
+        text = reply_for(messages, self.server.completion_tokens)
+        for stop in body.get("stop") or []:
+            # Like a real API: generation ends before a stop sequence
+            if stop and stop in text:
+                text = text[:text.index(stop)]
+        prompt_tokens = count_tokens("".join(str(m.get("content") or "") for m in messages))
+        completion_tokens = count_tokens(text)
+        self.server.record(prompt_tokens, completion_tokens)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "fake")}
+
+        time.sleep(self.server.ttft)
+        if not body.get("stream"):
+            time.sleep(completion_tokens / self.server.tokens_per_second)
+            self._reply({**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"},
+            ]})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        pieces = re.findall(r"\S+\s*", text)
+        delay = completion_tokens / self.server.tokens_per_second / max(1, len(pieces))
+        for i, piece in enumerate(pieces):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece}, "finish_reason": None},
+            ]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(delay)
+        final = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_server(port=0, ttft=0.2, tokens_per_second=400.0, completion_tokens=120):
+    """Starts the fake server on a background thread; returns it (see .url and .stats())."""
+    server = FakeLLMServer(("127.0.0.1", port), ttft, tokens_per_second, completion_tokens)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="Generation speed after the first token.")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Approximate length of every answer.")
+    args = parser.parse_args()
+    server = FakeLLMServer(("127.0.0.1", args.port), args.ttft, args.tokens_per_second, args.completion_tokens)
+    print(f"Fake OpenAI-compatible API on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,117 @@
+"""
+Deterministic fixture corpus for the offline benchmarks: PDFs with known facts and the questions that find them.
+
+Each document is a fictional equipment manual. Most of every page is filler drawn from a
+shared vocabulary, so documents look alike to a retriever; a few sentences per document
+state a unique fact (a model name with a number). Every fact has a question and the
+document and page that answer it, from which recall@k is computed.
+
+The PDFs are written by a tiny built-in writer (Helvetica text only), so no PDF library
+beyond pdfplumber for reading is needed.
+"""
+import os
+import random
+
+FILLER = (
+    "maintenance inspection schedule operator safety valve pressure housing bearing seal "
+    "filter lubricant torque calibration sensor controller firmware warranty installation "
+    "clearance vibration temperature coolant pump motor gearbox coupling alignment service "
+    "interval replacement procedure manual chapter section figure table note caution"
+).split()
+
+PRODUCTS = ["Zephyr", "Orion", "Kestrel", "Vortex", "Nimbus", "Falcon", "Quasar", "Talon", "Cobalt", "Helix", "Aurora", "Strider"]
+FACTS = [
+    ("maximum operating pressure", "bar", "What is the maximum operating pressure of the {model}?"),
+    ("recommended service interval", "hours", "How often should the {model} be serviced?"),
+    ("rated motor power", "kilowatts", "What is the rated motor power of the {model}?"),
+    ("coolant capacity", "litres", "How much coolant does the {model} hold?"),
+]
+
+SENTENCES_PER_PAGE = 20  # About 25 lines, well within one A4 page at 12 pt leading
+CHARS_PER_LINE = 90
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages):
+    """Writes a minimal PDF with one Helvetica text page per entry of `pages` (each a list of lines)."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)  # Page tree goes after every page and content stream
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1")))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font, content)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{k} 0 R" for k in kids).encode(), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _wrap(text):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > CHARS_PER_LINE:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _filler_sentence(rng):
+    words = rng.choices(FILLER, k=rng.randint(8, 16))
+    return " ".join(words).capitalize() + "."
+
+
+def build_corpus(directory, documents=8, pages_per_document=6, seed=0):
+    """
+    Writes the fixture PDFs into `directory`.
+
+    Returns:
+        (list[str], list[dict]): PDF paths, and questions as {"question", "source", "page", "answer"}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths, questions = [], []
+    for d in range(documents):
+        model = f"{PRODUCTS[d % len(PRODUCTS)]}-{d + 3}"
+        source = f"manual_{d:02d}_{model.lower()}.pdf"
+        # Every fact lands on a random page, somewhere between the filler sentences
+        fact_pages = {fact: rng.randrange(pages_per_document) for fact in FACTS}
+        pages = []
+        for p in range(pages_per_document):
+            sentences = [_filler_sentence(rng) for _ in range(SENTENCES_PER_PAGE)]
+            for (name, unit, question), page in fact_pages.items():
+                if page == p:
+                    value = rng.randint(10, 990)
+                    sentences.insert(rng.randrange(len(sentences)), f"The {name} of the {model} is {value} {unit}.")
+                    questions.append({"question": question.format(model=model), "source": source, "page": p + 1, "answer": f"{value} {unit}"})
+            pages.append(_wrap(" ".join(sentences)))
+        path = os.path.join(directory, source)
+        write_pdf(path, pages)
+        paths.append(path)
+    return paths, questions
@@ -0,0 +1,261 @@
+import re
+import threading
+from dataclasses import dataclass
+
+from embedding_service import EMBEDDING_MODEL_NAME
+
+# all-MiniLM-L6-v2 reads at most 256 word pieces, two of which are [CLS] and [SEP]
+MODEL_MAX_TOKENS = 256 - 2
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+
+
+@dataclass
+class Chunk:
+    """
+    A piece of document text plus where it came from.
+
+    Pages are 1-based; char_start is the offset within page_start's text and char_end the
+    offset within page_end's text.
+    """
+    text: str
+    page_start: int
+    page_end: int
+    char_start: int
+    char_end: int
+
+    @property
+    def fingerprint(self):
+        """Identity used to decide whether an already indexed chunk can be reused as is."""
+        return f"{self.page_start}:{self.char_start}-{self.page_end}:{self.char_end}|{self.text}"
+
+    def payload(self):
+        return {
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+        }
+
+
+class FixedSizeChunker:
+    """The original splitter: fixed character slices over the space-joined pages, no overlap."""
+
+    name = "fixed"
+
+    def __init__(self, chunk_size=500):
+        self.chunk_size = chunk_size
+
+    def spec(self):
+        return self.name, {"chunk_size": self.chunk_size}
+
+    def chunks(self, pages):
+        """Yields Chunks from a stream of (page_number, text), 0-based page numbers."""
+        buffer = ""
+        spans = []  # (page, offset in page, offset in buffer) where each page's text starts
+
+        def locate(position):
+            for page, page_offset, buffer_offset in reversed(spans):
+                if position >= buffer_offset:
+                    return page, page_offset + position - buffer_offset
+            return spans[0][0], 0
+
+        for number, text in pages:
+            if not text:
+                continue
+            if buffer:
+                buffer += " "
+            spans.append((number + 1, 0, len(buffer)))
+            buffer += text
+            while len(buffer) >= self.chunk_size:
+                yield self._chunk(buffer[:self.chunk_size], locate)
+                buffer = buffer[self.chunk_size:]
+                spans = self._shift(spans, self.chunk_size)
+        if buffer:
+            yield self._chunk(buffer, locate)
+
+    @staticmethod
+    def _chunk(text, locate):
+        page_start, char_start = locate(0)
+        page_end, char_end = locate(len(text) - 1)
+        return Chunk(text, page_start, page_end, char_start, char_end + 1)
+
+    @staticmethod
+    def _shift(spans, consumed):
+        # Re-base page start offsets after `consumed` characters left the buffer
+        shifted = []
+        for page, page_offset, buffer_offset in spans:
+            if buffer_offset >= consumed:
+                shifted.append((page, page_offset, buffer_offset - consumed))
+            else:
+                shifted.append((page, page_offset + consumed - buffer_offset, 0))
+        # Only the last page that starts at or before offset 0 is still relevant
+        while len(shifted) > 1 and shifted[1][2] == 0:
+            shifted.pop(0)
+        return shifted
+
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(model_name=EMBEDDING_MODEL_NAME):
+    """
+    The embedding model's fast (Rust) tokenizer, without loading the model or torch.
+
+    Cheap enough to load inside ingestion worker processes.
+    """
+    with _tokenizers_lock:
+        if model_name not in _tokenizers:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_pretrained(model_name)
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+            _tokenizers[model_name] = tokenizer
+        return _tokenizers[model_name]
+
+
+@dataclass
+class _Sentence:
+    text: str
+    tokens: int
+    page: int
+    start: int
+    end: int
+    paragraph_end: bool
+
+
+class SentenceChunker:
+    """
+    Packs whole sentences into chunks of at most max_tokens model tokens.
+
+    Chunks prefer to end at paragraph boundaries, carry roughly overlap_tokens of trailing
+    sentences into the next chunk, and may span pages. Sentences are tokenized one page
+    at a time with the batched Rust tokenizer, so chunking keeps up with extraction.
+    """
+
+    name = "sentence"
+
+    def __init__(self, max_tokens=200, overlap_tokens=32, model_name=EMBEDDING_MODEL_NAME, tokenizer=None):
+        if max_tokens > MODEL_MAX_TOKENS:
+            raise ValueError(f"max_tokens must be at most {MODEL_MAX_TOKENS} for {model_name}")
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.model_name = model_name
+        self._tokenizer = tokenizer
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer(self.model_name)
+        return self._tokenizer
+
+    def spec(self):
+        return self.name, {
+            "max_tokens": self.max_tokens,
+            "overlap_tokens": self.overlap_tokens,
+            "model_name": self.model_name,
+        }
+
+    def _sentences(self, page, text):
+        spans = []
+        for paragraph in _spans(text, PARAGRAPH_BREAK):
+            sentences = list(_spans(text, SENTENCE_END, *paragraph))
+            for i, (start, end) in enumerate(sentences):
+                spans.append((start, end, i == len(sentences) - 1))
+        if not spans:
+            return []
+
+        encodings = self.tokenizer.encode_batch([text[start:end] for start, end, _ in spans], add_special_tokens=False)
+        sentences = []
+        for (start, end, paragraph_end), encoding in zip(spans, encodings):
+            if len(encoding.ids) <= self.max_tokens:
+                sentences.append(_Sentence(text[start:end], len(encoding.ids), page, start, end, paragraph_end))
+                continue
+            # A sentence longer than a whole chunk is cut on token boundaries
+            offsets = encoding.offsets
+            for first in range(0, len(offsets), self.max_tokens):
+                last = min(first + self.max_tokens, len(offsets)) - 1
+                piece_start, piece_end = start + offsets[first][0], start + offsets[last][1]
+                sentences.append(_Sentence(
+                    text[piece_start:piece_end], last - first + 1, page, piece_start, piece_end,
+                    paragraph_end and last == len(offsets) - 1,
+                ))
+        return sentences
+
+    def chunks(self, pages):
+        """Yields Chunks from a stream of (page_number, text), 0-based page numbers."""
+        current = []
+        tokens = 0
+        carried = 0  # Sentences at the start of `current` that were already in the previous chunk
+
+        def emit():
+            first, last = current[0], current[-1]
+            text = " ".join(sentence.text for sentence in current)
+            return Chunk(text, first.page, last.page, first.start, last.end)
+
+        def overlap():
+            kept, kept_tokens = [], 0
+            for sentence in reversed(current):
+                if kept_tokens + sentence.tokens > self.overlap_tokens:
+                    break
+                kept.insert(0, sentence)
+                kept_tokens += sentence.tokens
+            return kept, kept_tokens, len(kept)
+
+        for number, text in pages:
+            for sentence in self._sentences(number + 1, text or ""):
+                if len(current) > carried and tokens + sentence.tokens > self.max_tokens:
+                    yield emit()
+                    current, tokens, carried = overlap()
+                # Drop carried sentences that would not leave room for the new one
+                while current and tokens + sentence.tokens > self.max_tokens:
+                    tokens -= current.pop(0).tokens
+                    carried -= 1
+                current.append(sentence)
+                tokens += sentence.tokens
+                # End on a paragraph once the chunk is reasonably full
+                if sentence.paragraph_end and tokens >= self.max_tokens // 2:
+                    yield emit()
+                    current, tokens, carried = overlap()
+
+        # Emit the tail unless it only repeats the end of the previous chunk
+        if len(current) > carried:
+            yield emit()
+
+
+def _spans(text, separator, start=0, end=None):
+    """Yields (start, end) of the non-blank pieces of text[start:end] between separator matches."""
+    end = len(text) if end is None else end
+    position = start
+    for match in separator.finditer(text, start, end):
+        yield from _strip_span(text, position, match.start())
+        position = match.end()
+    yield from _strip_span(text, position, end)
+
+
+def _strip_span(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        yield start, end
+
+
+CHUNKERS = {
+    FixedSizeChunker.name: FixedSizeChunker,
+    SentenceChunker.name: SentenceChunker,
+}
+
+DEFAULT_CHUNKER = SentenceChunker.name
+
+
+def make_chunker(name=DEFAULT_CHUNKER, **options):
+    """Builds a chunker by name; see CHUNKERS for the available strategies."""
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker '{name}', choose one of: {', '.join(CHUNKERS)}")
+    return CHUNKERS[name](**options)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+
+from qdrant_client import models
+
+QUANTIZATION_NONE = "none"
+QUANTIZATION_SCALAR = "scalar"
+QUANTIZATION_BINARY = "binary"
+QUANTIZATIONS = [QUANTIZATION_NONE, QUANTIZATION_SCALAR, QUANTIZATION_BINARY]
+
+# Binary codes lose much more precision than int8, so more candidates are rescored
+DEFAULT_OVERSAMPLING = {QUANTIZATION_SCALAR: 1.5, QUANTIZATION_BINARY: 3.0}
+
+# Sparse vector of BM25 term weights next to the dense one; Qdrant applies IDF at query time
+KEYWORD_VECTOR = "bm25"
+
+
+@dataclass
+class StorageConfig:
+    """
+    How a collection stores its vectors. Only used when the collection is created or reconfigured.
+
+    Parameters:
+        quantization (str): "none", "scalar" (int8, 4x smaller) or "binary" (1 bit per dimension, 32x smaller).
+        always_ram (bool): Keep the quantized vectors in RAM while the originals may live on disk.
+        on_disk_vectors (bool): Store the original float32 vectors on disk (memory-mapped).
+        on_disk_payload (bool): Store payloads on disk instead of in RAM.
+        hnsw_m (int): Edges per node in the HNSW graph; lower uses less memory, higher improves recall.
+        hnsw_ef_construct (int): Neighbours considered while building the graph.
+        hnsw_on_disk (bool): Store the HNSW graph on disk.
+        rescore (bool): Re-score quantized candidates with the original vectors at query time.
+        oversampling (float): Candidates fetched per requested result before rescoring; None picks a default per quantization.
+        hnsw_ef (int): Neighbours explored per query; None uses Qdrant's default.
+    """
+    quantization: str = QUANTIZATION_NONE
+    always_ram: bool = True
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    rescore: bool = True
+    oversampling: float = None
+    hnsw_ef: int = None
+
+    def vectors_config(self, vector_size):
+        return models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=self.on_disk_vectors)
+
+    def sparse_vectors_config(self):
+        return {KEYWORD_VECTOR: models.SparseVectorParams(
+            index=models.SparseIndexParams(on_disk=self.on_disk_vectors),
+            modifier=models.Modifier.IDF,
+        )}
+
+    def hnsw_config(self):
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+
+    def quantization_config(self):
+        if self.quantization == QUANTIZATION_SCALAR:
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=self.always_ram,
+            ))
+        if self.quantization == QUANTIZATION_BINARY:
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=self.always_ram))
+        if self.quantization == QUANTIZATION_NONE:
+            return None
+        raise ValueError(f"Unknown quantization '{self.quantization}', choose one of: {', '.join(QUANTIZATIONS)}")
+
+    def search_params(self):
+        """Query-time parameters matching this storage layout, for query_points(search_params=...)."""
+        quantization = None
+        if self.quantization != QUANTIZATION_NONE:
+            quantization = models.QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=self.oversampling or DEFAULT_OVERSAMPLING[self.quantization],
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def estimated_ram_bytes(self, points, vector_size):
+        """Rough RAM needed for the vectors and graph of `points` points (payloads excluded)."""
+        ram = 0 if self.on_disk_vectors else points * vector_size * 4
+        if self.quantization == QUANTIZATION_SCALAR and self.always_ram:
+            ram += points * vector_size
+        elif self.quantization == QUANTIZATION_BINARY and self.always_ram:
+            ram += points * vector_size // 8
+        if not self.hnsw_on_disk:
+            ram += points * self.hnsw_m * 2 * 4  # Level-0 links, 4 bytes each
+        return ram
+
+
+# Named layouts for the upload page, the CLI and the benchmark
+STORAGE_PRESETS = {
+    "default": StorageConfig(),
+    "scalar": StorageConfig(quantization=QUANTIZATION_SCALAR),
+    "scalar-on-disk": StorageConfig(quantization=QUANTIZATION_SCALAR, on_disk_vectors=True, on_disk_payload=True),
+    "binary-on-disk": StorageConfig(quantization=QUANTIZATION_BINARY, on_disk_vectors=True, on_disk_payload=True),
+}
+
+
+def storage_from_collection(collection_info):
+    """Reads back the StorageConfig of an existing collection, so queries use matching search params."""
+    params = collection_info.config.params
+    hnsw = collection_info.config.hnsw_config
+    vectors = params.vectors
+    quantization = QUANTIZATION_NONE
+    always_ram = True
+    quantization_config = collection_info.config.quantization_config
+    if isinstance(quantization_config, models.ScalarQuantization):
+        quantization = QUANTIZATION_SCALAR
+        always_ram = quantization_config.scalar.always_ram is not False
+    elif isinstance(quantization_config, models.BinaryQuantization):
+        quantization = QUANTIZATION_BINARY
+        always_ram = quantization_config.binary.always_ram is not False
+    return StorageConfig(
+        quantization=quantization,
+        always_ram=always_ram,
+        on_disk_vectors=bool(getattr(vectors, "on_disk", False)),
+        on_disk_payload=bool(params.on_disk_payload),
+        hnsw_m=hnsw.m,
+        hnsw_ef_construct=hnsw.ef_construct,
+        hnsw_on_disk=bool(hnsw.on_disk),
+    )
+
+
+def has_keyword_vector(collection_info):
+    """Whether the collection was created with the BM25 keyword vector (collections from before it were not)."""
+    return KEYWORD_VECTOR in (collection_info.config.params.sparse_vectors or {})
+
+
+def create_collection(qdrant, collection_name, vector_size, storage=None):
+    storage = storage or StorageConfig()
+    qdrant.create_collection(
+        collection_name=collection_name,
+        vectors_config=storage.vectors_config(vector_size),
+        sparse_vectors_config=storage.sparse_vectors_config(),
+        hnsw_config=storage.hnsw_config(),
+        quantization_config=storage.quantization_config(),
+        on_disk_payload=storage.on_disk_payload,
+    )
+
+
+def reconfigure_collection(qdrant, collection_name, storage):
+    """
+    Applies a StorageConfig to an existing collection; Qdrant rebuilds indexes in the background.
+
+    Payload storage cannot be moved after creation, so on_disk_payload is left as it is.
+    """
+    qdrant.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": models.VectorParamsDiff(on_disk=storage.on_disk_vectors)},
+        hnsw_config=storage.hnsw_config(),
+        quantization_config=storage.quantization_config() or models.Disabled.DISABLED,
+    )
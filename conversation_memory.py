@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+DEFAULT_STORE_PATH = ".brambot/sessions.sqlite3"
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and BramBot. "
+    "Update the summary with the new messages. Keep facts, names, numbers, open questions and "
+    "what has already been answered; drop small talk. Reply with the updated summary only, "
+    "in at most {max_words} words."
+)
+
+# Summaries are written on background threads so answering never waits for them
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about 4 characters per token) used for the history budget."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class MemoryConfig:
+    """
+    Parameters:
+        max_history_tokens (int): Budget for raw recent messages; older ones are folded into the summary.
+        max_summary_words (int): Length the rolling summary is kept under.
+        render_last (int): Messages rendered per page of the chat; older ones load on request.
+        max_display_messages (int): Messages kept in memory for the chat view when persist is off,
+            independent of the prompt budget; with persist on the store serves the chat view.
+        max_unsummarized (int): Most messages waiting for a summary; if summarizing keeps failing,
+            the oldest are dropped from the prompt history instead of being retried forever.
+        persist (bool): Store sessions in a local SQLite file so they survive restarts.
+        store_path (str): SQLite file used when persist is on.
+    """
+    max_history_tokens: int = 1500
+    max_summary_words: int = 200
+    render_last: int = 20
+    max_display_messages: int = 500
+    max_unsummarized: int = 100
+    persist: bool = False
+    store_path: str = DEFAULT_STORE_PATH
+
+
+class SessionStore:
+    """SQLite store for session messages and summaries, shared by all sessions of the process."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS messages (session_id TEXT, seq INTEGER, role TEXT, content TEXT, "
+                "created REAL, PRIMARY KEY (session_id, seq))"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS summaries (session_id TEXT PRIMARY KEY, summary TEXT, covered INTEGER)")
+
+    def append(self, session_id, seq, role, content):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)", (session_id, seq, role, content, time.time())
+            )
+
+    def save_summary(self, session_id, summary, covered):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (session_id, summary, covered))
+
+    def load(self, session_id):
+        """Returns (summary, covered, message_count) for a session."""
+        with self._lock:
+            row = self._db.execute("SELECT summary, covered FROM summaries WHERE session_id = ?", (session_id,)).fetchone()
+            count = self._db.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+        summary, covered = row or ("", 0)
+        return summary, covered, count
+
+    def messages(self, session_id, start, stop):
+        """Messages with start <= seq < stop, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, stop),
+            ).fetchall()
+        return [{"seq": seq, "role": role, "content": content} for seq, role, content in rows]
+
+    def delete_message(self, session_id, seq):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages WHERE session_id = ? AND seq = ?", (session_id, seq))
+
+    def delete(self, session_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(path=DEFAULT_STORE_PATH):
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SessionStore(path)
+        return _stores[path]
+
+
+def llm_summarizer(llm, max_words=200):
+    """Summarizer that asks the crew's LLM to fold new messages into the previous summary."""
+    def summarize(summary, messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        return llm.call([
+            {"role": "system", "content": SUMMARY_PROMPT.format(max_words=max_words)},
+            {"role": "user", "content": f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{transcript}"},
+        ])
+    return summarize
+
+
+class ConversationMemory:
+    """
+    Chat history with bounded memory: recent messages verbatim, everything older as a summary.
+
+    Raw messages are kept while they fit in max_history_tokens. Older messages move to an
+    unsummarized queue and a background thread folds them into the rolling summary, so the
+    summary is updated incrementally and never on the answer's critical path. Until a fold
+    finishes, its messages still appear verbatim in context(). The chat view is kept apart from
+    the prompt history: without a store the last max_display_messages stay renderable after
+    they were folded into the summary.
+
+    Parameters:
+        session_id (str): Identifies the session in the store.
+        config (MemoryConfig): Budgets and persistence settings.
+        store (SessionStore): Where messages and summaries are persisted; None keeps them in memory only.
+        summarize (callable): (summary, messages) -> new summary; without one, folded messages are dropped.
+    """
+
+    def __init__(self, session_id=None, config=None, store=None, summarize=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.config = config or MemoryConfig()
+        self.store = store
+        self.summarize = summarize
+        self.summary = ""
+        self.count = 0  # Messages ever added to this session
+        self._recent = deque()  # Messages within the raw history budget
+        self._recent_tokens = 0
+        self._unsummarized = deque()  # Messages waiting to be folded into the summary
+        self._display = None if store else deque(maxlen=self.config.max_display_messages)
+        self._folding = None
+        self._generation = 0  # Bumped by clear() so a fold that was running is discarded
+        self._lock = threading.Lock()
+        if store:
+            self._restore()
+
+    def _restore(self):
+        summary, covered, count = self.store.load(self.session_id)
+        self.summary, self.count = summary, count
+        # Folding waits for the next add(), when the caller has attached a summarizer
+        for message in self.store.messages(self.session_id, covered, count):
+            self._push(message)
+
+    def _push(self, message):
+        # Called with the lock held (or during construction)
+        message["tokens"] = estimate_tokens(message["content"])
+        self._recent.append(message)
+        self._recent_tokens += message["tokens"]
+        # Always keep the latest exchange verbatim, however long it is
+        while self._recent_tokens > self.config.max_history_tokens and len(self._recent) > 2:
+            oldest = self._recent.popleft()
+            self._recent_tokens -= oldest["tokens"]
+            self._unsummarized.append(oldest)
+        while len(self._unsummarized) > self.config.max_unsummarized:
+            self._unsummarized.popleft()
+
+    def add(self, role, content):
+        """Appends a message; returns its sequence number."""
+        with self._lock:
+            message = {"seq": self.count, "role": role, "content": content}
+            self.count += 1
+            self._push(message)
+            if self._display is not None:
+                self._display.append(message)
+        if self.store:
+            self.store.append(self.session_id, message["seq"], role, content)
+        self._schedule_fold()
+        return message["seq"]
+
+    def remove_last(self, seq):
+        """
+        Takes back the latest message if it is still `seq`, e.g. a question that could not be queued.
+        Returns False when other messages were added since.
+        """
+        with self._lock:
+            if self.count != seq + 1 or not self._recent or self._recent[-1]["seq"] != seq:
+                return False
+            message = self._recent.pop()
+            self._recent_tokens -= message["tokens"]
+            self.count -= 1
+            if self._display:
+                self._display.pop()
+        if self.store:
+            self.store.delete_message(self.session_id, seq)
+        return True
+
+    def _schedule_fold(self):
+        with self._lock:
+            if self._folding is not None or not self._unsummarized:
+                return
+            if self.summarize is None:
+                self._unsummarized.clear()
+                return
+            batch = list(self._unsummarized)
+            self._folding = _summary_pool.submit(self._fold, self.summary, batch, self._generation)
+
+    def _fold(self, summary, batch, generation):
+        try:
+            new_summary = self.summarize(summary, batch)
+        except Exception:
+            # Keep the messages queued; the next fold retries them, up to max_unsummarized
+            with self._lock:
+                self._folding = None
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._folding = None
+                return
+            self.summary = new_summary
+            covered = batch[-1]["seq"] + 1
+            # Part of the batch may already have been dropped by the max_unsummarized cap
+            while self._unsummarized and self._unsummarized[0]["seq"] < covered:
+                self._unsummarized.popleft()
+            self._folding = None
+        if self.store:
+            self.store.save_summary(self.session_id, new_summary, covered)
+        self._schedule_fold()
+
+    def context(self):
+        """History text for prompts: the rolling summary plus the messages not yet summarized."""
+        with self._lock:
+            messages = list(self._unsummarized) + list(self._recent)
+            summary = self.summary
+        parts = []
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if messages:
+            parts.append("Recent messages:\n" + "\n".join(f"{m['role']}: {m['content']}" for m in messages))
+        return "\n\n".join(parts)
+
+    def window(self, limit):
+        """
+        The latest `limit` messages for rendering, oldest first, so long chats are not re-rendered in full.
+
+        Returns (messages, older): older is how many earlier messages can still be loaded. Without a
+        store, only the last max_display_messages are kept and counted.
+        """
+        if self.store:
+            start = max(0, self.count - limit)
+            return self.store.messages(self.session_id, start, self.count), start
+        with self._lock:
+            retained = list(self._display)
+        return retained[-limit:], max(0, len(retained) - limit)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._folding = None
+            self.summary = ""
+            self.count = 0
+            self._recent.clear()
+            self._recent_tokens = 0
+            self._unsummarized.clear()
+            if self._display is not None:
+                self._display.clear()
+        if self.store:
+            self.store.delete(self.session_id)
+
+    def wait(self, timeout=None):
+        """Blocks until pending summary updates are done (for scripts and shutdown)."""
+        while True:
+            with self._lock:
+                folding = self._folding
+            if folding is None:
+                return
+            folding.result(timeout)
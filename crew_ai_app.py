@@ -1,229 +1,483 @@
 import streamlit as st
-import os
-from qdrant_client import QdrantClient
-from crewai import Agent, Task, Crew, LLM
-from crewai_tools import EXASearchTool
-from sentence_transformers import SentenceTransformer
+import time
+import uuid
+from crewai import Task, Crew
+from conversation_memory import ConversationMemory, MemoryConfig, get_session_store, llm_summarizer
+from crew_factory import CrewFactory
+from task_graph import StageTiming, TaskGraph, build_context, run_sequential, task_dependencies, task_name
+from router import PATH_CACHE, PATH_DIRECT, QueryRouter, RouteDecision, RouterStats, direct_messages
+from semantic_cache import cache_namespace, get_semantic_cache
+from streaming import TimedStream, stage_label, stream_chat, task_messages
+from embedding_service import get_embedding_model
+from index_manifest import get_manifest, manifest_section
+from job_queue import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JOB_QUEUED, QueueFull, get_job_queue
+from qdrant_pool import get_qdrant_client
+from retrieval import Retriever, format_context, list_sources
+from telemetry import count, current_span, get_telemetry, span, traced
 
-def run_crew_ai_app(api_key, model_config, qdrant_key, qdrant_url, use_docs, use_internet, exa_api_key):
-    """
-    Runs the Crew AI application integrated with Groq and Qdrant.
+def queue_user_message():
+    """Chat input callback; runs exactly once per submit and gives the message a unique id."""
+    content = st.session_state.get("chat_input")
+    if content:
+        st.session_state.message_seq = st.session_state.get("message_seq", 0) + 1
+        st.session_state.pending_message = {"id": st.session_state.message_seq, "content": content}
 
-    Parameters:
-        api_key (str): Groq API key for model access.
-        qdrant_key (str): Qdrant API key.
-        qdrant_url (str): URL for Qdrant service.
-        openai_key (str): OpenAI API key (if needed).
-    """
-    try:
-        # Set up API keys
-        os.environ[model_config["api_key_env"]] = api_key
-        os.environ["EXA_API_KEY"] = exa_api_key
 
-        if use_docs:
-            qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_key)
+def session_memory(config):
+    """This session's ConversationMemory; persisted sessions are found again through the ?session= URL parameter."""
+    session_id = st.query_params.get("session")
+    if not session_id:
+        session_id = uuid.uuid4().hex
+        st.query_params["session"] = session_id
+    memory = st.session_state.get("memory")
+    store = get_session_store(config.store_path) if config.persist else None
+    if memory is None or memory.session_id != session_id or memory.store is not store:
+        memory = ConversationMemory(session_id, config, store)
+        st.session_state.memory = memory
+    memory.config = config
+    return memory
 
-        MessageList = st.session_state.messages
 
+def show_more_history():
+    st.session_state.history_shown += st.session_state.memory.config.render_last
 
-        ST_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
 
-        SumHistory = ""
+def render_history(memory):
+    """Renders only the latest messages; older ones are loaded a page at a time on request."""
+    if "history_shown" not in st.session_state:
+        st.session_state.history_shown = memory.config.render_last
+    messages, older = memory.window(st.session_state.history_shown)
+    if older:
+        st.button(f"Show earlier messages ({older} more)", on_click=show_more_history)
+    elif memory.count > len(messages):
+        st.caption(f"{memory.count - len(messages)} earlier messages are kept as a summary.")
+    for message in messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
-        llm = LLM(
-            model=model_config["model"],
-            base_url=model_config["base_url"],
-            temperature=0.5,
-        )
 
-        # Define agents with Groq LLM
-        Question_Identifier = Agent(
-            role='Question_Identifier_Agent',
-            goal="Identify and refine the user's question.",
-            backstory="A friendly and curious expert who loves unraveling what users really mean.",
-            verbose=False,
-            allow_delegation=False,
-            llm=llm,
+def stream_answer(llm, model_config, api_key, messages):
+    """Streams through the LLM gateway when the agent's LLM is routed by it, else straight from the selected provider."""
+    if hasattr(llm, "stream_text"):
+        return llm.stream_text(messages)
+    return stream_chat(model_config, api_key, messages)
+
+
+def with_history(description, history):
+    return f"{description}\n\nConversation so far:\n{history}" if history else description
+
+
+def build_tasks(crew_agents, user_input, relevant_context, history, use_docs, use_internet):
+    """
+    Builds the tasks for one question. Dependencies are declared with `context=[...]`,
+    so both a sequential Crew and the parallel TaskGraph feed each task the outputs it needs.
+    The last task in the returned list produces the answer shown to the user. The conversation
+    history comes from ConversationMemory, whose summary is kept up to date in the background.
+
+    Returns:
+        (list[Agent], list[Task]): Agents taking part and tasks in dependency order.
+    """
+    Question_Identifier = crew_agents.Question_Identifier
+    Question_Solving = crew_agents.Question_Solving
+    Context_Filter = crew_agents.Context_Filter
+    BramBot = crew_agents.BramBot
+    Internet_Search = crew_agents.Internet_Search
+
+    task_define_problem = Task(
+        name="Refine question",
+        description=with_history(f"Clarify and define the question: {user_input}", history),
+        expected_output="A clear and conversational understanding of what the user is asking, rephrased in a way that's easy to follow.",
+        agent=Question_Identifier
+    )
+
+    if use_docs:
+        # Only needs the raw question and retrieved chunks, so it runs alongside the refinement
+        Task_Filter_Context = Task(
+            name="Filter context",
+            description=f"Filter the context for the parts useful to the user's question: {user_input}\nContext:\n{relevant_context}",
+            expected_output="A refined selection of the most relevant and useful information to help answer the user's question effectively, and add the source of where this information came from.",
+            agent=Context_Filter
         )
 
-        Question_Solving = Agent(
-            role='Question_Solving_Agent',
-            goal="Provide a detailed answer to the user's question.",
-            backstory="Expert in problem-solving.",
-            verbose=False,
-            allow_delegation=False,
-            llm=llm,
+    # Pick exactly one pipeline per message; internet search takes the filtered document context along
+    if use_internet:
+        context = [task_define_problem]
+        if use_docs:
+            context.append(Task_Filter_Context)
+        task_answer_question_internet = Task(
+            name="Search internet",
+            description=with_history(f"Answer the user's question using an internet search, you always try to use the most recent information you can find online. Also return the sources where you have found this information, this is a link of the article where you found the information from. Pass a few differently worded queries to the search tool in one call. User's question: {user_input}", history),
+            context=context,
+            expected_output="A thoughtful, detailed, and easy-to-understand answer that directly addresses the user's question, incorporating any available context from the article that you found and link of that used article.",
+            agent=Internet_Search
+        )
+        task_summarize_question_internet = Task(
+            name="Summarize answer",
+            description="Summarize the full answer in a clear manner, ensuring that any sources included are directly from the provided search results.",
+            context=[task_answer_question_internet],
+            expected_output="A clear summarization of the answer, with only verified links included.",
+            agent=BramBot
         )
 
-        Context_Filter = Agent(
-            role='Context_Filter_Agent',
-            goal="Filter the given context for only parts usefull to the user's question.",
-            backstory="Expert in filtering and understanding user questions.",
-            verbose=True,
-            allow_delegation=False,
-            llm=llm,
+        agents = [Question_Identifier, Internet_Search, BramBot]
+        tasks = [task_define_problem]
+        if use_docs:
+            agents.insert(1, Context_Filter)
+            tasks.append(Task_Filter_Context)
+        tasks += [task_answer_question_internet, task_summarize_question_internet]
+        return agents, tasks
+
+    if use_docs:
+        task_answer_context_question = Task(
+            name="Answer from documents",
+            description=with_history(f"Answer the user's question with full context and source, if no context fill in yourself. User's question: \n{user_input}", history),
+            context=[Task_Filter_Context, task_define_problem],
+            expected_output="A thoughtful, detailed, and easy-to-understand answer that directly addresses the user's question, incorporating any available context and source.",
+            agent=Question_Solving
         )
 
-        BramBot = Agent(
-            role='Summarizing_Agent',
-            goal="Summarize the solved question in a conversational, user-friendly manner.",
-            backstory="A cheerful assistant who enjoys explaining things clearly and helping others learn.",
-            verbose=False,
-            allow_delegation=False,
-            llm=llm,
+        agents = [Question_Identifier, Context_Filter, Question_Solving]
+        tasks = [task_define_problem, Task_Filter_Context, task_answer_context_question]
+        return agents, tasks
+
+    task_answer_question = Task(
+        name="Answer question",
+        description=with_history(f"A thoughtful, detailed, and easy-to-understand answer that directly addresses the question. User Question: \n{user_input}", history),
+        context=[task_define_problem],
+        expected_output="A concise and accurate answer to the user's query, unless the query requires detailed explanation.",
+        agent=Question_Solving
+    )
+
+    task_summarize_question = Task(
+        name="Summarize answer",
+        description=f"SLightly summarize the answer so it answers the question in a full manner. User Question: \n{user_input}",
+        context=[task_answer_question, task_define_problem],
+        expected_output="A concise, conversational summary of the answer that makes it easy for the user to understand the key points. ",
+        agent=BramBot
+    )
+
+    agents = [Question_Identifier, Question_Solving, BramBot]
+    tasks = [task_define_problem, task_answer_question, task_summarize_question]
+    return agents, tasks
+
+
+def stream_into(job, tokens):
+    """Copies streamed tokens into the job for the UI to poll, stopping when the job is cancelled."""
+    tokens = iter(tokens)
+    try:
+        for token in tokens:
+            job.check_cancelled()
+            job.write(token)
+    finally:
+        # Ends the LLM stream (and its HTTP response) right away when the job was cancelled mid-answer
+        tokens.close()
+    job.check_cancelled()
+
+
+@traced("question")
+def answer_question(job, user_input, history, memory, crew_agents, model_config, api_key, embedding_model,
+                    retriever, selected_sources, use_docs, use_internet, execution_mode, router_config,
+                    use_cache, router_stats):
+    """
+    Answers one question on a JobQueue worker: embedding, cache, routing, retrieval and the crew.
+
+    Runs outside the Streamlit script, so it reports progress through the job instead of
+    st.* calls and stores the answer in the conversation memory itself; a rerun or closed
+    tab no longer loses it. Checks for cancellation between stages and while streaming.
+
+    Returns:
+        dict: The answer, its caption, the optional latency breakdown and the trace id.
+    """
+    llm = crew_agents.llm
+    message_start = time.perf_counter()
+    question_span = current_span()
+    question_span.set(session=job.user, docs=use_docs, internet=use_internet, mode=execution_mode)
+    job.update(label="Thinking...")
+
+    # Step 1: Embed Query Using Groq
+    with span("embed", texts=1):
+        query_vector = embedding_model.encode(user_input)
+    job.check_cancelled()
+
+    # Reuse the answer to a near-identical earlier question with the same model, toggles and documents.
+    # Only for a conversation's first question: a follow-up means something else in every conversation
+    cache = get_semantic_cache() if use_cache and not history else None
+    if cache and use_docs:
+        # The manifest's document versions change when any document is added, replaced or removed;
+        # documents it does not know have no version, so their answers are not cached
+        section = manifest_section(retriever.collection_name, retriever.index_key)
+        document_set = get_manifest().version(section, selected_sources)
+        namespace = cache_namespace(model_config, use_docs, use_internet, section, document_set)
+        if document_set is None:
+            cache = None
+    elif cache:
+        namespace = cache_namespace(model_config, use_docs, use_internet)
+    if cache:
+        with span("semantic_cache.lookup") as lookup_span:
+            hit = cache.lookup(namespace, query_vector)
+            lookup_span.set(hit=bool(hit))
+        if hit:
+            latency = time.perf_counter() - message_start
+            router_stats.record(RouteDecision(PATH_CACHE, "similar question"), latency, latency)
+            question_span.set(route=PATH_CACHE)
+            count("questions", path=PATH_CACHE)
+            job.update(label="Answered from cache")
+            job.write(hit.answer)
+            memory.add("assistant", hit.answer)
+            return {
+                "answer": hit.answer,
+                "caption": f"Route: {PATH_CACHE} (similar to \"{hit.question}\", similarity {hit.similarity:.2f}), {latency:.1f}s",
+                "trace_id": question_span.trace_id,
+            }
+
+    # Step 2: Route first; easy questions get one direct LLM call and need no retrieval
+    decision = QueryRouter(router_config).route(user_input, use_docs, use_internet)
+    question_span.set(route=decision.path)
+    count("questions", path=decision.path)
+
+    if decision.path == PATH_DIRECT:
+        job.update(label="Answering directly")
+        stream = TimedStream(
+            stream_answer(llm, model_config, api_key, direct_messages(user_input, history)),
+            started=message_start,
         )
+        stream_into(job, stream)
+        router_stats.record(decision, stream.total, stream.ttft)
+        memory.add("assistant", stream.text)
+        if cache:
+            cache.store(namespace, query_vector, user_input, stream.text)
+        return {
+            "answer": stream.text,
+            "caption": f"Route: {decision.path} ({decision.reason}), first token {stream.ttft or 0:.1f}s, total {stream.total:.1f}s",
+            "trace_id": question_span.trace_id,
+        }
+
+    # Step 3: Query Qdrant for Context, only for the crew
+    if use_docs:
+        job.update(label="Retrieving documents...")
+        with span("retrieve", top_k=retriever.config.top_k, sources=len(selected_sources)) as retrieve_span:
+            retrieved = retriever.retrieve(user_input, query_vector, sources=selected_sources)
+            retrieve_span.set(chunks=len(retrieved.chunks), skipped=", ".join(retrieved.skipped))
+        relevant_context = format_context(retrieved.chunks)
+        skipped = f", skipped {', '.join(retrieved.skipped)}" if retrieved.skipped else ""
+        job.update(line=f"Retrieved {len(retrieved.chunks)} document chunks in {retrieved.timings['total']:.0f} ms{skipped}")
+        job.check_cancelled()
+    else:
+        relevant_context = "No relevant context found."
+
+    # Step 4: Define Crew Tasks
+    agents, tasks = build_tasks(crew_agents, user_input, relevant_context, history, use_docs, use_internet)
+    final_task = tasks[-1]
 
-        internet_search_tool = EXASearchTool(n_results=5)
+    # Step 5: Run every stage except the last; the last one is streamed token by token
+    def stage_started(name):
+        job.check_cancelled()
+        job.update(label=f"{stage_label(name)}...")
 
-        Internet_Search = Agent(
-            role='Internet_Searching_Agent',
-            goal="search the internet for answers, relevant to the question",
-            backstory="You are a helpful assistant that will search the internet for an answer to the given question",
+    def stage_finished(name, output):
+        job.update(line=f"Done: {stage_label(name)}")
+        job.check_cancelled()
+
+    if execution_mode == "parallel":
+        # Independent branches (refining the question, filtering the documents) run at the same time
+        result = TaskGraph(tasks[:-1]).run(on_stage_start=stage_started, on_stage_end=stage_finished)
+    else:
+        crew = Crew(
+            agents=agents,
+            tasks=tasks[:-1],
             verbose=False,
-            allow_delegation=False,
-            llm=llm,
-            tools=[internet_search_tool]
+            memory=False,
+            llm=llm
         )
+        job.update(label="Running the agents...")
+        result = run_sequential(crew, on_stage_end=stage_finished)
+        job.check_cancelled()
 
-        # Chat input and history
-        user_input = st.chat_input("What do you want to ask the bot?")
-        if "messages" not in st.session_state:
-            st.session_state.messages = []  # Initialize chat history
-        
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
-
-        
-        if len(st.session_state.messages) >= 2:
-            # The last message should be user input, and the second to last should be the bot's response
-            last_user_message = st.session_state.messages[-2]["content"]
-            last_bot_message = st.session_state.messages[-1]["content"]
-            SumHistory += "\n" + last_user_message + "\n" + last_bot_message
-        else:
-            SumHistory = ""
-            
-        if user_input:
-            st.session_state.messages.append({"role": "user", "content": user_input})
-            with st.chat_message("user"):
-                st.write(user_input)
+    job.update(label=f"{stage_label(task_name(final_task))}...")
+    final_start = time.perf_counter()
+    stream = TimedStream(
+        stream_answer(final_task.agent.llm, model_config, api_key, task_messages(final_task, build_context(final_task, result.outputs))),
+        started=message_start,
+    )
+    stream_into(job, stream)
 
-            # Step 1: Embed Query Using Groq
-            query_vector = ST_model.encode(user_input)
+    result.timings.append(StageTiming(
+        name=task_name(final_task),
+        agent=final_task.agent.role,
+        started=result.total,
+        duration=time.perf_counter() - final_start,
+        depends_on=[task_name(d) for d in task_dependencies(final_task)],
+    ))
+    result.total = stream.total
+    router_stats.record(decision, stream.total, stream.ttft)
 
-            # Step 2: Query Qdrant for Context
+    # Step 6: Update Chat
+    memory.add("assistant", stream.text)
+    if cache:
+        cache.store(namespace, query_vector, user_input, stream.text)
+    return {
+        "answer": stream.text,
+        "caption": f"Route: {decision.path} ({decision.reason}), first token {stream.ttft or 0:.1f}s, total {stream.total:.1f}s",
+        "breakdown_title": f"Latency breakdown ({execution_mode}): {result.total:.1f}s",
+        "breakdown": result.breakdown(),
+        "trace_id": question_span.trace_id,
+    }
 
-            if use_docs:
-                results = qdrant_client.search(
-                  collection_name="pdf_chunks",
-                  query_vector=query_vector,
-                  limit=5
-                )
-                relevant_context = "\n".join(f"Source: {res.payload['Source']}\nText: {res.payload['text']}" for res in results)
 
-                if not results:
-                    relevant_context = "No relevant context found."
-            else:
-                relevant_context = "No relevant context found."
+def render_active_job(job_queue):
+    """
+    Polled fragment showing the running question's progress and streamed answer.
+    Once the job finishes the whole app reruns, so the answer appears in the history.
+    """
+    job = st.session_state.get("active_job")
+    if job is None:
+        return
+    if job.done:
+        st.session_state.active_job = None
+        st.session_state.finished_job = job
+        st.rerun()
+    status, label, lines, text = job.snapshot()
+    if status == JOB_QUEUED:
+        label = f"Waiting for a free worker ({job_queue.position(job)} ahead)..."
+    with st.chat_message("assistant"):
+        with st.status(label, expanded=False):
+            for line in lines:
+                st.write(line)
+        if text:
+            st.markdown(text)
+        st.button("Cancel", on_click=job_queue.cancel, args=(job.id,), key=f"cancel_{job.id}", disabled=job.cancelled)
 
-            # Step 3: Define Crew Tasks
-            task_define_problem = Task(
-                description=f"Clarify and define the question: {user_input}",
-                expected_output="A clear and conversational understanding of what the user is asking, rephrased in a way that's easy to follow.",
-                agent=Question_Identifier
-            )
 
-            Task_Summarize_Session= Task(
-                description=f"Summarize the session in a clear manner based on the question asked: \n{user_input} \n previous chat history: \n{SumHistory}",
-                input=task_define_problem.output,
-                expected_output="A friendly recap of the discussion so far, highlighting the key points and what has been addressed.",
-                agent=BramBot
-            )
-            
-            
-            if use_docs:
-                Task_Filter_Context = Task(
-                    description=f"Filter the context:\n{relevant_context}",
-                    input=task_define_problem.output,
-                    expected_output="A refined selection of the most relevant and useful information to help answer the user's question effectively, and add the source of where this information came from.",
-                    agent=Context_Filter
-                )
-                task_answer_context_question = Task(
-                    description=f"Answer the user's question with full context and source, if no context fill in yourself. User's question: \n{task_define_problem.output}",
-                    input=(Task_Filter_Context.output, Task_Summarize_Session.output, task_define_problem.output),
-                    expected_output="A thoughtful, detailed, and easy-to-understand answer that directly addresses the user's question, incorporating any available context and source.",
-                    agent=Question_Solving
-                )
-            
-            if use_internet:               
-                task_answer_question_internet = Task(
-                    description=f"Answer the user's question using an internet search, you always try to use the most recent information you can find online. Also return the sources where you have found this information, this is a link of the article where you found the information from. User's question: {task_define_problem.output}",
-                    input=(Task_Summarize_Session.output, task_define_problem.output),
-                    expected_output="A thoughtful, detailed, and easy-to-understand answer that directly addresses the user's question, incorporating any available context from the article that you found and link of that used article.",
-                    agent=Internet_Search
-                )
-                task_summarize_question_internet = Task(
-                    description="Summarize the full answer in a clear manner, ensuring that any sources included are directly from the provided search results.",
-                    input=task_answer_question_internet.output,
-                    expected_output="A clear summarization of the answer, with only verified links included.",
-                    agent=BramBot
-                )
+def render_finished_job(job, show_trace=False):
+    """Caption, latency breakdown (and trace) or error of the last question, shown under its answer."""
+    if job.status == JOB_DONE and job.result:
+        st.caption(job.result["caption"])
+        if job.result.get("breakdown"):
+            with st.expander(job.result["breakdown_title"]):
+                st.table(job.result["breakdown"])
+        trace = get_telemetry().trace_breakdown(job.result["trace_id"]) if show_trace else []
+        if trace:
+            with st.expander(f"Trace ({len(trace)} spans)"):
+                st.table(trace)
+    elif job.status == JOB_FAILED:
+        st.error(f"Error in Crew AI application: {job.error}")
+    elif job.status == JOB_CANCELLED:
+        st.info("Question cancelled.")
+
 
-            task_answer_question = Task(
-                description=f"A thoughtful, detailed, and easy-to-understand answer that directly addresses the question.",
-                input=task_define_problem.output,
-                expected_output="A concise and accurate answer to the user's query, unless the query requires detailed explanation.",
-                agent=Question_Solving
+def run_crew_ai_app(api_key, model_config, qdrant_key, qdrant_url, use_docs, use_internet, exa_api_key, execution_mode="parallel", router_config=None, use_cache=False, retrieval_config=None, memory_config=None, gateway=None, gateway_config=None, show_trace=False):
+    """
+    Runs the Crew AI application integrated with Groq and Qdrant.
+
+    Questions are answered by answer_question() on the shared background JobQueue; this
+    script run only submits them and polls their progress, so widget interaction and
+    reruns never interrupt an answer.
+
+    Parameters:
+        api_key (str): Groq API key for model access.
+        qdrant_key (str): Qdrant API key.
+        qdrant_url (str): URL for Qdrant service.
+        openai_key (str): OpenAI API key (if needed).
+        execution_mode (str): "parallel" runs independent tasks concurrently, "sequential" uses Crew.kickoff().
+        router_config (RouterConfig): Fast path settings; defaults to RouterConfig().
+        use_cache (bool): Reuse answers from the shared semantic cache, whose settings come from the environment.
+        retrieval_config (RetrievalConfig): Hybrid retrieval settings; defaults to RetrievalConfig().
+        memory_config (MemoryConfig): Conversation memory budgets and persistence; defaults to MemoryConfig().
+        gateway (LLMGateway): Shared rate limiting and stats; direct provider calls when None.
+        gateway_config (GatewayConfig): This session's per-role models, fallbacks and retries.
+        show_trace (bool): Show each answer's trace under it.
+    """
+    try:
+        # Keys are passed to the clients explicitly; questions run on shared worker threads,
+        # so nothing per-session may go through os.environ
+        retriever, selected_sources = None, []
+        if use_docs:
+            # Pooled per URL and key, so reruns reuse the open connection
+            qdrant_client = get_qdrant_client(qdrant_url, qdrant_key)
+            retriever = Retriever(qdrant_client, "pdf_chunks", index_key=qdrant_url, config=retrieval_config)
+            # Restrict retrieval to some documents; nothing selected searches all of them
+            selected_sources = st.sidebar.multiselect(
+                "Search only in documents", list_sources(qdrant_client, "pdf_chunks"), key="source_filter"
             )
-            
-            task_summarize_question = Task(
-                description=f"SLightly summarize the answer so it answers the question in a full manner. User Question: \n{user_input}",
-                input=(task_answer_question.output, task_define_problem.output),
-                expected_output="A concise, conversational summary of the answer that makes it easy for the user to understand the key points. ",
-                agent=BramBot
-            )   
-                
-            # Step 4: Create and Run Crew
-            if use_docs:
-                agents = [Question_Identifier, Context_Filter, Question_Solving, BramBot]
-                tasks = [
-                    task_define_problem,
-                    Task_Summarize_Session,
-                    Task_Filter_Context,
-                    task_summarize_question,
-                    task_answer_context_question
-                ]
-            if use_internet:
-                agents = [Question_Identifier, Internet_Search, Question_Solving, BramBot ]
-                tasks = [
-                    task_define_problem,
-                    Task_Summarize_Session,
-                    task_summarize_question_internet,
-                    task_answer_question_internet
-                ]
+
+        # Shared across reruns and sessions, loaded once per process
+        ST_model = get_embedding_model()
+        job_queue = get_job_queue()
+
+        # LLM client, agents and tools are built once per session and configuration
+        if "crew_factory" not in st.session_state:
+            st.session_state.crew_factory = CrewFactory()
+        crew_agents = st.session_state.crew_factory.get_agents(
+            model_config, api_key, use_docs, use_internet, exa_api_key, gateway, gateway_config
+        )
+
+        llm = crew_agents.llm
+
+        # Bounded history: recent messages verbatim, older ones folded into a summary in the background
+        memory = session_memory(memory_config or MemoryConfig())
+        memory.summarize = llm_summarizer(llm, memory.config.max_summary_words)
+
+        if "router_stats" not in st.session_state:
+            st.session_state.router_stats = RouterStats()
+
+        # A reload or reopened tab picks up the question this session was waiting for, by the ?job= id
+        if "active_job" not in st.session_state:
+            job = job_queue.get(st.query_params.get("job", ""))
+            if job is not None and job.user == memory.session_id:
+                st.session_state.active_job = None if job.done else job
+                st.session_state.finished_job = job if job.done else None
+
+        # Idempotency guard: each submitted message is answered at most once, whatever reruns happen
+        user_input = None
+        pending = st.session_state.get("pending_message")
+        if pending and pending["id"] != st.session_state.get("handled_message_id"):
+            st.session_state.handled_message_id = pending["id"]  # Mark before running so a rerun mid-flight can't resubmit
+            user_input = pending["content"]
+
+        if user_input:
+            # Taken before the question is added, so prompts see the history and the question separately
+            history = memory.context()
+            # Added before submitting, so the answer the job adds can never come first
+            question_seq = memory.add("user", user_input)
+            try:
+                job = job_queue.submit(
+                    memory.session_id, answer_question,
+                    user_input=user_input,
+                    history=history,
+                    memory=memory,
+                    crew_agents=crew_agents,
+                    model_config=model_config,
+                    api_key=api_key,
+                    embedding_model=ST_model,
+                    retriever=retriever,
+                    selected_sources=selected_sources,
+                    use_docs=use_docs,
+                    use_internet=use_internet,
+                    execution_mode=execution_mode,
+                    router_config=router_config,
+                    use_cache=use_cache,
+                    router_stats=st.session_state.router_stats,
+                )
+            except QueueFull as e:
+                # Not kept in the history or later prompts, since it gets no answer
+                memory.remove_last(question_seq)
+                st.warning(f"Not answered: {e}")
             else:
-                agents = [Question_Identifier, Question_Solving, BramBot,]
-                tasks = [
-                    task_define_problem,
-                    Task_Summarize_Session,
-                    task_summarize_question,
-                    task_answer_question
-                ]
-            crew = Crew(
-                agents=agents,
-                tasks=tasks,
-                verbose=False,
-                memory=False,
-                llm=llm
-            )
-            result = crew.kickoff()
+                st.session_state.active_job = job
+                st.session_state.finished_job = None
+                st.query_params["job"] = job.id
+
+        # Chat input (pinned to the bottom) and history; one question per session is answered at a time
+        st.chat_input(
+            "What do you want to ask the bot?", key="chat_input", on_submit=queue_user_message,
+            disabled=st.session_state.get("active_job") is not None,
+        )
+        render_history(memory)
 
-            # Step 5: Display Results and Update Chat
-            st.session_state.messages.append({"role": "assistant", "content": result.raw})
-            with st.chat_message("assistant"):
-                st.write(result.raw)
+        if st.session_state.get("finished_job") is not None:
+            render_finished_job(st.session_state.finished_job, show_trace=show_trace)
+        if st.session_state.get("active_job") is not None:
+            st.fragment(render_active_job, run_every=job_queue.config.poll_seconds)(job_queue)
 
-            SumHistory = Task_Summarize_Session.output
- 
     except Exception as e:
         st.error(f"Error in Crew AI application: {e}")
@@ -0,0 +1,169 @@
+import threading
+from dataclasses import dataclass
+
+from crewai import Agent, LLM
+
+from llm_gateway import ROLES, GatewayConfig, GatewayLLM
+from web_search import CachedWebSearchTool, get_web_search
+
+
+@dataclass
+class CrewAgents:
+    """The LLM client and agents shared by every question asked with one configuration."""
+    llm: LLM
+    Question_Identifier: Agent
+    Question_Solving: Agent
+    Context_Filter: Agent
+    BramBot: Agent
+    Internet_Search: Agent = None
+
+
+def build_llm(model_config, api_key):
+    """Creates the Groq LLM client for a MODEL_PROVIDERS entry."""
+    return LLM(
+        model=model_config["model"],
+        base_url=model_config["base_url"],
+        api_key=api_key,
+        temperature=0.5,
+    )
+
+
+def build_gateway_llm(gateway, provider_name, api_keys, gateway_config):
+    """LLM client that sends calls for a MODEL_PROVIDERS entry through the LLMGateway with this session's keys and policy."""
+    return GatewayLLM(
+        model=gateway.providers[provider_name]["model"],
+        gateway=gateway,
+        provider_name=provider_name,
+        api_keys=api_keys,
+        gateway_config=gateway_config,
+        temperature=0.5,
+    )
+
+
+def build_agents(model_config, api_key, use_internet, exa_api_key=None, gateway=None, gateway_config=None):
+    """
+    Builds the LLM client and all agents for one configuration.
+
+    Parameters:
+        model_config (dict): Entry from MODEL_PROVIDERS.
+        api_key (str): Groq API key for model access.
+        use_internet (bool): Whether the Internet_Search agent and its Exa tool are needed.
+        exa_api_key (str): Exa API key, falls back to the EXA_API_KEY environment variable.
+        gateway (LLMGateway): Routes each agent to its role's model with rate limiting and fallback;
+            without it every agent calls the selected model directly.
+        gateway_config (GatewayConfig): This session's role models, fallbacks and retry policy.
+    """
+    if gateway:
+        gateway_config = gateway_config or GatewayConfig()
+        # The session's key is used for every model that reads the same key variable
+        api_keys = {model_config["api_key_env"]: api_key}
+        selected = gateway.name_of(model_config)
+        llm = build_gateway_llm(gateway, selected, api_keys, gateway_config)
+        llms = {
+            role: build_gateway_llm(gateway, gateway_config.model_for_role(role, selected), api_keys, gateway_config)
+            for role in ROLES
+        }
+    else:
+        llm = build_llm(model_config, api_key)
+        llms = dict.fromkeys(ROLES, llm)
+
+    # Define agents with Groq LLM
+    Question_Identifier = Agent(
+        role='Question_Identifier_Agent',
+        goal="Identify and refine the user's question.",
+        backstory="A friendly and curious expert who loves unraveling what users really mean.",
+        verbose=False,
+        allow_delegation=False,
+        llm=llms["Question_Identifier"],
+    )
+
+    Question_Solving = Agent(
+        role='Question_Solving_Agent',
+        goal="Provide a detailed answer to the user's question.",
+        backstory="Expert in problem-solving.",
+        verbose=False,
+        allow_delegation=False,
+        llm=llms["Question_Solving"],
+    )
+
+    Context_Filter = Agent(
+        role='Context_Filter_Agent',
+        goal="Filter the given context for only parts usefull to the user's question.",
+        backstory="Expert in filtering and understanding user questions.",
+        verbose=False,
+        allow_delegation=False,
+        llm=llms["Context_Filter"],
+    )
+
+    BramBot = Agent(
+        role='Summarizing_Agent',
+        goal="Summarize the solved question in a conversational, user-friendly manner.",
+        backstory="A cheerful assistant who enjoys explaining things clearly and helping others learn.",
+        verbose=False,
+        allow_delegation=False,
+        llm=llms["BramBot"],
+    )
+
+    Internet_Search = None
+    if use_internet:
+        # Shared search layer: cached results, parallel queries and trimmed page text
+        internet_search_tool = CachedWebSearchTool(search=get_web_search(), api_key=exa_api_key or None)
+
+        Internet_Search = Agent(
+            role='Internet_Searching_Agent',
+            goal="search the internet for answers, relevant to the question",
+            backstory="You are a helpful assistant that will search the internet for an answer to the given question",
+            verbose=False,
+            allow_delegation=False,
+            llm=llms["Internet_Search"],
+            tools=[internet_search_tool]
+        )
+
+    return CrewAgents(
+        llm=llm,
+        Question_Identifier=Question_Identifier,
+        Question_Solving=Question_Solving,
+        Context_Filter=Context_Filter,
+        BramBot=BramBot,
+        Internet_Search=Internet_Search,
+    )
+
+
+class CrewFactory:
+    """
+    Caches built agents keyed by model config and toggle state.
+
+    Agents keep per-run executor state, so one factory is kept per Streamlit session
+    (in st.session_state) rather than shared across users. A warm session therefore
+    reaches crew.kickoff() without constructing any LLM, Agent or tool objects.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(model_config, api_key, use_docs, use_internet, exa_api_key=None, gateway=None, gateway_config=None):
+        return (
+            model_config["model"],
+            model_config["base_url"],
+            api_key,
+            bool(use_docs),
+            bool(use_internet),
+            exa_api_key if use_internet else None,
+            (gateway_config or GatewayConfig()).key() if gateway else None,
+        )
+
+    def get_agents(self, model_config, api_key, use_docs, use_internet, exa_api_key=None, gateway=None, gateway_config=None):
+        """Returns cached CrewAgents for this configuration, building them on first use."""
+        key = self.cache_key(model_config, api_key, use_docs, use_internet, exa_api_key, gateway, gateway_config)
+        with self._lock:
+            agents = self._cache.get(key)
+            if agents is None:
+                agents = build_agents(model_config, api_key, use_internet, exa_api_key, gateway, gateway_config)
+                self._cache[key] = agents
+            return agents
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,55 @@
+import os
+import threading
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_SIZE = 384  # Output dimension of all-MiniLM-L6-v2
+
+# Device and thread count can be set without code changes, e.g. EMBEDDING_DEVICE=cuda
+DEFAULT_DEVICE = os.environ.get("EMBEDDING_DEVICE", "cpu")
+DEFAULT_NUM_THREADS = int(os.environ.get("EMBEDDING_NUM_THREADS", "0"))  # 0 keeps torch's default
+
+# One model per (name, device) for the whole process, shared by every session and page
+_models = {}
+_models_lock = threading.Lock()
+_num_threads = 0  # Torch intra-op threads last set here; torch has one setting per process, not per model
+
+
+def _set_num_threads(num_threads):
+    # Called with _models_lock held
+    global _num_threads
+    if num_threads and num_threads != _num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+        _num_threads = num_threads
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL_NAME, device=None, num_threads=None):
+    """
+    Returns the process-wide SentenceTransformer, loading it on first use only.
+
+    Streamlit reruns every page script on each interaction, so the model must not be
+    created at script level. Both the chat page and the upload page go through here.
+
+    Parameters:
+        model_name (str): Hugging Face model name.
+        device (str): Torch device ("cpu", "cuda", "mps"). Defaults to EMBEDDING_DEVICE.
+        num_threads (int): Torch intra-op threads, 0 keeps the current setting. Defaults to EMBEDDING_NUM_THREADS.
+            Applies to the whole process, so it also changes the threads of a model loaded earlier.
+    """
+    device = device or DEFAULT_DEVICE
+    num_threads = DEFAULT_NUM_THREADS if num_threads is None else num_threads
+    key = (model_name, device)
+
+    model = _models.get(key)
+    if model is not None and (not num_threads or num_threads == _num_threads):
+        return model
+
+    with _models_lock:
+        _set_num_threads(num_threads)
+        # Another session may have finished loading while we waited for the lock
+        if key not in _models:
+            # Imported here so modules that only need the constants (e.g. in worker processes) stay light
+            from sentence_transformers import SentenceTransformer
+            _models[key] = SentenceTransformer(model_name, device=device)
+        return _models[key]
+
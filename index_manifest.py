@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+from qdrant_client import models
+
+DEFAULT_MANIFEST_PATH = ".brambot/index_manifest.json"
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes, read in blocks so large PDFs are never held in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(source, doc_hash, index):
+    """
+    Deterministic point ID of chunk `index` of the document version with hash `doc_hash`.
+
+    The source is part of the ID so the same file indexed under two names keeps two sets of points.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}|{doc_hash}#{index}"))
+
+
+def manifest_section(collection_name, index_key=None):
+    """
+    Manifest section of a collection. Every user can point the app at their own Qdrant, so a
+    collection is identified by its instance (index_key, e.g. the URL) as well as its name.
+    """
+    return f"{index_key}|{collection_name}" if index_key else collection_name
+
+
+class IndexManifest:
+    """
+    Record of which document versions and chunks are in each collection, stored as JSON.
+
+    Layout: {section: {source: {"doc_hash", "chunker", "chunks": [[chunk_hash, point_id], ...], "indexed_at"}}},
+    with sections from manifest_section(). An entry only says what was written; stored_entry()
+    checks it against the collection before it is trusted.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        self._mtime = None
+        self._reload_if_changed()
+
+    def _reload_if_changed(self):
+        """Picks up writes by other processes (e.g. ingest_cli.py) from the file's modification time."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as f:
+                self._data = json.load(f)
+            self._mtime = mtime
+
+    def get(self, section, source):
+        with self._lock:
+            return self._data.get(section, {}).get(source)
+
+    def documents(self, section):
+        with self._lock:
+            return dict(self._data.get(section, {}))
+
+    def version(self, section, sources=None):
+        """
+        Short hash of the indexed document versions in a section (all, or only `sources`).
+        Changes whenever a document is added, replaced or removed; used in answer cache keys.
+        None when the manifest knows none of those documents, e.g. for a collection indexed
+        before the manifest existed or from another host, whose contents are unknown.
+        """
+        with self._lock:
+            self._reload_if_changed()
+            documents = self._data.get(section, {})
+            versions = sorted([source, entry["doc_hash"]] for source, entry in documents.items() if not sources or source in sources)
+        if not versions:
+            return None
+        return hashlib.sha256(json.dumps(versions).encode("utf-8")).hexdigest()[:16]
+
+    def set(self, section, source, entry):
+        with self._lock:
+            self._data.setdefault(section, {})[source] = entry
+            self._save()
+
+    def remove(self, section, source):
+        with self._lock:
+            self._data.get(section, {}).pop(source, None)
+            self._save()
+
+    def _save(self):
+        # Write to a temporary file and swap it in, so a crash never leaves half a manifest
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(path=DEFAULT_MANIFEST_PATH):
+    """Process-wide manifest per file, shared by the upload page and the CLI code path."""
+    with _manifests_lock:
+        if path not in _manifests:
+            _manifests[path] = IndexManifest(path)
+        return _manifests[path]
+
+
+class ChunkDiff:
+    """
+    Diffs the chunks of a new document version against its manifest entry, one chunk at a time.
+
+    A chunk whose text and position were already indexed keeps its existing point, so it is neither
+    re-embedded nor re-upserted. New chunks get an ID derived from the document hash and
+    their index. Points of the old version that were not reused are stale.
+    """
+
+    def __init__(self, source, doc_hash, previous_entry=None, chunker_spec=None):
+        self.source = source
+        self.doc_hash = doc_hash
+        self.chunker_spec = chunker_spec
+        self.chunks = []
+        self.reused = 0
+        self.reused_ids = []
+        self._available = defaultdict(deque)
+        for hash_, point_id in (previous_entry or {}).get("chunks", []):
+            self._available[hash_].append(point_id)
+
+    def assign(self, index, fingerprint):
+        """Returns (point_id, needs_upsert) for the chunk at `index`, identified by its text and position."""
+        hash_ = chunk_hash(fingerprint)
+        if self._available[hash_]:
+            point_id = self._available[hash_].popleft()
+            self.reused += 1
+            self.reused_ids.append(point_id)
+            needs_upsert = False
+        else:
+            point_id = chunk_point_id(self.source, self.doc_hash, index)
+            needs_upsert = True
+        self.chunks.append([hash_, point_id])
+        return point_id, needs_upsert
+
+    def point_ids(self):
+        return [point_id for _, point_id in self.chunks]
+
+    def entry(self):
+        return {
+            "doc_hash": self.doc_hash,
+            "chunker": spec_key(self.chunker_spec),
+            "chunks": self.chunks,
+            "indexed_at": time.time(),
+        }
+
+
+def spec_key(chunker_spec):
+    """JSON-friendly form of a chunker spec(), so a chunking change forces re-indexing."""
+    if chunker_spec is None:
+        return None
+    name, options = chunker_spec
+    return [name, sorted([key, value] for key, value in options.items())]
+
+
+def stored_entry(qdrant, collection_name, manifest, section, source):
+    """
+    The manifest entry of `source` if the collection really holds that version, else None.
+
+    Counts the points with the entry's Source and doc_hash (both payload-indexed), so an
+    entry for a collection that was dropped, recreated or lives on another Qdrant instance
+    is neither skipped nor diffed against.
+    """
+    entry = manifest.get(section, source)
+    if entry is None:
+        return None
+    stored = qdrant.count(
+        collection_name=collection_name,
+        count_filter=models.Filter(must=[
+            models.FieldCondition(key="Source", match=models.MatchValue(value=source)),
+            models.FieldCondition(key="doc_hash", match=models.MatchValue(value=entry["doc_hash"])),
+        ]),
+        exact=True,
+    ).count
+    return entry if stored == len(entry["chunks"]) else None
+
+
+def indexed_hash(entry, chunker_spec=None):
+    """The document hash a stored_entry() is indexed under with this chunker, or None."""
+    if entry is None or entry.get("chunker") != spec_key(chunker_spec):
+        return None
+    return entry["doc_hash"]
+
+
+def finalize_document(qdrant, collection_name, manifest, section, diff):
+    """
+    Deletes, in one request, every point of this source that is not part of the new version,
+    including points written before the manifest existed, then records the new version.
+    """
+    qdrant.delete(
+        collection_name=collection_name,
+        points_selector=models.FilterSelector(filter=models.Filter(
+            must=[models.FieldCondition(key="Source", match=models.MatchValue(value=diff.source))],
+            must_not=[models.HasIdCondition(has_id=diff.point_ids())],
+        )),
+    )
+    if diff.reused_ids:
+        # Reused points still carry the previous version's hash; stored_entry() counts by the new one
+        qdrant.set_payload(collection_name=collection_name, payload={"doc_hash": diff.doc_hash}, points=diff.reused_ids)
+    manifest.set(section, diff.source, diff.entry())
@@ -0,0 +1,160 @@
+"""
+Headless bulk ingestion of PDFs into the BramBot Qdrant collection.
+
+Uses the same extract/chunk/embed/upsert code as the Upload PDF page.
+
+Examples:
+    python ingest_cli.py manuals/ --qdrant-url https://... --qdrant-key ...
+    python ingest_cli.py "archive/**/*.pdf" --workers 8 --batch-size 128
+"""
+import argparse
+import glob
+import os
+import sys
+
+from chunking import CHUNKERS, DEFAULT_CHUNKER, make_chunker
+from collection_config import QUANTIZATIONS, STORAGE_PRESETS, StorageConfig, reconfigure_collection
+from index_manifest import DEFAULT_MANIFEST_PATH, IndexManifest
+from ingestion import EMBED_BATCH_SIZE, UPSERT_CONCURRENCY, check_unique_sources, default_workers, ensure_collection, get_process_pool, ingest_files
+from qdrant_pool import DEFAULT_PREFER_GRPC, get_async_qdrant_client, get_qdrant_client
+
+COLLECTION_NAME = "pdf_chunks"
+
+
+def glob_root(pattern):
+    """The directory part of a glob pattern before its first wildcard."""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+        if any(c in part for c in "*?["):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+
+def find_pdfs(inputs):
+    """
+    Expands directories (recursively) and glob patterns into PDF paths, sorted and de-duplicated.
+
+    Returns:
+        dict: Path -> Source name, the path relative to the directory or glob root it was found
+            under, so manuals/a/guide.pdf and manuals/b/guide.pdf stay two documents.
+    """
+    sources = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            root, found = item, glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+        else:
+            root, found = glob_root(item), [p for p in glob.glob(item, recursive=True) if p.lower().endswith(".pdf")]
+        for path in found:
+            sources.setdefault(path, os.path.relpath(path, root).replace(os.sep, "/"))
+    return dict(sorted(sources.items()))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a directory or glob of PDFs into Qdrant.")
+    parser.add_argument("inputs", nargs="+", help="Directories, files or glob patterns.")
+    parser.add_argument("--qdrant-url", default=os.environ.get("QDRANT_URL"), help="Defaults to $QDRANT_URL.")
+    parser.add_argument("--qdrant-key", default=os.environ.get("QDRANT_API_KEY"), help="Defaults to $QDRANT_API_KEY.")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Extraction worker processes.")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding/upsert batch.")
+    parser.add_argument("--chunker", choices=list(CHUNKERS), default=DEFAULT_CHUNKER)
+    parser.add_argument("--max-tokens", type=int, default=200, help="Sentence chunker: model tokens per chunk.")
+    parser.add_argument("--overlap-tokens", type=int, default=32, help="Sentence chunker: tokens repeated between chunks.")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Fixed chunker: characters per chunk.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="Index manifest used to skip unchanged files.")
+    parser.add_argument("--grpc", action=argparse.BooleanOptionalAction, default=DEFAULT_PREFER_GRPC, help="Talk to Qdrant over gRPC. Defaults to $QDRANT_PREFER_GRPC.")
+    parser.add_argument("--upsert-concurrency", type=int, default=UPSERT_CONCURRENCY, help="Upsert requests in flight at once.")
+    parser.add_argument("--storage", choices=list(STORAGE_PRESETS), default="default", help="Storage preset for a new collection.")
+    parser.add_argument("--quantization", choices=QUANTIZATIONS, help="Overrides the preset's quantization.")
+    parser.add_argument("--on-disk", action=argparse.BooleanOptionalAction, default=None, help="Overrides whether vectors and payloads live on disk.")
+    parser.add_argument("--hnsw-m", type=int, help="Overrides HNSW edges per node.")
+    parser.add_argument("--hnsw-ef-construct", type=int, help="Overrides HNSW build-time neighbours.")
+    parser.add_argument("--reconfigure", action="store_true", help="Apply the storage settings to an existing collection too.")
+    parser.add_argument("--device", default=None, help="Embedding device, e.g. cpu or cuda.")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads for embedding (process-wide); defaults to EMBEDDING_NUM_THREADS.")
+    return parser.parse_args(argv)
+
+
+def storage_from_args(args):
+    options = dict(vars(STORAGE_PRESETS[args.storage]))
+    if args.quantization:
+        options["quantization"] = args.quantization
+    if args.on_disk is not None:
+        options["on_disk_vectors"] = options["on_disk_payload"] = args.on_disk
+    if args.hnsw_m:
+        options["hnsw_m"] = args.hnsw_m
+    if args.hnsw_ef_construct:
+        options["hnsw_ef_construct"] = args.hnsw_ef_construct
+    return StorageConfig(**options)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.qdrant_url:
+        sys.exit("A Qdrant URL is required (--qdrant-url or $QDRANT_URL).")
+
+    # Imported here: spawned extraction workers re-import this module and must not load torch
+    from embedding_service import EMBEDDING_SIZE, get_embedding_model
+
+    sources = find_pdfs(args.inputs)
+    if not sources:
+        sys.exit("No PDF files found.")
+    paths = list(sources)
+    try:
+        check_unique_sources(paths, sources.__getitem__)
+    except ValueError as e:
+        sys.exit(f"{e}; ingest those inputs separately or rename one of the files.")
+
+    qdrant = get_qdrant_client(args.qdrant_url, args.qdrant_key, prefer_grpc=args.grpc)
+    storage = storage_from_args(args)
+    if not ensure_collection(qdrant, args.collection, EMBEDDING_SIZE, storage) and args.reconfigure:
+        reconfigure_collection(qdrant, args.collection, storage)
+        print(f"Reconfigured '{args.collection}': {storage}")
+
+    model = get_embedding_model(device=args.device, num_threads=args.threads)
+
+    def embed(texts):
+        return model.encode(texts, batch_size=args.batch_size)
+
+    def report(path, stats, error):
+        done = stats.documents + stats.failed
+        status = f"FAILED: {error}" if error else "ok"
+        print(
+            f"[{done + stats.skipped}/{len(paths)}] {path} {status} | "
+            f"{stats.docs_per_second:.2f} docs/s, {stats.chunks_per_second:.1f} chunks/s",
+            flush=True,
+        )
+
+    if args.chunker == "sentence":
+        chunker = make_chunker(args.chunker, max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+    else:
+        chunker = make_chunker(args.chunker, chunk_size=args.chunk_size)
+
+    print(f"Ingesting {len(paths)} PDFs with {args.workers} workers into '{args.collection}'")
+    stats = ingest_files(
+        paths,
+        qdrant=qdrant,
+        collection_name=args.collection,
+        embed=embed,
+        source_name=sources.__getitem__,
+        batch_size=args.batch_size,
+        chunker=chunker,
+        pool=get_process_pool(args.workers),
+        progress=report,
+        manifest=IndexManifest(args.manifest),
+        async_qdrant=get_async_qdrant_client(args.qdrant_url, args.qdrant_key, prefer_grpc=args.grpc),
+        upsert_concurrency=args.upsert_concurrency,
+        index_key=args.qdrant_url,
+    )
+
+    print(
+        f"\nDone: {stats.documents} documents ({stats.skipped} unchanged, {stats.failed} failed), {stats.pages} pages, "
+        f"{stats.chunks} chunks ({stats.embedded} embedded) in {stats.seconds:.1f}s "
+        f"({stats.docs_per_second:.2f} docs/s, {stats.chunks_per_second:.1f} chunks/s)"
+    )
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+# Streaming PDF ingestion: extract -> chunk -> embed -> upsert, one bounded batch at a time.
+# The embedding model is passed in by the caller, which keeps this module light enough
+# to import in the extraction worker processes.
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import pdfplumber
+from qdrant_client import models
+
+from chunking import make_chunker
+from collection_config import KEYWORD_VECTOR, create_collection, has_keyword_vector
+from index_manifest import ChunkDiff, file_hash, finalize_document, get_manifest, indexed_hash, manifest_section, stored_entry
+from qdrant_pool import BatchUpserter, collection_known
+from retrieval import PAYLOAD_INDEXES, forget_collection_layout, forget_sources, keyword_vector
+from telemetry import current_span, span, traced
+
+EMBED_BATCH_SIZE = 64  # Chunks embedded and upserted together
+UPSERT_CONCURRENCY = 4  # Upsert requests in flight while the next batch is embedded
+PAGES_PER_TASK = 8  # Pages extracted by one worker call
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def get_process_pool(workers=None):
+    """
+    Process pool shared by every ingestion in this process.
+
+    Uses the spawn start method; forking a multi-threaded Streamlit server is unsafe.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = workers or default_workers()
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+@dataclass
+class IngestStats:
+    source: str
+    pages: int = 0
+    chunks: int = 0
+    embedded: int = 0  # Chunks that were new and had to be embedded and upserted
+    skipped: bool = False  # Document unchanged since it was last indexed
+    seconds: float = 0.0
+
+
+@dataclass
+class BulkIngestStats:
+    documents: int = 0
+    pages: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def docs_per_second(self):
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_second(self):
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+
+def ensure_collection(qdrant, collection_name, vector_size, storage=None):
+    """
+    Creates the collection if it does not exist yet. Returns True when it was created.
+
+    Parameters:
+        storage (StorageConfig): Quantization, on-disk and HNSW settings for a new collection.
+    """
+    if collection_known(qdrant, collection_name):
+        return False
+    create_collection(qdrant, collection_name, vector_size, storage)
+    # Indexed from the start: every upload counts its points by Source and doc_hash
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        qdrant.create_payload_index(collection_name, field_name=field_name, field_schema=schema)
+    forget_collection_layout(collection_name)
+    return True
+
+
+def count_pages(path):
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_range(path, start, stop):
+    """Worker: extracts pages [start, stop) of a PDF, calling extract_text() once per page."""
+    with pdfplumber.open(path) as pdf:
+        return [(number, pdf.pages[number].extract_text() or "") for number in range(start, min(stop, len(pdf.pages)))]
+
+
+def iter_pages(path, page_count=None, pool=None, pages_per_task=PAGES_PER_TASK, max_in_flight=None):
+    """
+    Yields (page_number, text) in page order while extraction runs ahead in the pool.
+
+    At most max_in_flight page ranges are submitted at a time, so a slow consumer
+    (embedding, upserting) holds extraction back instead of letting pages pile up.
+    """
+    page_count = count_pages(path) if page_count is None else page_count
+    pool = pool or get_process_pool()
+    max_in_flight = max_in_flight or max(2, _pool_workers * 2)
+
+    starts = iter(range(0, page_count, pages_per_task))
+    in_flight = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            in_flight.append(pool.submit(extract_page_range, path, start, start + pages_per_task))
+
+    for _ in range(max_in_flight):
+        submit_next()
+
+    while in_flight:
+        pages = in_flight.popleft().result()
+        submit_next()
+        yield from pages
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def chunk_point(point_id, source, doc_hash, index, chunk, vector, keywords=False):
+    vector = vector.tolist()  # Convert numpy array to list for Qdrant
+    return models.PointStruct(
+        id=point_id,
+        # Collections created before keyword search only hold the dense vector
+        vector={"": vector, KEYWORD_VECTOR: keyword_vector(chunk.text)} if keywords else vector,
+        payload={"Source": source, "doc_hash": doc_hash, "chunk_index": index, "text": chunk.text, **chunk.payload()},
+    )
+
+
+_worker_chunkers = {}
+
+
+def chunker_from_spec(spec):
+    """Rebuilds a chunker from its spec(); cached so a worker process loads a tokenizer only once."""
+    name, options = spec
+    key = (name, tuple(sorted(options.items())))
+    if key not in _worker_chunkers:
+        _worker_chunkers[key] = make_chunker(name, **options)
+    return _worker_chunkers[key]
+
+
+@traced("ingest.pdf")
+def ingest_pdf(path, source, qdrant, collection_name, embed, batch_size=EMBED_BATCH_SIZE,
+               chunker=None, pool=None, progress=None, manifest=None, async_qdrant=None,
+               upsert_concurrency=UPSERT_CONCURRENCY, index_key=None):
+    """
+    Streams one PDF into Qdrant, skipping work that was already done.
+
+    An unchanged file (same content hash as in the manifest, and that version's points
+    present in the collection) is skipped outright. For a changed file only chunks that
+    are new are embedded and upserted; the previous version's leftover chunks are deleted
+    in bulk once the new version is stored.
+
+    Parameters:
+        path (str): Path of the PDF on disk.
+        source (str): Name stored as the "Source" payload field.
+        qdrant (QdrantClient): Client used for upserts.
+        collection_name (str): Target collection.
+        embed (callable): Maps a list of strings to a list/array of vectors.
+        batch_size (int): Chunks embedded and upserted per batch.
+        chunker: Chunking strategy from chunking.make_chunker(); defaults to the sentence chunker.
+        progress (callable): Called with (pages_done, page_count, chunks_done) after each batch.
+        manifest (IndexManifest): Record of indexed documents; defaults to the shared manifest.
+        async_qdrant (AsyncQdrantClient): Enables concurrent upserts; without it batches are upserted one by one.
+        upsert_concurrency (int): Upserts in flight at once with async_qdrant.
+        index_key (str): Identifies the Qdrant instance (e.g. its URL) in the manifest.
+    """
+    start = time.perf_counter()
+    manifest = manifest or get_manifest()
+    section = manifest_section(collection_name, index_key)
+    chunker = chunker or make_chunker()
+    stats = IngestStats(source=source)
+    page_count = count_pages(path)
+
+    doc_hash = file_hash(path)
+    previous = stored_entry(qdrant, collection_name, manifest, section, source)
+    if indexed_hash(previous, chunker.spec()) == doc_hash:
+        stats.pages = page_count
+        stats.chunks = len(previous["chunks"])
+        stats.skipped = True
+        stats.seconds = time.perf_counter() - start
+        current_span().set(source=source, pages=page_count, skipped=True)
+        if progress:
+            progress(page_count, page_count, stats.chunks)
+        return stats
+
+    diff = ChunkDiff(source, doc_hash, previous, chunker.spec())
+    keywords = has_keyword_vector(qdrant.get_collection(collection_name))
+    pages_done = 0
+
+    def counted(pages):
+        nonlocal pages_done
+        for page in pages:
+            pages_done = page[0] + 1
+            yield page
+
+    def new_chunks(chunks):
+        # Only chunks that are not already stored go on to embedding
+        for index, chunk in enumerate(chunks):
+            point_id, needs_upsert = diff.assign(index, chunk.fingerprint)
+            stats.chunks += 1
+            if needs_upsert:
+                yield point_id, index, chunk
+
+    upserter = BatchUpserter(qdrant, collection_name, async_qdrant, upsert_concurrency)
+    pages = counted(iter_pages(path, page_count=page_count, pool=pool))
+    for batch in iter_batches(new_chunks(chunker.chunks(pages)), batch_size):
+        with span("embed", texts=len(batch)):
+            vectors = embed([chunk.text for _, _, chunk in batch])
+        points = [
+            chunk_point(point_id, source, doc_hash, index, chunk, vectors[i], keywords)
+            for i, (point_id, index, chunk) in enumerate(batch)
+        ]
+        upserter.submit(points)
+        stats.embedded += len(batch)
+        if progress:
+            progress(pages_done, page_count, stats.chunks)
+
+    # Stale points are only removed once every new chunk is stored
+    upserter.drain()
+    finalize_document(qdrant, collection_name, manifest, section, diff)
+    forget_sources(collection_name)
+
+    stats.pages = page_count
+    stats.seconds = time.perf_counter() - start
+    current_span().set(source=source, pages=page_count, chunks=stats.chunks, embedded=stats.embedded)
+    if progress:
+        progress(page_count, page_count, stats.chunks)
+    return stats
+
+
+def extract_pdf_chunks(path, chunker_spec, skip_hashes=frozenset()):
+    """
+    Worker: hashes, extracts and chunks a whole PDF in one process.
+
+    Returns (doc_hash, page_count, chunks); chunks is None when the hash is in skip_hashes,
+    so unchanged files are never parsed.
+    """
+    doc_hash = file_hash(path)
+    if doc_hash in skip_hashes:
+        return doc_hash, 0, None
+    with pdfplumber.open(path) as pdf:
+        pages = ((number, page.extract_text() or "") for number, page in enumerate(pdf.pages))
+        chunks = list(chunker_from_spec(chunker_spec).chunks(pages))
+        return doc_hash, len(pdf.pages), chunks
+
+
+def iter_extracted_files(paths, pool, chunker_spec, max_in_flight=None, skip_hashes=None):
+    """
+    Yields (path, doc_hash, page_count, chunks, error) per file, in order, with a bounded number of files in flight.
+
+    Parameters:
+        skip_hashes (callable): Maps a path to the document hash it already has in the index, if any.
+    """
+    paths = iter(paths)
+    max_in_flight = max_in_flight or max(2, _pool_workers * 2)
+    in_flight = deque()
+
+    def submit_next():
+        path = next(paths, None)
+        if path is not None:
+            known = skip_hashes(path) if skip_hashes else None
+            in_flight.append((path, pool.submit(extract_pdf_chunks, path, chunker_spec, frozenset([known] if known else []))))
+
+    for _ in range(max_in_flight):
+        submit_next()
+
+    while in_flight:
+        path, future = in_flight.popleft()
+        submit_next()
+        try:
+            doc_hash, page_count, chunks = future.result()
+            yield path, doc_hash, page_count, chunks, None
+        except Exception as e:
+            yield path, None, 0, [], e
+
+
+def check_unique_sources(paths, source_name):
+    """Raises ValueError when two paths get the same Source; they would overwrite each other's points."""
+    seen = {}
+    for path in paths:
+        other = seen.setdefault(source_name(path), path)
+        if other != path:
+            raise ValueError(f"{other} and {path} both map to the source name {source_name(path)!r}")
+
+
+@traced("ingest.files")
+def ingest_files(paths, qdrant, collection_name, embed, source_name=os.path.basename,
+                 batch_size=EMBED_BATCH_SIZE, chunker=None, pool=None, progress=None, manifest=None,
+                 async_qdrant=None, upsert_concurrency=UPSERT_CONCURRENCY, index_key=None):
+    """
+    Ingests many PDFs: files are extracted in parallel worker processes, and their new
+    chunks are pooled into embedding batches that span file boundaries, so small files
+    still give the encoder full batches. Unchanged files and chunks are skipped as in ingest_pdf.
+
+    Parameters:
+        paths (list[str]): PDF files to ingest.
+        source_name (callable): Maps a path to the "Source" payload value; must give every path its own name.
+        chunker: Chunking strategy from chunking.make_chunker(); rebuilt in each worker from its spec().
+        progress (callable): Called with (path, BulkIngestStats, error) after each file is extracted.
+        manifest (IndexManifest): Record of indexed documents; defaults to the shared manifest.
+        async_qdrant (AsyncQdrantClient): Enables concurrent upserts; without it batches are upserted one by one.
+        upsert_concurrency (int): Upserts in flight at once with async_qdrant.
+        index_key (str): Identifies the Qdrant instance (e.g. its URL) in the manifest.
+    """
+    check_unique_sources(paths, source_name)
+    start = time.perf_counter()
+    manifest = manifest or get_manifest()
+    section = manifest_section(collection_name, index_key)
+    stats = BulkIngestStats()
+    upserter = BatchUpserter(qdrant, collection_name, async_qdrant, upsert_concurrency)
+    pool = pool or get_process_pool()
+    chunker_spec = (chunker or make_chunker()).spec()
+    keywords = has_keyword_vector(qdrant.get_collection(collection_name))
+    pending = []  # (diff, point_id, chunk index, chunk) waiting for a full embedding batch
+    unfinished = {}  # id(diff) -> [diff, chunks still pending]
+    previous = {}  # source -> its stored_entry(), checked once when the file is submitted
+
+    def known_hash(path):
+        source = source_name(path)
+        previous[source] = stored_entry(qdrant, collection_name, manifest, section, source)
+        return indexed_hash(previous[source], chunker_spec)
+
+    def flush(batch):
+        with span("embed", texts=len(batch)):
+            vectors = embed([chunk.text for _, _, _, chunk in batch])
+        points = [
+            chunk_point(point_id, diff.source, diff.doc_hash, index, chunk, vectors[i], keywords)
+            for i, (diff, point_id, index, chunk) in enumerate(batch)
+        ]
+        upserter.submit(points)
+        stats.embedded += len(batch)
+
+        # A document is finalized once all of its new chunks are stored
+        for diff, _, _, _ in batch:
+            unfinished[id(diff)][1] -= 1
+        finished = [key for key, (_, left) in unfinished.items() if left == 0]
+        if finished:
+            upserter.drain()
+        for key in finished:
+            finalize_document(qdrant, collection_name, manifest, section, unfinished.pop(key)[0])
+
+    for path, doc_hash, page_count, chunks, error in iter_extracted_files(paths, pool, chunker_spec, skip_hashes=known_hash):
+        source = source_name(path)
+        previous_entry = previous.pop(source, None)
+        if error is not None:
+            stats.failed += 1
+        elif chunks is None:
+            stats.skipped += 1
+        else:
+            diff = ChunkDiff(source, doc_hash, previous_entry, chunker_spec)
+            new = []
+            for index, chunk in enumerate(chunks):
+                point_id, needs_upsert = diff.assign(index, chunk.fingerprint)
+                if needs_upsert:
+                    new.append((diff, point_id, index, chunk))
+            pending.extend(new)
+            stats.documents += 1
+            stats.pages += page_count
+            stats.chunks += len(chunks)
+            if new:
+                unfinished[id(diff)] = [diff, len(new)]
+            else:
+                finalize_document(qdrant, collection_name, manifest, section, diff)
+            while len(pending) >= batch_size:
+                flush(pending[:batch_size])
+                pending = pending[batch_size:]
+        stats.seconds = time.perf_counter() - start
+        if progress:
+            progress(path, stats, error)
+
+    if pending:
+        flush(pending)
+    upserter.drain()
+    forget_sources(collection_name)
+    stats.seconds = time.perf_counter() - start
+    current_span().set(documents=stats.documents, skipped=stats.skipped, failed=stats.failed, chunks=stats.chunks, embedded=stats.embedded)
+    return stats
@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# Capacity is an operator setting for the whole server, e.g. BRAMBOT_JOB_WORKERS=8 BRAMBOT_JOBS_PER_USER=2
+DEFAULT_MAX_WORKERS = int(os.environ.get("BRAMBOT_JOB_WORKERS", "4"))
+DEFAULT_MAX_PENDING_PER_USER = int(os.environ.get("BRAMBOT_JOBS_PER_USER", "2"))
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next checkpoint after cancel() was called."""
+
+
+class QueueFull(Exception):
+    """The user already has the maximum number of unfinished jobs."""
+
+
+@dataclass
+class JobQueueConfig:
+    """
+    Parameters:
+        max_workers (int): Jobs running at the same time, across all sessions.
+        max_pending_per_user (int): Unfinished jobs (queued or running) one user may have.
+        poll_seconds (float): How often the UI refreshes a running job.
+        keep_finished (int): Finished jobs kept for reporting; older ones are dropped.
+    """
+    max_workers: int = DEFAULT_MAX_WORKERS
+    max_pending_per_user: int = DEFAULT_MAX_PENDING_PER_USER
+    poll_seconds: float = 0.5
+    keep_finished: int = 200
+
+
+class Job:
+    """
+    One submitted unit of work and everything the UI shows about it while it runs.
+
+    The job function receives the Job as its first argument and reports through it:
+    update() sets the status label and adds progress lines, write() appends streamed
+    answer text, and check_cancelled() raises JobCancelled once cancel() was requested.
+    """
+
+    def __init__(self, user, fn, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = JOB_QUEUED
+        self.label = "Waiting for a free worker..."
+        self.lines = []
+        self.text = ""
+        self.result = None
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, label=None, line=None):
+        with self._lock:
+            if label:
+                self.label = label
+            if line:
+                self.lines.append(line)
+
+    def write(self, text):
+        with self._lock:
+            self.text += text
+
+    def snapshot(self):
+        """Consistent copy of (status, label, lines, text) for rendering."""
+        with self._lock:
+            return self.status, self.label, list(self.lines), self.text
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def queue_wait(self):
+        return (self.started or time.perf_counter()) - self.submitted
+
+    @property
+    def run_time(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def _finish(self, status, result=None, error=None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.perf_counter()
+        self._done.set()
+
+
+class JobQueue:
+    """
+    Runs jobs on a fixed pool of worker threads, outside any Streamlit script run.
+
+    Waiting jobs are kept per user and workers take them round-robin across users, so
+    someone with several questions queued cannot starve everyone else. A rerun or a
+    closed browser tab does not abandon a job; the app finds it again with get() from the
+    job id it keeps in the URL.
+    Queued jobs are cancelled immediately, running ones at their next checkpoint.
+
+    Parameters:
+        config (JobQueueConfig): Worker count, per-user limit and retention.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or JobQueueConfig()
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._pending = OrderedDict()  # user -> deque of queued jobs, in round-robin order
+        self._jobs = OrderedDict()  # job id -> Job, oldest first
+        self._running = 0
+        self._ran = 0
+        self._workers = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._cond = threading.Condition()
+        self._start_workers()
+
+    def _start_workers(self):
+        # Called with the condition held, or from __init__
+        while self._workers < self.config.max_workers:
+            self._workers += 1
+            threading.Thread(target=self._work, name=f"job-worker-{self._workers}", daemon=True).start()
+
+    def resize(self, max_workers):
+        """Changes the worker count; surplus workers exit after their current job."""
+        with self._cond:
+            self.config.max_workers = max_workers
+            self._start_workers()
+            self._cond.notify_all()
+
+    def submit(self, user, fn, *args, **kwargs):
+        """Queues fn(job, *args, **kwargs) for `user`; raises QueueFull over the per-user limit."""
+        with self._cond:
+            unfinished = sum(1 for job in self._jobs.values() if job.user == user and not job.done)
+            if unfinished >= self.config.max_pending_per_user:
+                raise QueueFull(f"{unfinished} questions are still being answered; wait for one to finish.")
+            job = Job(user, fn, args, kwargs)
+            self._jobs[job.id] = job
+            self._pending.setdefault(user, deque()).append(job)
+            self._cond.notify()
+            return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a job; returns False when it had already finished."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job._cancel.set()
+            queue = self._pending.get(job.user)
+            if job.status == JOB_QUEUED and queue and job in queue:
+                queue.remove(job)
+                if not queue:
+                    del self._pending[job.user]
+                self.cancelled += 1
+                job._finish(JOB_CANCELLED)
+                self._trim()
+            return True
+
+    def position(self, job):
+        """Jobs that will start before this one, following the round-robin order; 0 when running."""
+        with self._cond:
+            if job.status != JOB_QUEUED:
+                return 0
+            queues = [list(q) for q in self._pending.values()]
+            ahead, depth = 0, 0
+            while True:
+                for queue in queues:
+                    if depth < len(queue):
+                        if queue[depth] is job:
+                            return ahead
+                        ahead += 1
+                depth += 1
+                if all(depth >= len(queue) for queue in queues):
+                    return ahead
+
+    def _next_job(self):
+        user, queue = self._pending.popitem(last=False)
+        job = queue.popleft()
+        if queue:
+            self._pending[user] = queue  # Back of the line for this user's next job
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._pending and self._workers <= self.config.max_workers:
+                    self._cond.wait()
+                if self._workers > self.config.max_workers:
+                    self._workers -= 1
+                    return
+                job = self._next_job()
+                job.status = JOB_RUNNING
+                job.started = time.perf_counter()
+                self._running += 1
+            self._run(job)
+
+    def _run(self, job):
+        status, result, error = JOB_DONE, None, None
+        try:
+            job.check_cancelled()
+            result = job.fn(job, *job.args, **job.kwargs)
+        except JobCancelled:
+            status = JOB_CANCELLED
+        except Exception as e:
+            status, error = JOB_FAILED, e
+        job._finish(status, result, error)
+        with self._cond:
+            self._running -= 1
+            self._ran += 1
+            self._total_wait += job.queue_wait
+            self._total_run += job.run_time
+            if status == JOB_DONE:
+                self.completed += 1
+            elif status == JOB_FAILED:
+                self.failed += 1
+            else:
+                self.cancelled += 1
+            self._trim()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.config.keep_finished)]:
+            del self._jobs[job_id]
+
+    def summary(self):
+        """One row for st.table."""
+        with self._cond:
+            queued = sum(len(queue) for queue in self._pending.values())
+            ran = self._ran
+            return [{
+                "workers": self.config.max_workers,
+                "running": self._running,
+                "queued": queued,
+                "users waiting": len(self._pending),
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "mean wait (s)": round(self._total_wait / ran, 2) if ran else 0.0,
+                "mean run (s)": round(self._total_run / ran, 2) if ran else 0.0,
+            }]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Process-wide job queue shared by every session, so the worker limit holds for the whole app.
+    Sized from BRAMBOT_JOB_WORKERS and BRAMBOT_JOBS_PER_USER when it is first used.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
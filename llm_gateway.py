@@ -0,0 +1,409 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from typing import Any
+
+import openai
+from crewai.llms.base_llm import BaseLLM
+from pydantic import Field
+
+from streaming import api_model_name, get_openai_client
+from telemetry import count, get_telemetry
+
+# Groq free-tier limits; a MODEL_PROVIDERS entry can override them with "rpm" and "tpm"
+DEFAULT_RPM = 30
+DEFAULT_TPM = 6000
+EXPECTED_COMPLETION_TOKENS = 300  # Reserved per call before the real usage is known
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+# Agent roles that can get their own model
+ROLES = ["Question_Identifier", "Question_Solving", "Context_Filter", "BramBot", "Internet_Search"]
+
+
+class GatewayError(Exception):
+    """Every model in the fallback chain failed."""
+
+
+def estimate_tokens(messages):
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at rate_per_minute, holding at most capacity.
+
+    acquire() blocks until the tokens are available and returns how long it waited.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount):
+        """Charges (or refunds, when negative) tokens after the fact; may leave the bucket in debt."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def pause(self, seconds):
+        """Holds back the next request for `seconds`, e.g. when the provider sent Retry-After."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    fallbacks: int = 0  # Calls this model answered after another model failed
+    queue_delay: float = 0.0
+    output_tokens: int = 0
+    generation_seconds: float = 0.0
+
+    @property
+    def tokens_per_second(self):
+        return self.output_tokens / self.generation_seconds if self.generation_seconds else 0.0
+
+    @property
+    def mean_queue_delay(self):
+        return self.queue_delay / self.calls if self.calls else 0.0
+
+
+@dataclass
+class GatewayConfig:
+    """
+    Parameters:
+        role_models (dict): Agent role -> MODEL_PROVIDERS name; roles not listed use the selected model.
+        fallbacks (list[str]): MODEL_PROVIDERS names tried in order when a model keeps failing.
+        max_retries (int): Retries per model for rate limits, timeouts and server errors.
+        base_delay (float): First backoff in seconds; doubles per retry, with full jitter.
+        max_delay (float): Upper bound for one backoff.
+    """
+    role_models: dict = field(default_factory=dict)
+    fallbacks: list = field(default_factory=list)
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def model_for_role(self, role, default):
+        return self.role_models.get(role) or default
+
+    def key(self):
+        """Hashable form, for caching agents built with this configuration."""
+        return (tuple(sorted(self.role_models.items())), tuple(self.fallbacks), self.max_retries, self.base_delay, self.max_delay)
+
+
+class LLMGateway:
+    """
+    Sends chat completions for every agent through per-key rate limiting, retries and fallback.
+
+    Each (base_url, api key, model) gets a request bucket and a token bucket sized from its
+    provider limits, since Groq meters requests and tokens per model for each key. Calls
+    wait in the buckets instead of running into 429s; errors that still occur are retried
+    with exponential backoff and full jitter, honouring Retry-After, and then handed to the
+    next model in the fallback chain.
+
+    Only the buckets and stats are shared. Every call brings the caller's API keys and
+    GatewayConfig, so one session's keys, fallbacks and retry policy never apply to another's.
+
+    Parameters:
+        providers (dict): MODEL_PROVIDERS.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+        self.stats = defaultdict(ModelStats)
+        self._buckets = {}
+        self._lock = threading.Lock()  # Guards the buckets and the stats, which every worker thread updates
+
+    def _api_key(self, name, api_keys):
+        """The caller's key for a model, from api_keys (api_key_env name -> key)."""
+        return api_keys.get(self.providers[name]["api_key_env"])
+
+    def _buckets_for(self, name, api_key):
+        provider = self.providers[name]
+        key = (provider["base_url"], api_key, provider["model"])
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = (
+                    TokenBucket(provider.get("rpm", DEFAULT_RPM)),
+                    TokenBucket(provider.get("tpm", DEFAULT_TPM)),
+                )
+            return self._buckets[key]
+
+    def chain(self, name, api_keys, config):
+        """The model followed by its usable fallbacks (those the caller has an API key for)."""
+        names = [name] + [n for n in config.fallbacks if n != name]
+        return [n for n in names if n in self.providers and self._api_key(n, api_keys)]
+
+    def name_of(self, model_config):
+        """The MODEL_PROVIDERS name of a provider entry."""
+        for name, config in self.providers.items():
+            if config == model_config:
+                return name
+        raise KeyError(f"Model {model_config.get('model')} is not in MODEL_PROVIDERS")
+
+    def _add_stats(self, model_name, **amounts):
+        with self._lock:
+            stats = self.stats[model_name]
+            for name, amount in amounts.items():
+                setattr(stats, name, getattr(stats, name) + amount)
+
+    def _backoff(self, attempt, error, config):
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        if retry_after is not None:
+            return min(retry_after, config.max_delay * 4)
+        return random.uniform(0, min(config.max_delay, config.base_delay * 2 ** attempt))
+
+    def _attempts(self, name, messages, api_keys, config):
+        """
+        Generator of attempts: yields (model name, API key, queue delay) and is sent the error if the
+        attempt failed. Backs off between retries, then moves on to the next model in the chain.
+        """
+        for position, model_name in enumerate(self.chain(name, api_keys, config)):
+            api_key = self._api_key(model_name, api_keys)
+            requests, tokens = self._buckets_for(model_name, api_key)
+            for attempt in range(config.max_retries + 1):
+                waited = requests.acquire(1)
+                waited += tokens.acquire(estimate_tokens(messages) + EXPECTED_COMPLETION_TOKENS)
+                self._add_stats(model_name, calls=1, queue_delay=waited, fallbacks=1 if position else 0)
+                error = yield model_name, api_key, waited
+                if error is None:
+                    return
+                self._add_stats(model_name, errors=1)
+                count("llm_errors", model=model_name, error=type(error).__name__)
+                if not isinstance(error, RETRYABLE_ERRORS):
+                    break
+                if attempt == config.max_retries:
+                    break
+                self._add_stats(model_name, retries=1)
+                delay = self._backoff(attempt, error, config)
+                if isinstance(error, openai.RateLimitError):
+                    # Every caller of this model/key waits out the limit in the bucket, not just this one
+                    requests.pause(delay)
+                else:
+                    time.sleep(delay)
+
+    def _request(self, model_name, api_key, messages, **kwargs):
+        provider = self.providers[model_name]
+        client = get_openai_client(provider["base_url"], api_key)
+        return client.chat.completions.create(model=api_model_name(provider["model"]), messages=messages, **kwargs)
+
+    def _record(self, model_name, api_key, messages, started, output_tokens, prompt_tokens=None, span=None):
+        self._add_stats(model_name, output_tokens=output_tokens, generation_seconds=time.perf_counter() - started)
+        # Settle the token reservation with what the call really used
+        prompt_tokens = prompt_tokens or estimate_tokens(messages)
+        self._buckets_for(model_name, api_key)[1].adjust(prompt_tokens + output_tokens - estimate_tokens(messages) - EXPECTED_COMPLETION_TOKENS)
+        count("llm_tokens", prompt_tokens, model=model_name, kind="prompt")
+        count("llm_tokens", output_tokens, model=model_name, kind="completion")
+        if span is not None:
+            span.set(model=model_name, prompt_tokens=prompt_tokens, completion_tokens=output_tokens)
+
+    def complete(self, name, messages, api_keys, config=None, **kwargs):
+        """
+        Chat completion text from model `name` (a MODEL_PROVIDERS key) or one of its fallbacks.
+
+        Parameters:
+            api_keys (dict): The caller's keys, api_key_env name -> key; models without one are skipped.
+            config (GatewayConfig): The caller's fallbacks and retry policy; defaults to GatewayConfig().
+        """
+        config = config or GatewayConfig()
+        with get_telemetry().span("llm.call", requested=name) as call_span:
+            attempts = self._attempts(name, messages, api_keys, config)
+            outcome = next(attempts, None)
+            last_error, tries = None, 0
+            while outcome is not None:
+                model_name, api_key, waited = outcome
+                tries += 1
+                started = time.perf_counter()
+                try:
+                    response = self._request(model_name, api_key, messages, **kwargs)
+                except Exception as e:
+                    last_error = e
+                    outcome = next_attempt(attempts, e)
+                    continue
+                usage = response.usage
+                call_span.set(attempts=tries, queue_delay=round(waited, 3))
+                self._record(model_name, api_key, messages, started,
+                             usage.completion_tokens if usage else estimate_tokens([{"content": response.choices[0].message.content}]),
+                             usage.prompt_tokens if usage else None, call_span)
+                attempts.close()
+                return response.choices[0].message.content or ""
+            call_span.set(attempts=tries)
+            raise GatewayError(f"All models failed for {name}: {last_error}") from last_error
+
+    def stream(self, name, messages, api_keys, config=None, **kwargs):
+        """
+        Streams text deltas. Failures before the first token are retried and fall back like
+        complete(); once tokens have been shown, an error is raised instead of restarting.
+        When the caller stops reading and closes the generator (a cancelled job), the HTTP
+        stream is closed and the span is ended as cancelled.
+        """
+        config = config or GatewayConfig()
+        # Not made the current span: the caller's code runs between the yields
+        telemetry = get_telemetry()
+        stream_span = telemetry.start_span("llm.stream", requested=name)
+        attempts = self._attempts(name, messages, api_keys, config)
+        outcome = next(attempts, None)
+        last_error, tries, ended = None, 0, False
+        try:
+            while outcome is not None:
+                model_name, api_key, waited = outcome
+                tries += 1
+                started = time.perf_counter()
+                output, usage, streamed, response = "", None, False, None
+                try:
+                    response = self._request(model_name, api_key, messages, stream=True, stream_options={"include_usage": True}, **kwargs)
+                    for chunk in response:
+                        if chunk.usage:
+                            usage = chunk.usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if not streamed:
+                                stream_span.set(ttft=round(time.perf_counter() - started, 3))
+                            streamed = True
+                            output += chunk.choices[0].delta.content
+                            yield chunk.choices[0].delta.content
+                except Exception as e:
+                    if streamed:
+                        ended = True
+                        telemetry.end_span(stream_span, e)
+                        raise
+                    last_error = e
+                    outcome = next_attempt(attempts, e)
+                    continue
+                except GeneratorExit:
+                    # Settle the token reservation with what was generated before the caller stopped
+                    stream_span.set(attempts=tries, queue_delay=round(waited, 3), cancelled=True)
+                    self._record(model_name, api_key, messages, started,
+                                 estimate_tokens([{"content": output}]) if output else 0, None, stream_span)
+                    raise
+                finally:
+                    if response is not None:
+                        response.close()
+                stream_span.set(attempts=tries, queue_delay=round(waited, 3))
+                self._record(model_name, api_key, messages, started,
+                             usage.completion_tokens if usage else estimate_tokens([{"content": output}]),
+                             usage.prompt_tokens if usage else None, stream_span)
+                ended = True
+                telemetry.end_span(stream_span)
+                return
+            error = GatewayError(f"All models failed for {name}: {last_error}")
+            stream_span.set(attempts=tries)
+            ended = True
+            telemetry.end_span(stream_span, error)
+            raise error from last_error
+        finally:
+            attempts.close()
+            if not ended:
+                stream_span.set(cancelled=True)
+                telemetry.end_span(stream_span)
+
+    def summary(self):
+        """Rows for st.table, one per model that was used."""
+        with self._lock:
+            snapshot = {name: replace(stats) for name, stats in self.stats.items()}
+        return [
+            {
+                "model": name,
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "retries": stats.retries,
+                "fallbacks": stats.fallbacks,
+                "tokens/s": round(stats.tokens_per_second, 1),
+                "mean queue delay (s)": round(stats.mean_queue_delay, 2),
+            }
+            for name, stats in snapshot.items()
+        ]
+
+
+def next_attempt(attempts, error):
+    try:
+        return attempts.send(error)
+    except StopIteration:
+        return None
+
+
+class GatewayLLM(BaseLLM):
+    """
+    crewai LLM that routes an agent's calls through the LLMGateway for one MODEL_PROVIDERS entry,
+    with the API keys and GatewayConfig of the session that built it.
+    """
+
+    gateway: Any = None
+    provider_name: str = ""
+    api_keys: dict = Field(default_factory=dict, exclude=True, repr=False)
+    gateway_config: Any = None
+
+    @classmethod
+    def _wrap_call_method(cls, method_name):
+        # crewai wraps call() in its own rate-limit retry loop; the gateway already retries and falls back
+        return
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        kwargs = {"temperature": self.temperature}
+        if self.stop_sequences:
+            kwargs["stop"] = self.stop_sequences[:4]  # OpenAI-compatible APIs accept up to four
+        return self._apply_stop_words(
+            self.gateway.complete(self.provider_name, messages, self.api_keys, self.gateway_config, **kwargs)
+        )
+
+    def stream_text(self, messages):
+        """Streams text deltas of a plain chat completion, for answers shown token by token."""
+        return self.gateway.stream(self.provider_name, messages, self.api_keys, self.gateway_config, temperature=self.temperature)
+
+    def supports_function_calling(self):
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway(providers):
+    """
+    Process-wide gateway, so rate limits and stats are shared by every session using the same keys.
+    Built from the first caller's providers; keys and policy come with each call.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(providers)
+        return _gateway
@@ -1,7 +1,12 @@
+import os
+import tempfile
 import streamlit as st
-import pdfplumber
-from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
+from embedding_service import get_embedding_model, EMBEDDING_SIZE
+from chunking import CHUNKERS, DEFAULT_CHUNKER, MODEL_MAX_TOKENS, make_chunker
+from collection_config import STORAGE_PRESETS
+from ingestion import ensure_collection, ingest_pdf
+from qdrant_pool import DEFAULT_PREFER_GRPC, get_async_qdrant_client, get_qdrant_client
+from telemetry import get_telemetry, span
 
 # Initialize Qdrant API key and URL
 if "qdrant_key" not in st.session_state:
@@ -34,81 +39,99 @@ with col2:
         placeholder="Your Qdrant API Key here"
     )
 
-# Initialize SentenceTransformer model
-ST_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# Shared SentenceTransformer model, loaded once per process
+ST_model = get_embedding_model()
 
 # Ensure Qdrant API key and URL are provided
 if st.session_state.qdrant_key and st.session_state.qdrant_url:
 
-    # Initialize Qdrant Client
-    qdrant = QdrantClient(url=st.session_state.qdrant_url, api_key=st.session_state.qdrant_key, timeout=60)
+    # Process-wide clients for this URL and key; upserts go through the async one concurrently
+    prefer_grpc = st.toggle("Use gRPC", value=DEFAULT_PREFER_GRPC, help="Faster uploads; needs the Qdrant gRPC port (6334).")
+    qdrant = get_qdrant_client(st.session_state.qdrant_url, st.session_state.qdrant_key, prefer_grpc=prefer_grpc)
+    async_qdrant = get_async_qdrant_client(st.session_state.qdrant_url, st.session_state.qdrant_key, prefer_grpc=prefer_grpc)
 
     COLLECTION_NAME = "pdf_chunks"
 
+    # Vector storage layout; only applies when the collection is created
+    with st.expander("Storage settings"):
+        storage_preset = st.selectbox(
+            "Vector storage:",
+            list(STORAGE_PRESETS),
+            help="Quantized and on-disk layouts need far less RAM on the Qdrant node as the corpus grows.",
+        )
+
     # Function to check if a collection exists and create it if not
     def create_collection_if_not_exists():
-        try:
-            # Try to retrieve collection info
-            qdrant.get_collection(COLLECTION_NAME)
-            st.write(f"Collection '{COLLECTION_NAME}' already exists.")
-        except Exception:
-            # If collection doesn't exist, create it
-            qdrant.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config={"size": 384, "distance": "Cosine"}  # Correct size based on model output
-            )
+        if ensure_collection(qdrant, COLLECTION_NAME, EMBEDDING_SIZE, STORAGE_PRESETS[storage_preset]):  # Correct size based on model output
             st.write(f"Collection '{COLLECTION_NAME}' created.")
+        else:
+            st.write(f"Collection '{COLLECTION_NAME}' already exists.")
 
     # Call function to ensure collection exists
     create_collection_if_not_exists()
 
-    # Function to extract text from the uploaded PDF
-    def extract_text_from_pdf(file):
-        with pdfplumber.open(file) as pdf:
-            return " ".join(page.extract_text() for page in pdf.pages if page.extract_text())
-
-    # Function to get embeddings for the text chunks using Hugging Face model
-    def get_embeddings(texts):
-        # The ST_model.encode() will generate embeddings (vectors) for the input text
-        return ST_model.encode(texts)
-
     # Streamlit UI to upload PDF and process it
     st.title("Upload and Process PDF")
     uploaded_file = st.file_uploader("Upload a PDF", type="pdf", accept_multiple_files=False)
 
+    # How the text is split before embedding; sentence chunks are sized in model tokens
+    with st.expander("Chunking settings"):
+        chunker_name = st.selectbox("Chunker:", list(CHUNKERS), index=list(CHUNKERS).index(DEFAULT_CHUNKER))
+        if chunker_name == "sentence":
+            chunker = make_chunker(
+                chunker_name,
+                max_tokens=st.slider("Max tokens per chunk", 32, MODEL_MAX_TOKENS, 200),
+                overlap_tokens=st.slider("Overlap tokens", 0, 128, 32),
+            )
+        else:
+            chunker = make_chunker(chunker_name, chunk_size=st.slider("Characters per chunk", 100, 2000, 500, 50))
+
     if uploaded_file:
         st.write("Processing the uploaded PDF...")
         
         pdf_name = uploaded_file.name
-        # Extract text from the PDF
-        pdf_text = extract_text_from_pdf(uploaded_file)
-        
-        # Split the PDF text into smaller chunks (adjust as needed)
-        chunk_size = 500  # Adjust this based on your needs
-        chunks = [pdf_text[i:i + chunk_size] for i in range(0, len(pdf_text), chunk_size)]
-        
-        # Get embeddings for each chunk using Hugging Face model
-        embeddings = get_embeddings(chunks)
-        
-        # Store chunks with their corresponding vectors in Qdrant
-        points = [
-            {
-                "id": i,
-                "vector": embeddings[i].tolist(),  # Convert numpy array to list for Qdrant
-                "payload": {"Source": pdf_name, "text": chunk}
-            }
-            for i, chunk in enumerate(chunks)
-        ]
-
-        batch_size = 100
-        # Insert chunks with vectors into Qdrant
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
-            qdrant.upsert(collection_name=COLLECTION_NAME, points=batch)
+
+        # Extraction workers read the PDF from disk, so spool the upload to a temporary file
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(uploaded_file.getbuffer())
+            pdf_path = tmp.name
+
+        progress_bar = st.progress(0.0, text="Extracting pages...")
+
+        def show_progress(pages_done, page_count, chunks_done):
+            progress_bar.progress(
+                pages_done / page_count if page_count else 1.0,
+                text=f"Page {pages_done}/{page_count}, {chunks_done} chunks stored",
+            )
+
+        try:
+            # Pages are extracted in worker processes, then chunked, embedded and upserted batch by batch
+            with span("upload", source=pdf_name, bytes=uploaded_file.size) as upload_span:
+                stats = ingest_pdf(
+                    pdf_path,
+                    source=pdf_name,
+                    qdrant=qdrant,
+                    collection_name=COLLECTION_NAME,
+                    embed=ST_model.encode,
+                    chunker=chunker,
+                    progress=show_progress,
+                    async_qdrant=async_qdrant,
+                    index_key=st.session_state.qdrant_url,
+                )
+        finally:
+            os.remove(pdf_path)
 
         st.session_state.file_uploader = None
 
-        st.success("PDF "+ pdf_name +" processed and text with vectors stored in Qdrant!")
+        if stats.skipped:
+            st.info(f"PDF {pdf_name} is unchanged since it was last indexed; nothing to do.")
+        else:
+            st.success(
+                f"PDF {pdf_name} processed: {stats.chunks} chunks from {stats.pages} pages, "
+                f"{stats.embedded} new chunks embedded and stored in Qdrant in {stats.seconds:.1f}s!"
+            )
+            with st.expander("Trace"):
+                st.table(get_telemetry().trace_breakdown(upload_span.trace_id))
 
 else:
     st.warning("Please enter your Qdrant API key and URL to proceed.")
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import threading
+from collections import deque
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from telemetry import get_telemetry
+
+# gRPC is faster for large upserts and searches, but needs port 6334 to be reachable
+DEFAULT_PREFER_GRPC = os.environ.get("QDRANT_PREFER_GRPC", "").lower() in ("1", "true", "yes")
+DEFAULT_TIMEOUT = 60
+
+# One client per (url, api_key, prefer_grpc) for the whole process; clients hold the connection pool
+_clients = {}
+_async_clients = {}
+_known_collections = set()
+_lock = threading.Lock()
+
+_loop = None
+
+
+def _client_key(url, api_key, prefer_grpc):
+    return url, api_key, DEFAULT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+
+
+def get_qdrant_client(url, api_key=None, prefer_grpc=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Returns the process-wide QdrantClient for this URL and key, creating it on first use only.
+
+    Parameters:
+        url (str): Qdrant URL.
+        api_key (str): Qdrant API key.
+        prefer_grpc (bool): Talk gRPC instead of REST. Defaults to QDRANT_PREFER_GRPC.
+        timeout (int): Request timeout in seconds.
+    """
+    key = _client_key(url, api_key, prefer_grpc)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = QdrantClient(url=url, api_key=api_key, prefer_grpc=key[2], timeout=timeout)
+        return _clients[key]
+
+
+def _event_loop():
+    """Event loop on a daemon thread that owns every AsyncQdrantClient of this process."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="qdrant-async", daemon=True).start()
+        return _loop
+
+
+def run_async(coroutine):
+    """Schedules a coroutine on the Qdrant event loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coroutine, _event_loop())
+
+
+def get_async_qdrant_client(url, api_key=None, prefer_grpc=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Returns the process-wide AsyncQdrantClient for this URL and key.
+
+    It is bound to the shared event loop, so only use it through run_async().
+    """
+    key = _client_key(url, api_key, prefer_grpc)
+    with _lock:
+        client = _async_clients.get(key)
+    if client is None:
+        async def create():
+            return AsyncQdrantClient(url=url, api_key=api_key, prefer_grpc=key[2], timeout=timeout)
+        client = run_async(create()).result()
+        with _lock:
+            client = _async_clients.setdefault(key, client)
+    return client
+
+
+def collection_known(client, collection_name):
+    """
+    collection_exists() with the positive answer cached for the life of the process.
+
+    A missing collection is asked again each time, so it is seen as soon as it is created.
+    """
+    key = (id(client), collection_name)
+    if key in _known_collections:
+        return True
+    if client.collection_exists(collection_name):
+        _known_collections.add(key)
+        return True
+    return False
+
+
+def forget_collection(client, collection_name):
+    """Drops the cached existence check, e.g. after deleting the collection."""
+    _known_collections.discard((id(client), collection_name))
+
+
+class BatchUpserter:
+    """
+    Upserts batches of points with at most max_in_flight requests running at once.
+
+    With an AsyncQdrantClient the upserts run on the shared event loop while the caller
+    embeds the next batch; submit() blocks once max_in_flight batches are outstanding.
+    Without one, every batch is upserted inline on the sync client.
+
+    Parameters:
+        qdrant (QdrantClient): Sync client, used when async_qdrant is None.
+        collection_name (str): Target collection.
+        async_qdrant (AsyncQdrantClient): Client from get_async_qdrant_client().
+        max_in_flight (int): Upserts allowed to run concurrently.
+    """
+
+    def __init__(self, qdrant, collection_name, async_qdrant=None, max_in_flight=4):
+        self.qdrant = qdrant
+        self.collection_name = collection_name
+        self.async_qdrant = async_qdrant
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = deque()
+
+    def submit(self, points):
+        telemetry = get_telemetry()
+        if self.async_qdrant is None:
+            with telemetry.span("qdrant.upsert", collection=self.collection_name, points=len(points)):
+                self.qdrant.upsert(collection_name=self.collection_name, points=points)
+            return
+        while len(self._in_flight) >= self.max_in_flight:
+            self._in_flight.popleft().result()
+        # The span runs from submission until the upsert completes on the event loop
+        upsert_span = telemetry.start_span("qdrant.upsert", collection=self.collection_name, points=len(points), concurrent=True)
+        future = run_async(self.async_qdrant.upsert(collection_name=self.collection_name, points=points))
+        future.add_done_callback(lambda done: telemetry.end_span(upsert_span, None if done.cancelled() else done.exception()))
+        self._in_flight.append(future)
+
+    def drain(self):
+        """Waits for every submitted batch; raises the first upsert error."""
+        while self._in_flight:
+            self._in_flight.popleft().result()
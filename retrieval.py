@@ -0,0 +1,308 @@
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from qdrant_client import models
+
+from collection_config import KEYWORD_VECTOR, has_keyword_vector, storage_from_collection
+from qdrant_pool import collection_known
+from telemetry import span
+
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Payload fields that get a Qdrant index, so filtering on them does not scan every point
+PAYLOAD_INDEXES = {
+    "Source": models.PayloadSchemaType.KEYWORD,
+    "doc_hash": models.PayloadSchemaType.KEYWORD,
+    "page_start": models.PayloadSchemaType.INTEGER,
+}
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# BM25 term-frequency saturation for the keyword vectors; Qdrant supplies the IDF part
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_AVERAGE_LENGTH = 120  # Typical chunk length in words; the real average is unknown while indexing
+
+SOURCES_TTL_SECONDS = 60
+
+
+@dataclass
+class RetrievalConfig:
+    """
+    Parameters:
+        top_k (int): Chunks handed to the agents.
+        candidates (int): Chunks fetched from each of the dense and sparse retrievers before fusion.
+        use_sparse (bool): Fuse dense results with BM25 keyword search on the collection's sparse vectors.
+        rerank (bool): Re-order the fused top candidates with a cross-encoder.
+        rerank_candidates (int): How many fused candidates the cross-encoder scores.
+        budget_ms (int): Latency budget for one retrieval; optional stages are skipped once it is spent.
+    """
+    top_k: int = 5
+    candidates: int = 20
+    use_sparse: bool = True
+    rerank: bool = False
+    rerank_candidates: int = 10
+    budget_ms: int = 800
+
+
+@dataclass
+class RetrievedChunk:
+    id: object
+    payload: dict
+    score: float
+    dense_score: float = None
+    sparse_score: float = None
+
+
+@dataclass
+class RetrievalResult:
+    chunks: list
+    top_dense_score: float = None  # Best cosine similarity of the dense search
+    timings: dict = field(default_factory=dict)
+    skipped: list = field(default_factory=list)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def build_filter(sources=None, **fields):
+    """Qdrant filter on Source (any of `sources`) and exact matches on other payload fields."""
+    conditions = []
+    if sources:
+        conditions.append(models.FieldCondition(key="Source", match=models.MatchAny(any=list(sources))))
+    for key, value in fields.items():
+        if value is not None:
+            conditions.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
+    return models.Filter(must=conditions) if conditions else None
+
+
+def term_id(term):
+    """Stable sparse vector index of a term (the same in every process)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def keyword_vector(text):
+    """BM25 term weights of a chunk as a sparse vector, stored next to its dense vector."""
+    counts = Counter(term_id(term) for term in tokenize(text))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(counts.values()) / BM25_AVERAGE_LENGTH)
+    indices = sorted(counts)
+    return models.SparseVector(indices=indices, values=[counts[i] * (BM25_K1 + 1) / (counts[i] + norm) for i in indices])
+
+
+def keyword_query(text):
+    """Sparse query vector: every query term once; Qdrant weights the matches by IDF."""
+    indices = sorted({term_id(term) for term in tokenize(text)})
+    return models.SparseVector(indices=indices, values=[1.0] * len(indices))
+
+
+@dataclass
+class CollectionLayout:
+    """What a query needs to know about a collection: search params for its storage and whether it has keyword vectors."""
+    search_params: object
+    keywords: bool
+
+
+_layouts = {}  # (index_key, collection_name) -> CollectionLayout
+_layouts_lock = threading.Lock()
+
+
+def collection_layout(client, collection_name, index_key=None):
+    """
+    The collection's CollectionLayout, read once per Qdrant instance and process; None while
+    the collection does not exist (nothing has been uploaded yet).
+
+    The first read also creates missing PAYLOAD_INDEXES, for collections made before they existed.
+    """
+    key = (index_key or id(client), collection_name)
+    layout = _layouts.get(key)
+    if layout is not None:
+        return layout
+    with _layouts_lock:
+        if key in _layouts:
+            return _layouts[key]
+        if not collection_known(client, collection_name):
+            return None
+        collection_info = client.get_collection(collection_name)
+        existing = collection_info.payload_schema or {}
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name not in existing:
+                client.create_payload_index(collection_name, field_name=field_name, field_schema=schema)
+        layout = CollectionLayout(storage_from_collection(collection_info).search_params(), has_keyword_vector(collection_info))
+        _layouts[key] = layout
+        return layout
+
+
+def forget_collection_layout(collection_name):
+    """Drops the cached collection_layout() of a collection, e.g. after it was (re)created."""
+    with _layouts_lock:
+        for key in [key for key in _layouts if key[1] == collection_name]:
+            del _layouts[key]
+
+
+_sources = {}  # (id(client), collection_name) -> (fetched at, names)
+
+
+def list_sources(client, collection_name, limit=1000):
+    """
+    Document names in the collection, read from the Source payload index.
+
+    Cached for SOURCES_TTL_SECONDS, since the chat reruns on every interaction; ingestion in
+    this process calls forget_sources() so a new upload shows up straight away. Empty while
+    the collection does not exist.
+    """
+    key = (id(client), collection_name)
+    cached = _sources.get(key)
+    if cached and time.time() - cached[0] < SOURCES_TTL_SECONDS:
+        return cached[1]
+    if not collection_known(client, collection_name):
+        return []
+    hits = client.facet(collection_name, key="Source", limit=limit).hits
+    names = sorted(hit.value for hit in hits)
+    _sources[key] = (time.time(), names)
+    return names
+
+
+def forget_sources(collection_name):
+    """Drops the cached list_sources() of a collection, for every client."""
+    for key in [key for key in _sources if key[1] == collection_name]:
+        _sources.pop(key, None)
+
+
+_cross_encoders = {}
+_shared_lock = threading.Lock()
+
+
+def get_cross_encoder(model_name=RERANK_MODEL_NAME):
+    with _shared_lock:
+        if model_name not in _cross_encoders:
+            from sentence_transformers import CrossEncoder
+            _cross_encoders[model_name] = CrossEncoder(model_name)
+        return _cross_encoders[model_name]
+
+
+def reciprocal_rank_fusion(*rankings, k=60):
+    """Merges ranked lists of RetrievedChunk by summing 1 / (k + rank) per chunk."""
+    fused = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking):
+            entry = fused.setdefault(chunk.id, RetrievedChunk(chunk.id, chunk.payload, 0.0))
+            entry.score += 1.0 / (k + rank + 1)
+            if chunk.dense_score is not None:
+                entry.dense_score = chunk.dense_score
+            if chunk.sparse_score is not None:
+                entry.sparse_score = chunk.sparse_score
+    return sorted(fused.values(), key=lambda chunk: chunk.score, reverse=True)
+
+
+class Retriever:
+    """
+    Dense Qdrant search, optionally fused with BM25 and re-ranked by a cross-encoder.
+
+    Keyword search runs in Qdrant on the collection's sparse vectors, in the same request as
+    the dense search, so it always sees the current points and nothing is held in this process.
+
+    Parameters:
+        client (QdrantClient): Client for the collection.
+        collection_name (str): Collection with the document chunks.
+        index_key (str): Identifies the Qdrant instance (e.g. its URL) for the process-wide caches.
+        config (RetrievalConfig): Retrieval settings.
+    """
+
+    def __init__(self, client, collection_name, index_key=None, config=None):
+        self.client = client
+        self.collection_name = collection_name
+        self.index_key = index_key
+        self.config = config or RetrievalConfig()
+
+    def retrieve(self, query, query_vector, sources=None, **fields):
+        """
+        Parameters:
+            query (str): The user's question, for BM25 and re-ranking.
+            query_vector: Its embedding.
+            sources (list[str]): Only search these documents; all documents when empty.
+            fields: Exact-match filters on other payload fields.
+        """
+        config = self.config
+        start = time.perf_counter()
+        timings, skipped = {}, []
+
+        def elapsed_ms():
+            return (time.perf_counter() - start) * 1000
+
+        # The storage layout sets the search params; read once per collection, not per query
+        layout = collection_layout(self.client, self.collection_name, self.index_key)
+        if layout is None:
+            timings["total"] = elapsed_ms()
+            return RetrievalResult([], None, timings, ["search (no documents uploaded yet)"])
+
+        limit = config.candidates if (config.use_sparse or config.rerank) else config.top_k
+        query_filter = build_filter(sources, **fields)
+        with span("qdrant.search", collection=self.collection_name, limit=limit, filtered=bool(sources or fields)) as search_span:
+            requests = [models.QueryRequest(
+                query=list(map(float, query_vector)),
+                filter=query_filter,
+                params=layout.search_params,
+                limit=limit,
+                with_payload=True,
+            )]
+            keywords = None
+            if config.use_sparse:
+                if layout.keywords:
+                    keywords = keyword_query(query)
+                else:
+                    skipped.append("sparse (collection has no keyword vectors)")
+            if keywords and keywords.indices:
+                requests.append(models.QueryRequest(
+                    query=keywords, using=KEYWORD_VECTOR, filter=query_filter, limit=config.candidates, with_payload=True,
+                ))
+            # Dense and keyword search in one round trip
+            responses = self.client.query_batch_points(self.collection_name, requests)
+            dense = [
+                RetrievedChunk(point.id, point.payload, point.score, dense_score=point.score)
+                for point in responses[0].points
+            ]
+            sparse = [
+                RetrievedChunk(point.id, point.payload, point.score, sparse_score=point.score)
+                for point in responses[1].points
+            ] if len(responses) > 1 else None
+            search_span.set(hits=len(dense), **({"keyword_hits": len(sparse)} if sparse is not None else {}))
+        timings["search"] = elapsed_ms()
+        ranked = reciprocal_rank_fusion(dense, sparse) if sparse is not None else dense
+
+        if config.rerank and ranked:
+            # Only re-rank when at least half of the budget is left for it
+            if elapsed_ms() < config.budget_ms / 2:
+                rerank_start = elapsed_ms()
+                candidates = ranked[:config.rerank_candidates]
+                with span("rerank", candidates=len(candidates)):
+                    scores = get_cross_encoder().predict([(query, c.payload.get("text", "")) for c in candidates])
+                for chunk, score in zip(candidates, scores):
+                    chunk.score = float(score)
+                ranked = sorted(candidates, key=lambda chunk: chunk.score, reverse=True) + ranked[config.rerank_candidates:]
+                timings["rerank"] = elapsed_ms() - rerank_start
+            else:
+                skipped.append("rerank (over budget)")
+
+        timings["total"] = elapsed_ms()
+        top_dense_score = dense[0].dense_score if dense else None
+        return RetrievalResult(ranked[:config.top_k], top_dense_score, timings, skipped)
+
+
+def format_context(chunks):
+    """Renders retrieved chunks for the Context_Filter agent, with source and pages."""
+    if not chunks:
+        return "No relevant context found."
+    parts = []
+    for chunk in chunks:
+        payload = chunk.payload
+        location = payload["Source"]
+        if payload.get("page_start"):
+            pages = payload["page_start"] if payload["page_start"] == payload.get("page_end") else f"{payload['page_start']}-{payload.get('page_end')}"
+            location += f", page {pages}"
+        parts.append(f"Source: {location}\nText: {payload['text']}")
+    return "\n".join(parts)
@@ -0,0 +1,141 @@
+import re
+import threading
+from dataclasses import dataclass, field
+
+PATH_DIRECT = "direct"
+PATH_CREW = "crew"
+PATH_CACHE = "cache"  # Answered from the semantic cache, see semantic_cache.py
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|hallo|goedemorgen|good (morning|afternoon|evening)|thanks|thank you|bedankt|bye|ok(ay)?)\b[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+# Words that usually mean the question needs the full refine/answer/summarize crew
+COMPLEX_MARKERS = (
+    "explain", "compare", "difference", "why", "how do", "how does", "how can", "step by step",
+    "analyse", "analyze", "summarize", "summarise", "pros and cons", "document", "pdf", "source",
+)
+
+COMPLEX_PATTERN = re.compile(r"\b(" + "|".join(map(re.escape, COMPLEX_MARKERS)) + r")\b")
+
+DIRECT_SYSTEM_PROMPT = (
+    "You are BramBot, a cheerful assistant who explains things clearly. "
+    "Answer the user's message directly and concisely."
+)
+
+
+@dataclass
+class RouterConfig:
+    """
+    Settings for the fast path in front of the crew.
+
+    Parameters:
+        enabled (bool): When False every message goes through the crew.
+        max_words (int): Longest question still considered simple.
+    """
+    enabled: bool = True
+    max_words: int = 12
+
+
+@dataclass
+class RouteDecision:
+    path: str
+    reason: str
+
+
+@dataclass
+class PathStats:
+    count: int = 0
+    total_latency: float = 0.0
+    latencies: list = field(default_factory=list)
+    ttfts: list = field(default_factory=list)
+
+    @property
+    def mean_latency(self):
+        return self.total_latency / self.count if self.count else 0.0
+
+    @property
+    def mean_ttft(self):
+        return sum(self.ttfts) / len(self.ttfts) if self.ttfts else 0.0
+
+
+class RouterStats:
+    """Routing decisions, answer latency and time-to-first-token per path, for the sidebar report."""
+
+    def __init__(self, keep_last=50):
+        self.keep_last = keep_last
+        self.paths = {PATH_CACHE: PathStats(), PATH_DIRECT: PathStats(), PATH_CREW: PathStats()}
+        self.decisions = []
+        self._lock = threading.Lock()
+
+    def record(self, decision, latency, ttft=None):
+        with self._lock:
+            stats = self.paths[decision.path]
+            stats.count += 1
+            stats.total_latency += latency
+            stats.latencies = (stats.latencies + [latency])[-self.keep_last:]
+            if ttft is not None:
+                stats.ttfts = (stats.ttfts + [ttft])[-self.keep_last:]
+            self.decisions = (self.decisions + [(decision.path, decision.reason, latency)])[-self.keep_last:]
+
+    def summary(self):
+        total = sum(stats.count for stats in self.paths.values())
+        return [
+            {
+                "path": path,
+                "messages": stats.count,
+                "share": f"{stats.count / total:.0%}" if total else "-",
+                "mean latency (s)": round(stats.mean_latency, 2),
+                "mean first token (s)": round(stats.mean_ttft, 2),
+            }
+            for path, stats in self.paths.items()
+        ]
+
+
+class QueryRouter:
+    """Decides per message whether one direct LLM call is enough or the full crew is needed."""
+
+    def __init__(self, config=None):
+        self.config = config or RouterConfig()
+
+    def route(self, user_input, use_docs=False, use_internet=False):
+        """
+        With documents or web search enabled only greetings and small talk skip the crew,
+        since the direct path answers without the retrieved context or a search.
+
+        Parameters:
+            user_input (str): The user's message.
+            use_docs (bool): Whether document retrieval is enabled.
+            use_internet (bool): Whether web search is enabled.
+        """
+        if not self.config.enabled:
+            return RouteDecision(PATH_CREW, "fast path disabled")
+
+        text = user_input.strip().lower()
+        if GREETING_PATTERN.match(text):
+            return RouteDecision(PATH_DIRECT, "greeting or small talk")
+
+        if use_internet:
+            return RouteDecision(PATH_CREW, "web search enabled")
+
+        if use_docs:
+            return RouteDecision(PATH_CREW, "documents enabled")
+
+        if COMPLEX_PATTERN.search(text):
+            return RouteDecision(PATH_CREW, "question needs a detailed answer")
+
+        if len(text.split()) > self.config.max_words:
+            return RouteDecision(PATH_CREW, f"longer than {self.config.max_words} words")
+
+        return RouteDecision(PATH_DIRECT, "short question without documents or search")
+
+
+def direct_messages(user_input, history=""):
+    """Chat messages for answering without the agent pipeline."""
+    messages = [{"role": "system", "content": DIRECT_SYSTEM_PROMPT}]
+    if history.strip():
+        messages.append({"role": "system", "content": f"Previous chat history:\n{history}"})
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
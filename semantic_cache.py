@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from embedding_service import EMBEDDING_SIZE
+
+BACKEND_MEMORY = "memory"
+BACKEND_QDRANT = "qdrant"
+
+CACHE_COLLECTION_NAME = "semantic_cache"
+
+# The cache is shared by every session, so its settings are the operator's, e.g.
+# BRAMBOT_CACHE_BACKEND=qdrant BRAMBOT_CACHE_THRESHOLD=0.95 BRAMBOT_CACHE_TTL=600
+DEFAULT_BACKEND = os.environ.get("BRAMBOT_CACHE_BACKEND", BACKEND_MEMORY)
+DEFAULT_THRESHOLD = float(os.environ.get("BRAMBOT_CACHE_THRESHOLD", "0.92"))
+DEFAULT_TTL_SECONDS = int(os.environ.get("BRAMBOT_CACHE_TTL", "3600"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("BRAMBOT_CACHE_MAX_ENTRIES", "1000"))
+DEFAULT_CACHE_PATH = os.environ.get("BRAMBOT_CACHE_PATH", ".brambot/semantic_cache")
+
+
+@dataclass
+class SemanticCacheConfig:
+    """
+    Settings for reusing answers to semantically similar questions.
+
+    Operator settings: the shared cache reads them from the environment, never from the app's UI;
+    a session can only choose whether it uses the cache.
+
+    Parameters:
+        backend (str): "memory" keeps entries in this process, "qdrant" stores them in a local Qdrant collection.
+        threshold (float): Minimum cosine similarity for a cached answer to be reused.
+        ttl_seconds (int): Age after which an entry is no longer served.
+        max_entries (int): Entries kept per namespace before the least recently used ones are evicted.
+        path (str): Directory of the local Qdrant store, only used by the "qdrant" backend.
+    """
+    backend: str = DEFAULT_BACKEND
+    threshold: float = DEFAULT_THRESHOLD
+    ttl_seconds: int = DEFAULT_TTL_SECONDS
+    max_entries: int = DEFAULT_MAX_ENTRIES
+    path: str = DEFAULT_CACHE_PATH
+
+
+@dataclass
+class CacheHit:
+    question: str
+    answer: str
+    similarity: float
+
+
+def cache_namespace(model_config, use_docs, use_internet, section="", document_set=""):
+    """
+    Answers are only reused for the same model, toggles and document set. With documents the
+    namespace includes the manifest section, i.e. the Qdrant instance and collection, so an
+    answer from one instance's documents is never served to users of another.
+    """
+    documents = f"{section}|{document_set}" if use_docs else ""
+    return f"{model_config['model']}|docs={int(bool(use_docs))}|web={int(bool(use_internet))}|{documents}"
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class InMemorySemanticCache:
+    """Per-namespace LRU of normalised query vectors, searched with one matrix product."""
+
+    def __init__(self, config):
+        self.config = config
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, namespace, vector):
+        query = _normalize(vector)
+        now = time.time()
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if not entries:
+                return None
+
+            # Drop expired entries before searching
+            for key in [k for k, e in entries.items() if now - e["created"] > self.config.ttl_seconds]:
+                del entries[key]
+            if not entries:
+                return None
+
+            keys = list(entries)
+            scores = np.stack([entries[k]["vector"] for k in keys]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.config.threshold:
+                return None
+
+            entries.move_to_end(keys[best])  # Mark as recently used
+            entry = entries[keys[best]]
+            return CacheHit(entry["question"], entry["answer"], float(scores[best]))
+
+    def store(self, namespace, vector, question, answer):
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            entries[uuid.uuid4().hex] = {
+                "vector": _normalize(vector),
+                "question": question,
+                "answer": answer,
+                "created": time.time(),
+            }
+            while len(entries) > self.config.max_entries:
+                entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._namespaces.clear()
+
+
+class QdrantSemanticCache:
+    """Same behaviour as InMemorySemanticCache, persisted in a local (embedded) Qdrant collection."""
+
+    def __init__(self, config, client=None):
+        self.config = config
+        self.client = client or QdrantClient(path=config.path)
+        self._lock = threading.Lock()
+        if not self.client.collection_exists(CACHE_COLLECTION_NAME):
+            self.client.create_collection(
+                collection_name=CACHE_COLLECTION_NAME,
+                vectors_config=models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE),
+            )
+
+    def _namespace_filter(self, namespace, fresh_after=None):
+        conditions = [models.FieldCondition(key="namespace", match=models.MatchValue(value=namespace))]
+        if fresh_after is not None:
+            conditions.append(models.FieldCondition(key="created", range=models.Range(gte=fresh_after)))
+        return models.Filter(must=conditions)
+
+    def lookup(self, namespace, vector):
+        now = time.time()
+        with self._lock:
+            hits = self.client.query_points(
+                collection_name=CACHE_COLLECTION_NAME,
+                query=_normalize(vector).tolist(),
+                query_filter=self._namespace_filter(namespace, fresh_after=now - self.config.ttl_seconds),
+                score_threshold=self.config.threshold,
+                limit=1,
+            ).points
+            if not hits:
+                return None
+
+            hit = hits[0]
+            self.client.set_payload(
+                collection_name=CACHE_COLLECTION_NAME,
+                payload={"last_used": now},
+                points=[hit.id],
+            )
+            return CacheHit(hit.payload["question"], hit.payload["answer"], hit.score)
+
+    def store(self, namespace, vector, question, answer):
+        now = time.time()
+        with self._lock:
+            self.client.upsert(
+                collection_name=CACHE_COLLECTION_NAME,
+                points=[models.PointStruct(
+                    id=uuid.uuid4().hex,
+                    vector=_normalize(vector).tolist(),
+                    payload={
+                        "namespace": namespace,
+                        "question": question,
+                        "answer": answer,
+                        "created": now,
+                        "last_used": now,
+                    },
+                )],
+            )
+            self._evict(namespace)
+
+    def _evict(self, namespace):
+        # Remove expired entries and, above max_entries, the least recently used ones
+        points, _ = self.client.scroll(
+            collection_name=CACHE_COLLECTION_NAME,
+            scroll_filter=self._namespace_filter(namespace),
+            with_payload=["created", "last_used"],
+            limit=self.config.max_entries * 2 + 100,
+        )
+        now = time.time()
+        expired = [p.id for p in points if now - p.payload["created"] > self.config.ttl_seconds]
+        expired_ids = set(expired)
+        fresh = sorted(
+            (p for p in points if p.id not in expired_ids),
+            key=lambda p: p.payload["last_used"],
+        )
+        overflow = [p.id for p in fresh[:max(0, len(fresh) - self.config.max_entries)]]
+        if expired or overflow:
+            self.client.delete(
+                collection_name=CACHE_COLLECTION_NAME,
+                points_selector=models.PointIdsList(points=expired + overflow),
+            )
+
+    def clear(self):
+        with self._lock:
+            self.client.delete_collection(CACHE_COLLECTION_NAME)
+            self.client.create_collection(
+                collection_name=CACHE_COLLECTION_NAME,
+                vectors_config=models.VectorParams(size=EMBEDDING_SIZE, distance=models.Distance.COSINE),
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """
+    Process-wide answer cache shared by every session, configured from the environment
+    (BRAMBOT_CACHE_BACKEND, BRAMBOT_CACHE_THRESHOLD, BRAMBOT_CACHE_TTL, BRAMBOT_CACHE_MAX_ENTRIES,
+    BRAMBOT_CACHE_PATH) when it is first used.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = SemanticCacheConfig()
+            _cache = QdrantSemanticCache(config) if config.backend == BACKEND_QDRANT else InMemorySemanticCache(config)
+        return _cache
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from openai import OpenAI
+
+# litellm-style provider prefixes in MODEL_PROVIDERS that the raw OpenAI-compatible API does not expect
+PROVIDER_PREFIXES = ("groq/", "openai/")
+
+# Shown in the status box while a stage runs
+STAGE_LABELS = {
+    "Refine question": "Refining the question",
+    "Filter context": "Filtering document context",
+    "Search internet": "Searching the internet",
+    "Answer question": "Working out the answer",
+    "Answer from documents": "Answering from your documents",
+    "Summarize answer": "Summarizing the answer",
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(base_url, api_key):
+    """One OpenAI-compatible HTTP client per (base_url, api_key), reused across reruns."""
+    key = (base_url, api_key)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OpenAI(base_url=base_url, api_key=api_key)
+        return _clients[key]
+
+
+def api_model_name(model):
+    for prefix in PROVIDER_PREFIXES:
+        if model.startswith(prefix):
+            return model[len(prefix):]
+    return model
+
+
+def stage_label(name):
+    return STAGE_LABELS.get(name, name)
+
+
+def task_messages(task, context=None):
+    """Renders a crewai Task as chat messages, mirroring the prompt an agent would send."""
+    agent = task.agent
+    system = f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+    user = f"{task.description}\n\nThis is the expected criteria for your final answer: {task.expected_output}"
+    if context:
+        user += f"\n\nThis is the context you're working with:\n{context}"
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+
+
+def stream_chat(model_config, api_key, messages, temperature=0.5):
+    """
+    Streams a chat completion from the provider in model_config, yielding text deltas.
+
+    Parameters:
+        model_config (dict): Entry from MODEL_PROVIDERS.
+        api_key (str): Provider API key.
+        messages (list[dict]): OpenAI-style chat messages.
+    """
+    client = get_openai_client(model_config["base_url"], api_key)
+    stream = client.chat.completions.create(
+        model=api_model_name(model_config["model"]),
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()
+
+
+class TimedStream:
+    """Wraps a token generator and records time-to-first-token and total streaming time."""
+
+    def __init__(self, tokens, started=None):
+        self.tokens = tokens
+        self.started = started if started is not None else time.perf_counter()
+        self.ttft = None
+        self.total = None
+        self.text = ""
+
+    def __iter__(self):
+        try:
+            for token in self.tokens:
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self.started
+                self.text += token
+                yield token
+        finally:
+            # Closing this iterator early (a cancelled job) closes the underlying stream too
+            close = getattr(self.tokens, "close", None)
+            if close:
+                close()
+        self.total = time.perf_counter() - self.started
@@ -0,0 +1,193 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from telemetry import get_telemetry, in_current_context, span
+
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+
+@dataclass
+class StageTiming:
+    """Wall-clock timing of one task, relative to the start of the run."""
+    name: str
+    agent: str
+    started: float
+    duration: float
+    depends_on: list = field(default_factory=list)
+
+    @property
+    def finished(self):
+        return self.started + self.duration
+
+
+@dataclass
+class GraphResult:
+    """Outputs of every task plus the per-stage latency breakdown."""
+    outputs: dict
+    timings: list
+    total: float
+    final_output: object = None
+
+    @property
+    def raw(self):
+        return self.final_output.raw if self.final_output is not None else ""
+
+    def breakdown(self):
+        """Rows for st.table / st.dataframe, ordered by start time."""
+        return [
+            {
+                "stage": t.name,
+                "agent": t.agent,
+                "start (s)": round(t.started, 2),
+                "duration (s)": round(t.duration, 2),
+                "waits for": ", ".join(t.depends_on) or "-",
+            }
+            for t in sorted(self.timings, key=lambda t: t.started)
+        ]
+
+
+def task_name(task):
+    return task.name or task.description.split("\n", 1)[0][:40]
+
+
+def task_dependencies(task):
+    """The tasks whose output this task consumes, i.e. its crewai `context=[...]` list."""
+    return task.context if isinstance(task.context, list) else []
+
+
+def build_context(task, outputs):
+    """Joins the raw outputs of a task's dependencies, the way crewai passes context along."""
+    return CONTEXT_DIVIDER.join(outputs[id(dependency)].raw for dependency in task_dependencies(task))
+
+
+class TaskGraph:
+    """
+    Runs crewai tasks as a DAG built from their `context` dependencies.
+
+    Tasks whose dependencies are satisfied run concurrently on a thread pool, so
+    independent branches (question refinement and document context filtering) no
+    longer wait on each other like they do in a sequential Crew. The conversation
+    summary is not a task; ConversationMemory updates it in the background. The final
+    task is the last one in the list, matching Crew.kickoff().
+    """
+
+    def __init__(self, tasks, max_workers=4):
+        self.tasks = list(tasks)
+        self.max_workers = max_workers
+        self._dependencies = {id(task): task_dependencies(task) for task in self.tasks}
+
+        known = {id(task) for task in self.tasks}
+        for task in self.tasks:
+            for dependency in self._dependencies[id(task)]:
+                if id(dependency) not in known:
+                    raise ValueError(
+                        f"Task '{task_name(task)}' depends on '{task_name(dependency)}', which is not in the graph."
+                    )
+
+    def run(self, on_stage_start=None, on_stage_end=None):
+        """
+        Executes every task once, as soon as all of its dependencies have finished.
+
+        Parameters:
+            on_stage_start (callable): Called with the task name when a task is submitted.
+            on_stage_end (callable): Called with (task name, TaskOutput) when a task finishes.
+        """
+        outputs = {}
+        timings = []
+        run_start = time.perf_counter()
+        remaining = list(self.tasks)
+        running = {}
+
+        def execute(task, context):
+            started = time.perf_counter()
+            with span("task", task=task_name(task), agent=task.agent.role if task.agent else ""):
+                output = task.execute_sync(agent=task.agent, context=context)
+            return output, started - run_start, time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew-task") as pool:
+            while remaining or running:
+                for task in [t for t in remaining if self._ready(t, outputs)]:
+                    remaining.remove(task)
+                    context = build_context(task, outputs)
+                    if on_stage_start:
+                        on_stage_start(task_name(task))
+                    # Task spans (and the LLM calls inside them) keep the caller's span as parent
+                    running[pool.submit(in_current_context(execute), task, context or None)] = task
+
+                if not running:
+                    raise ValueError("Task graph has a dependency cycle.")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    output, started, duration = future.result()
+                    outputs[id(task)] = output
+                    timings.append(StageTiming(
+                        name=task_name(task),
+                        agent=task.agent.role if task.agent else "",
+                        started=started,
+                        duration=duration,
+                        depends_on=[task_name(d) for d in self._dependencies[id(task)]],
+                    ))
+                    if on_stage_end:
+                        on_stage_end(task_name(task), output)
+
+        return GraphResult(
+            outputs=outputs,
+            timings=timings,
+            total=time.perf_counter() - run_start,
+            final_output=outputs.get(id(self.tasks[-1])),
+        )
+
+    def _ready(self, task, outputs):
+        return all(id(dependency) in outputs for dependency in self._dependencies[id(task)])
+
+
+def run_sequential(crew, on_stage_end=None):
+    """
+    Runs a Crew the classic way and reports per-task latency in the same shape as TaskGraph.
+
+    Durations come from the gaps between task callbacks, since a sequential crew starts
+    each task as soon as the previous one ends.
+
+    Parameters:
+        on_stage_end (callable): Called with (task name, TaskOutput) when a task finishes.
+    """
+    finished_at = []
+    run_start = time.perf_counter()
+    telemetry = get_telemetry()
+    stage_start_ns = time.time_ns()
+
+    def task_finished(output):
+        nonlocal stage_start_ns
+        finished_at.append(time.perf_counter() - run_start)
+        # Crew runs the tasks itself, so each task span is recorded from the callback gaps
+        task = crew.tasks[len(finished_at) - 1]
+        now_ns = time.time_ns()
+        telemetry.record_span("task", stage_start_ns, now_ns, task=task_name(task), agent=task.agent.role if task.agent else "")
+        stage_start_ns = now_ns
+        if on_stage_end:
+            on_stage_end(task_name(task), output)
+
+    crew.task_callback = task_finished
+    result = crew.kickoff()
+
+    timings = []
+    previous = 0.0
+    for task, finished in zip(crew.tasks, finished_at):
+        timings.append(StageTiming(
+            name=task_name(task),
+            agent=task.agent.role if task.agent else "",
+            started=previous,
+            duration=finished - previous,
+            depends_on=[task_name(d) for d in task_dependencies(task)],
+        ))
+        previous = finished
+
+    return GraphResult(
+        outputs={id(task): task.output for task in crew.tasks},
+        timings=timings,
+        total=time.perf_counter() - run_start,
+        final_output=result,
+    )
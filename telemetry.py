@@ -0,0 +1,341 @@
+import contextvars
+import functools
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+SERVICE_NAME = "brambot"
+
+# Both exporters are off unless configured, e.g. BRAMBOT_TRACE_LOG=.brambot/traces.jsonl BRAMBOT_METRICS_PORT=9464
+DEFAULT_TRACE_PATH = os.environ.get("BRAMBOT_TRACE_LOG", "")
+DEFAULT_METRICS_PORT = int(os.environ.get("BRAMBOT_METRICS_PORT", "0"))
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar("brambot_current_span", default=None)
+
+
+@dataclass
+class TelemetryConfig:
+    """
+    Operator settings: the shared Telemetry reads them from the environment, never from the app's UI.
+
+    Parameters:
+        trace_path (str): File that finished spans are appended to as OTLP/JSON lines; "" disables the log.
+        metrics_port (int): Port of the Prometheus /metrics endpoint (needs prometheus_client); 0 disables it.
+        keep_last (int): Durations kept per span name for the percentiles in the latency panel.
+        keep_traces (int): Recent traces kept in memory for the per-question breakdown.
+    """
+    trace_path: str = DEFAULT_TRACE_PATH
+    metrics_port: int = DEFAULT_METRICS_PORT
+    keep_last: int = 200
+    keep_traces: int = 50
+
+
+@dataclass
+class Span:
+    """One timed operation; spans started while it is current become its children."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str = ""
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: dict = field(default_factory=dict)
+    error: str = ""
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        """Seconds, 0 while the span is still open."""
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns else 0.0
+
+
+@dataclass
+class SpanStats:
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    recent: deque = field(default_factory=deque)
+
+    def percentile(self, q):
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_span(span):
+    """A span in the OTLP/JSON encoding used by the OpenTelemetry file exporter and collectors."""
+    return {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "parentSpanId": span.parent_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": STATUS_ERROR, "message": span.error} if span.error else {"code": STATUS_OK},
+    }
+
+
+def _metric_name(name):
+    return "brambot_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class Telemetry:
+    """
+    Spans, counters and their exporters for one process.
+
+    Spans nest through a context variable, so a span opened inside another one (in the
+    same thread, or in a thread started with in_current_context()) is recorded as its
+    child. Finished spans feed per-name latency statistics for the in-app panel, are
+    appended to the OTLP/JSON trace log and observed by the Prometheus histograms.
+
+    Parameters:
+        config (TelemetryConfig): Exporter and retention settings.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or TelemetryConfig()
+        self.stats = defaultdict(SpanStats)
+        self.counters = defaultdict(float)  # (name, sorted label items) -> value
+        self.traces = OrderedDict()  # trace id -> finished spans, most recent last
+        self._lock = threading.Lock()
+        self._log = None
+        self._log_path = None
+        self._prometheus = None
+        self._metrics = {}
+        self.metrics_error = ""  # Why the configured metrics endpoint is not running, for the app to show
+
+    def start_span(self, name, parent=None, **attributes):
+        """Starts a span without making it current; finish it with end_span(). For generators and callbacks."""
+        parent = parent if parent is not None else _current_span.get()
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else "",
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        )
+
+    def end_span(self, span, error=None):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self._export(span)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Times the block as a child of the current span; exceptions mark it as failed and propagate."""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            _current_span.reset(token)
+            self.end_span(span, e)
+            raise
+        _current_span.reset(token)
+        self.end_span(span)
+
+    def record_span(self, name, start_ns, end_ns, **attributes):
+        """Records an operation that was timed elsewhere, as a child of the current span."""
+        span = self.start_span(name, **attributes)
+        span.start_ns, span.end_ns = int(start_ns), int(end_ns)
+        self._export(span)
+        return span
+
+    def count(self, name, value=1, **labels):
+        """Adds to a counter, e.g. count("llm_tokens", 120, model="Gemma 2", kind="completion")."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+        if self._prometheus:
+            self._prometheus_counter(name, labels).inc(value)
+
+    def _export(self, span):
+        with self._lock:
+            stats = self.stats[span.name]
+            stats.count += 1
+            stats.total += span.duration
+            stats.recent.append(span.duration)
+            while len(stats.recent) > self.config.keep_last:
+                stats.recent.popleft()
+            if span.error:
+                stats.errors += 1
+
+            trace = self.traces.setdefault(span.trace_id, [])
+            trace.append(span)
+            self.traces.move_to_end(span.trace_id)
+            while len(self.traces) > self.config.keep_traces:
+                self.traces.popitem(last=False)
+
+            if self.config.trace_path:
+                self._write(span)
+
+        if self._prometheus:
+            self._prometheus_histogram().labels(span=span.name).observe(span.duration)
+            if span.error:
+                self._prometheus_counter("span_errors", {"span": span.name}).inc()
+
+    def _write(self, span):
+        # Called with the lock held; one ExportTraceServiceRequest per line
+        if self._log_path != self.config.trace_path:
+            if self._log:
+                self._log.close()
+            os.makedirs(os.path.dirname(os.path.abspath(self.config.trace_path)), exist_ok=True)
+            self._log = open(self.config.trace_path, "a", encoding="utf-8")
+            self._log_path = self.config.trace_path
+        self._log.write(json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [otlp_span(span)]}],
+        }]}) + "\n")
+        self._log.flush()
+
+    def start_metrics_server(self, port):
+        """Serves Prometheus metrics on `port`; needs the optional prometheus_client package."""
+        if self._prometheus:
+            return
+        try:
+            import prometheus_client
+        except ImportError as e:
+            raise RuntimeError("Install prometheus_client to expose the /metrics endpoint.") from e
+        prometheus_client.start_http_server(port)
+        self._prometheus = prometheus_client
+
+    def _prometheus_histogram(self):
+        with self._lock:
+            if "span_duration" not in self._metrics:
+                self._metrics["span_duration"] = self._prometheus.Histogram(
+                    _metric_name("span_duration_seconds"), "Duration of BramBot pipeline stages.", ["span"],
+                    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+                )
+            return self._metrics["span_duration"]
+
+    def _prometheus_counter(self, name, labels):
+        key = (name, tuple(sorted(labels)))
+        with self._lock:
+            if key not in self._metrics:
+                self._metrics[key] = self._prometheus.Counter(_metric_name(name), f"BramBot {name.replace('_', ' ')}.", sorted(labels))
+            counter = self._metrics[key]
+        return counter.labels(**labels) if labels else counter
+
+    def span_summary(self):
+        """Rows for st.table: latency per span name."""
+        with self._lock:
+            return [
+                {
+                    "span": name,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "mean (ms)": round(stats.total / stats.count * 1000, 1),
+                    "p50 (ms)": round(stats.percentile(0.5) * 1000, 1),
+                    "p95 (ms)": round(stats.percentile(0.95) * 1000, 1),
+                }
+                for name, stats in sorted(self.stats.items())
+            ]
+
+    def counter_summary(self):
+        """Rows for st.table: every counter with its labels."""
+        with self._lock:
+            return [
+                {"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels) or "-", "value": round(value, 2)}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+
+    def trace_breakdown(self, trace_id):
+        """Rows for st.table: the spans of one trace as an indented waterfall, in start order."""
+        with self._lock:
+            spans = list(self.traces.get(trace_id, []))
+        if not spans:
+            return []
+        by_id = {span.span_id: span for span in spans}
+        origin = min(span.start_ns for span in spans)
+
+        def depth(span):
+            level = 0
+            while span.parent_id in by_id:
+                span, level = by_id[span.parent_id], level + 1
+            return level
+
+        return [
+            {
+                "span": "  " * depth(span) + span.name,
+                "start (ms)": round((span.start_ns - origin) / 1e6, 1),
+                "duration (ms)": round(span.duration * 1000, 1),
+                "details": ", ".join(f"{k}={v}" for k, v in span.attributes.items()) + (f" ERROR {span.error}" if span.error else ""),
+            }
+            for span in sorted(spans, key=lambda s: s.start_ns)
+        ]
+
+
+def current_span():
+    return _current_span.get()
+
+
+def traced(name):
+    """Decorator timing every call of a function as a span; set attributes inside with current_span().set()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_telemetry().span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def in_current_context(fn):
+    """Wraps fn to run in a copy of the caller's context, so spans in a worker thread keep their parent."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    """
+    Process-wide Telemetry shared by every session and page, configured from the environment
+    (BRAMBOT_TRACE_LOG, BRAMBOT_METRICS_PORT) when it is first used.
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            if _telemetry.config.metrics_port:
+                try:
+                    _telemetry.start_metrics_server(_telemetry.config.metrics_port)
+                except (RuntimeError, OSError) as e:
+                    _telemetry.metrics_error = f"Prometheus metrics are off: {e}"
+        return _telemetry
+
+
+def span(name, **attributes):
+    """Context manager timing a block with the shared Telemetry: `with span("qdrant.search", top_k=5): ...`."""
+    return get_telemetry().span(name, **attributes)
+
+
+def count(name, value=1, **labels):
+    get_telemetry().count(name, value, **labels)
@@ -0,0 +1,43 @@
+from index_manifest import ChunkDiff, chunk_point_id
+
+FINGERPRINTS = ["1:0-1:10|alpha", "1:10-1:20|beta", "2:0-2:10|gamma"]
+
+
+def first_version():
+    diff = ChunkDiff("manual.pdf", "hash-1", chunker_spec=("fixed", {"chunk_size": 500}))
+    for index, fingerprint in enumerate(FINGERPRINTS):
+        diff.assign(index, fingerprint)
+    return diff
+
+
+def test_new_document_gets_deterministic_ids():
+    diff = first_version()
+    assert diff.reused == 0
+    assert diff.point_ids() == [chunk_point_id("manual.pdf", "hash-1", index) for index in range(3)]
+    entry = diff.entry()
+    assert entry["doc_hash"] == "hash-1"
+    assert entry["chunker"] == ["fixed", [["chunk_size", 500]]]
+
+
+def test_unchanged_chunks_keep_their_points():
+    previous = first_version()
+    diff = ChunkDiff("manual.pdf", "hash-2", previous.entry())
+    results = [diff.assign(index, fingerprint) for index, fingerprint in
+               enumerate([FINGERPRINTS[0], "1:10-1:20|changed", FINGERPRINTS[2]])]
+
+    old_ids = previous.point_ids()
+    assert results[0] == (old_ids[0], False)
+    assert results[1] == (chunk_point_id("manual.pdf", "hash-2", 1), True)
+    assert results[2] == (old_ids[2], False)
+    assert diff.reused == 2
+    assert diff.reused_ids == [old_ids[0], old_ids[2]]
+
+
+def test_duplicate_chunks_reuse_each_point_once():
+    previous = ChunkDiff("manual.pdf", "hash-1")
+    previous.assign(0, "same")
+    previous.assign(1, "same")
+    diff = ChunkDiff("manual.pdf", "hash-2", previous.entry())
+    ids = [diff.assign(index, "same")[0] for index in range(3)]
+    assert ids[:2] == previous.point_ids()
+    assert ids[2] == chunk_point_id("manual.pdf", "hash-2", 2)
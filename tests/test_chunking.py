@@ -0,0 +1,78 @@
+import re
+
+import pytest
+
+from chunking import FixedSizeChunker, SentenceChunker
+
+
+class _Encoding:
+    def __init__(self, text):
+        matches = list(re.finditer(r"\S+", text))
+        self.ids = list(range(len(matches)))
+        self.offsets = [(match.start(), match.end()) for match in matches]
+
+
+class WhitespaceTokenizer:
+    """One token per word, with the (start, end) offsets the Rust tokenizer reports."""
+
+    def encode_batch(self, texts, add_special_tokens=False):
+        return [_Encoding(text) for text in texts]
+
+
+PAGES = [
+    (0, "The pump runs at 40 bar. It needs a filter change every month.\n\n"
+        "Valves are checked weekly. Leaks are reported to the operator right away."),
+    (1, "Page two starts here. The manual ends with a very long sentence that keeps going "
+        "well past the limit of a single chunk so it has to be cut on token boundaries."),
+]
+
+
+def words(text):
+    return text.split()
+
+
+def page_text(page):
+    return dict(PAGES)[page - 1]
+
+
+@pytest.fixture
+def chunks():
+    chunker = SentenceChunker(max_tokens=12, overlap_tokens=4, tokenizer=WhitespaceTokenizer())
+    return list(chunker.chunks(PAGES))
+
+
+def test_chunks_respect_the_token_limit(chunks):
+    assert chunks
+    assert all(len(words(chunk.text)) <= 12 for chunk in chunks)
+
+
+def test_offsets_point_at_the_chunk_text(chunks):
+    for chunk in chunks:
+        if chunk.page_start == chunk.page_end:
+            original = page_text(chunk.page_start)[chunk.char_start:chunk.char_end]
+            assert words(original) == words(chunk.text)
+        else:
+            start = words(page_text(chunk.page_start)[chunk.char_start:])
+            end = words(page_text(chunk.page_end)[:chunk.char_end])
+            assert words(chunk.text) == start + end
+
+
+def test_every_word_is_covered(chunks):
+    covered = set()
+    for chunk in chunks:
+        for page in range(chunk.page_start, chunk.page_end + 1):
+            text = page_text(page)
+            start = chunk.char_start if page == chunk.page_start else 0
+            end = chunk.char_end if page == chunk.page_end else len(text)
+            covered.update((page, match.start()) for match in re.finditer(r"\S+", text) if start <= match.start() < end)
+    expected = {(number + 1, match.start()) for number, text in PAGES for match in re.finditer(r"\S+", text)}
+    assert covered == expected
+
+
+def test_fixed_chunker_offsets_span_pages():
+    chunks = list(FixedSizeChunker(chunk_size=50).chunks(PAGES))
+    joined = " ".join(text for _, text in PAGES)
+    assert "".join(chunk.text for chunk in chunks) == joined
+    for chunk in chunks:
+        if chunk.page_start == chunk.page_end:
+            assert page_text(chunk.page_start)[chunk.char_start:chunk.char_end] == chunk.text
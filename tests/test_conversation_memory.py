@@ -0,0 +1,94 @@
+from conversation_memory import ConversationMemory, MemoryConfig, SessionStore
+
+LONG = "x" * 200  # About 51 tokens
+
+
+def fill(memory, messages):
+    for i in range(messages):
+        memory.add("user" if i % 2 == 0 else "assistant", f"{i} {LONG}")
+        memory.wait(5)
+
+
+def test_old_messages_are_folded_into_the_summary():
+    folded = []
+
+    def summarize(summary, messages):
+        folded.extend(message["seq"] for message in messages)
+        return f"{summary}+{len(messages)}"
+
+    memory = ConversationMemory(config=MemoryConfig(max_history_tokens=120), summarize=summarize)
+    fill(memory, 6)
+    assert folded == list(range(len(folded)))
+    assert len(folded) >= 3
+    context = memory.context()
+    assert "Summary of the earlier conversation" in context
+    assert f"5 {LONG}" in context
+    assert f"0 {LONG}" not in context
+
+
+def test_folded_messages_stay_in_the_chat_view():
+    memory = ConversationMemory(config=MemoryConfig(max_history_tokens=120), summarize=lambda summary, messages: "s")
+    fill(memory, 8)
+    messages, older = memory.window(5)
+    assert [message["seq"] for message in messages] == [3, 4, 5, 6, 7]
+    assert older == 3
+
+
+def test_chat_view_is_bounded():
+    memory = ConversationMemory(config=MemoryConfig(max_display_messages=4))
+    fill(memory, 10)
+    messages, older = memory.window(100)
+    assert [message["seq"] for message in messages] == [6, 7, 8, 9]
+    assert older == 0
+
+
+def test_failing_summarizer_does_not_grow_the_queue():
+    def fail(summary, messages):
+        raise RuntimeError("provider down")
+
+    memory = ConversationMemory(config=MemoryConfig(max_history_tokens=60, max_unsummarized=3), summarize=fail)
+    fill(memory, 20)
+    assert memory.summary == ""
+    assert len(memory._unsummarized) == 3
+
+
+def test_clear_discards_a_running_fold():
+    memory = ConversationMemory(config=MemoryConfig(max_history_tokens=60), summarize=lambda summary, messages: "old")
+    fill(memory, 4)
+    memory.clear()
+    assert (memory.summary, memory.count, memory.window(10)) == ("", 0, ([], 0))
+
+
+def test_persisted_session_is_restored(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+    config = MemoryConfig(max_history_tokens=120, persist=True)
+    memory = ConversationMemory("s1", config, store, summarize=lambda summary, messages: "summary")
+    fill(memory, 6)
+
+    restored = ConversationMemory("s1", config, store)
+    assert restored.count == 6
+    assert restored.summary == "summary"
+    messages, older = restored.window(4)
+    assert [message["seq"] for message in messages] == [2, 3, 4, 5]
+    assert older == 2
+
+
+def test_question_that_was_not_queued_is_taken_back(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+    memory = ConversationMemory("s1", MemoryConfig(persist=True), store)
+    fill(memory, 2)
+    seq = memory.add("user", "rejected question")
+    assert memory.remove_last(seq)
+    assert memory.count == 2
+    assert "rejected question" not in memory.context()
+    assert [message["seq"] for message in memory.window(10)[0]] == [0, 1]
+    assert ConversationMemory("s1", MemoryConfig(persist=True), store).count == 2
+
+
+def test_only_the_latest_message_can_be_taken_back():
+    memory = ConversationMemory()
+    seq = memory.add("user", "question")
+    memory.add("assistant", "answer")
+    assert not memory.remove_last(seq)
+    assert memory.count == 2
+    assert len(memory.window(10)[0]) == 2
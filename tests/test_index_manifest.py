@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from chunking import Chunk
+from index_manifest import ChunkDiff, IndexManifest, finalize_document, indexed_hash, manifest_section, stored_entry
+from ingestion import chunk_point, ensure_collection
+
+SPEC = ("fixed", {"chunk_size": 500})
+COLLECTION = "pdf_chunks"
+
+
+@pytest.fixture
+def qdrant():
+    client = QdrantClient(":memory:")
+    ensure_collection(client, COLLECTION, 4)
+    return client
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IndexManifest(str(tmp_path / "manifest.json"))
+
+
+def index(qdrant, manifest, section, source, doc_hash, texts, previous=None):
+    """Indexes one document version the way ingest_pdf does: diff, upsert new chunks, finalize."""
+    diff = ChunkDiff(source, doc_hash, previous, SPEC)
+    points = []
+    for i, text in enumerate(texts):
+        point_id, needs_upsert = diff.assign(i, text)
+        if needs_upsert:
+            points.append(chunk_point(point_id, source, doc_hash, i, Chunk(text, 1, 1, 0, len(text)), np.ones(4)))
+    if points:
+        qdrant.upsert(COLLECTION, points)
+    finalize_document(qdrant, COLLECTION, manifest, section, diff)
+    return diff
+
+
+def stored_texts(qdrant, source):
+    points, _ = qdrant.scroll(COLLECTION, limit=100, with_payload=True)
+    return sorted(p.payload["text"] for p in points if p.payload["Source"] == source)
+
+
+def test_indexed_document_is_recognised(qdrant, manifest):
+    section = manifest_section(COLLECTION, "http://a:6333")
+    index(qdrant, manifest, section, "manual.pdf", "v1", ["one", "two"])
+    entry = stored_entry(qdrant, COLLECTION, manifest, section, "manual.pdf")
+    assert indexed_hash(entry, SPEC) == "v1"
+    assert indexed_hash(entry, ("sentence", {})) is None  # Another chunker re-indexes
+
+
+def test_entry_of_another_instance_or_a_dropped_collection_is_ignored(qdrant, manifest):
+    section = manifest_section(COLLECTION, "http://a:6333")
+    index(qdrant, manifest, section, "manual.pdf", "v1", ["one", "two"])
+    assert stored_entry(qdrant, COLLECTION, manifest, manifest_section(COLLECTION, "http://b:6333"), "manual.pdf") is None
+
+    recreated = QdrantClient(":memory:")
+    ensure_collection(recreated, COLLECTION, 4)
+    assert stored_entry(recreated, COLLECTION, manifest, section, "manual.pdf") is None
+
+
+def test_new_version_reuses_unchanged_chunks_and_removes_stale_ones(qdrant, manifest):
+    section = manifest_section(COLLECTION, "http://a:6333")
+    first = index(qdrant, manifest, section, "manual.pdf", "v1", ["intro", "pump", "valve"])
+    entry = stored_entry(qdrant, COLLECTION, manifest, section, "manual.pdf")
+    second = index(qdrant, manifest, section, "manual.pdf", "v2", ["intro", "pump v2", "valve"], previous=entry)
+
+    assert second.reused_ids == [first.point_ids()[0], first.point_ids()[2]]
+    assert stored_texts(qdrant, "manual.pdf") == ["intro", "pump v2", "valve"]
+    # Reused points now carry the new hash, so the next upload of v2 is recognised as unchanged
+    assert indexed_hash(stored_entry(qdrant, COLLECTION, manifest, section, "manual.pdf"), SPEC) == "v2"
+
+
+def test_finalize_removes_points_written_before_the_manifest(qdrant, manifest):
+    section = manifest_section(COLLECTION, "http://a:6333")
+    legacy = Chunk("old text", 1, 1, 0, 8)
+    qdrant.upsert(COLLECTION, [chunk_point(12345, "manual.pdf", "legacy", 0, legacy, np.ones(4))])
+    index(qdrant, manifest, section, "manual.pdf", "v1", ["new text"])
+    assert stored_texts(qdrant, "manual.pdf") == ["new text"]
+
+
+def test_other_documents_are_untouched(qdrant, manifest):
+    section = manifest_section(COLLECTION, "http://a:6333")
+    index(qdrant, manifest, section, "a.pdf", "a1", ["alpha"])
+    index(qdrant, manifest, section, "b.pdf", "b1", ["beta"])
+    index(qdrant, manifest, section, "a.pdf", "a2", ["alpha two"])
+    assert stored_texts(qdrant, "b.pdf") == ["beta"]
+    assert stored_entry(qdrant, COLLECTION, manifest, section, "b.pdf")["doc_hash"] == "b1"
+
+
+def test_partially_deleted_document_is_reindexed(qdrant, manifest):
+    section = manifest_section(COLLECTION, "http://a:6333")
+    diff = index(qdrant, manifest, section, "manual.pdf", "v1", ["one", "two"])
+    qdrant.delete(COLLECTION, points_selector=[diff.point_ids()[1]])
+    assert stored_entry(qdrant, COLLECTION, manifest, section, "manual.pdf") is None
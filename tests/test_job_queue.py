@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from job_queue import JOB_CANCELLED, JOB_DONE, JobQueue, JobQueueConfig, QueueFull
+
+
+def blocked_queue():
+    """A single-worker queue whose worker is held by a job until the returned event is set."""
+    queue = JobQueue(JobQueueConfig(max_workers=1, max_pending_per_user=5))
+    release = threading.Event()
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+
+    blocker = queue.submit("blocker", block)
+    assert started.wait(5)
+    return queue, release, blocker
+
+
+def test_jobs_are_taken_round_robin_per_user():
+    queue, release, blocker = blocked_queue()
+    order = []
+    record = lambda job, name: order.append(name)
+    jobs = [
+        queue.submit("alice", record, "a1"),
+        queue.submit("alice", record, "a2"),
+        queue.submit("alice", record, "a3"),
+        queue.submit("bob", record, "b1"),
+    ]
+    assert [queue.position(job) for job in jobs] == [0, 2, 3, 1]
+    release.set()
+    for job in jobs:
+        assert job.wait(5)
+    assert order == ["a1", "b1", "a2", "a3"]
+    assert queue.position(jobs[0]) == 0
+
+
+def test_per_user_limit():
+    queue, release, blocker = blocked_queue()
+    queue.config.max_pending_per_user = 1
+    queue.submit("alice", lambda job: None)
+    with pytest.raises(QueueFull):
+        queue.submit("alice", lambda job: None)
+    queue.submit("bob", lambda job: None)
+    release.set()
+
+
+def test_cancel_queued_job_never_runs():
+    queue, release, blocker = blocked_queue()
+    ran = []
+    job = queue.submit("alice", lambda job: ran.append(job.id))
+    assert queue.cancel(job.id)
+    assert job.status == JOB_CANCELLED
+    release.set()
+    assert blocker.wait(5)
+    assert ran == []
+    assert queue.cancel(job.id) is False
+    assert queue.summary()[0]["cancelled"] == 1
+
+
+def test_cancel_running_job_stops_at_checkpoint():
+    queue = JobQueue(JobQueueConfig(max_workers=1))
+    started = threading.Event()
+    resume = threading.Event()
+
+    def work(job):
+        started.set()
+        resume.wait(5)
+        job.check_cancelled()
+        return "finished"
+
+    job = queue.submit("alice", work)
+    assert started.wait(5)
+    assert queue.cancel(job.id)
+    resume.set()
+    assert job.wait(5)
+    assert job.status == JOB_CANCELLED
+    assert job.result is None
+
+
+def test_finished_job_is_found_again_by_id():
+    queue = JobQueue(JobQueueConfig(max_workers=1))
+    job = queue.submit("alice", lambda job: 42)
+    assert job.wait(5)
+    found = queue.get(job.id)
+    assert found is job
+    assert (found.status, found.result) == (JOB_DONE, 42)
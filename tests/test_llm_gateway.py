@@ -0,0 +1,121 @@
+import threading
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from llm_gateway import GatewayConfig, GatewayError, LLMGateway
+from telemetry import get_telemetry, span
+
+PROVIDERS = {
+    "Main": {"model": "groq/main", "base_url": "https://llm.test/v1", "api_key_env": "GROQ_API_KEY", "rpm": 6000, "tpm": 10 ** 7},
+    "Backup": {"model": "groq/backup", "base_url": "https://llm.test/v1", "api_key_env": "GROQ_API_KEY", "rpm": 6000, "tpm": 10 ** 7},
+}
+KEYS = {"GROQ_API_KEY": "key"}
+MESSAGES = [{"role": "user", "content": "hi"}]
+NO_WAIT = GatewayConfig(max_retries=1, base_delay=0.0, max_delay=0.0)
+
+
+class FakeStream:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.closed = False
+
+    def __iter__(self):
+        for token in self.tokens:
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def close(self):
+        self.closed = True
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "https://llm.test/v1/chat/completions"))
+
+
+def spans_of(trace_id, name):
+    return [s for s in get_telemetry().traces[trace_id] if s.name == name]
+
+
+def test_closing_the_stream_closes_the_response_and_ends_the_span(monkeypatch):
+    gateway = LLMGateway(PROVIDERS)
+    response = FakeStream(["one ", "two ", "three"])
+    monkeypatch.setattr(gateway, "_request", lambda *args, **kwargs: response)
+
+    with span("question") as question:
+        tokens = gateway.stream("Main", MESSAGES, KEYS, NO_WAIT)
+        assert next(tokens) == "one "
+        tokens.close()  # What a cancelled job does when it stops reading
+
+    assert response.closed
+    [stream_span] = spans_of(question.trace_id, "llm.stream")
+    assert stream_span.attributes["cancelled"] is True
+    assert stream_span.end_ns
+    assert gateway.stats["Main"].calls == 1
+
+
+def test_stream_falls_back_before_the_first_token(monkeypatch):
+    gateway = LLMGateway(PROVIDERS)
+    responses = []
+
+    def request(model_name, api_key, messages, **kwargs):
+        if model_name == "Main":
+            raise connection_error()
+        responses.append(FakeStream(["backup answer"]))
+        return responses[-1]
+
+    monkeypatch.setattr(gateway, "_request", request)
+    config = GatewayConfig(fallbacks=["Backup"], max_retries=1, base_delay=0.0, max_delay=0.0)
+    assert "".join(gateway.stream("Main", MESSAGES, KEYS, config)) == "backup answer"
+    assert responses[0].closed
+    assert (gateway.stats["Main"].errors, gateway.stats["Main"].retries) == (2, 1)
+    assert gateway.stats["Backup"].fallbacks == 1
+
+
+def test_models_without_a_key_are_not_tried(monkeypatch):
+    gateway = LLMGateway({**PROVIDERS, "Other": {**PROVIDERS["Backup"], "api_key_env": "OTHER_KEY"}})
+    monkeypatch.setattr(gateway, "_request", lambda *args, **kwargs: (_ for _ in ()).throw(connection_error()))
+    config = GatewayConfig(fallbacks=["Other"], max_retries=0)
+    assert gateway.chain("Main", KEYS, config) == ["Main"]
+    with pytest.raises(GatewayError):
+        gateway.complete("Main", MESSAGES, KEYS, config)
+
+
+def test_stats_are_counted_from_many_threads(monkeypatch):
+    gateway = LLMGateway(PROVIDERS)
+    answer = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+    monkeypatch.setattr(gateway, "_request", lambda *args, **kwargs: answer)
+
+    def ask():
+        for _ in range(50):
+            gateway.complete("Main", MESSAGES, KEYS, NO_WAIT)
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert gateway.stats["Main"].calls == 400
+    assert gateway.summary()[0]["calls"] == 400
+
+
+def test_cancelled_job_closes_the_gateway_stream(monkeypatch):
+    from crew_ai_app import stream_into
+    from job_queue import Job, JobCancelled
+    from streaming import TimedStream
+
+    gateway = LLMGateway(PROVIDERS)
+    response = FakeStream(["one ", "two ", "three"])
+    monkeypatch.setattr(gateway, "_request", lambda *args, **kwargs: response)
+    job = Job("alice", None, (), {})
+
+    def cancel_after_first(text):
+        Job.write(job, text)
+        job._cancel.set()
+
+    monkeypatch.setattr(job, "write", cancel_after_first)
+    with pytest.raises(JobCancelled):
+        stream_into(job, TimedStream(gateway.stream("Main", MESSAGES, KEYS, NO_WAIT)))
+    assert job.text == "one "
+    assert response.closed
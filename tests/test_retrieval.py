@@ -0,0 +1,76 @@
+import numpy as np
+from qdrant_client import QdrantClient
+
+from retrieval import RetrievalConfig, RetrievedChunk, Retriever, format_context, list_sources, reciprocal_rank_fusion
+
+
+def ranking(*ids, dense=None, sparse=None):
+    return [RetrievedChunk(id_, {"id": id_}, 1.0, dense, sparse) for id_ in ids]
+
+
+def test_chunks_found_by_both_retrievers_rank_first():
+    fused = reciprocal_rank_fusion(ranking("a", "b", "c", dense=0.8), ranking("c", "d", "a", sparse=3.0))
+    assert [chunk.id for chunk in fused] == ["a", "c", "b", "d"]
+    assert fused[0].score == 1 / 61 + 1 / 63
+
+
+def test_fusion_keeps_both_scores():
+    fused = {chunk.id: chunk for chunk in reciprocal_rank_fusion(ranking("a", dense=0.8), ranking("a", "b", sparse=3.0))}
+    assert (fused["a"].dense_score, fused["a"].sparse_score) == (0.8, 3.0)
+    assert (fused["b"].dense_score, fused["b"].sparse_score) == (None, 3.0)
+
+
+def test_single_ranking_keeps_its_order():
+    assert [chunk.id for chunk in reciprocal_rank_fusion(ranking("x", "y", "z"))] == ["x", "y", "z"]
+
+
+def make_collection(client, name):
+    from chunking import Chunk
+    from ingestion import chunk_point, ensure_collection
+
+    ensure_collection(client, name, 4)
+    texts = ["the pump runs at forty bar", "valves are checked every week", "leaks go to the operator"]
+    client.upsert(name, [
+        chunk_point(index + 1, "manual.pdf", "h", index, Chunk(text, 1, 1, 0, len(text)), np.eye(4)[index], keywords=True)
+        for index, text in enumerate(texts)
+    ])
+
+
+def test_missing_collection_has_no_sources_or_context():
+    client = QdrantClient(":memory:")
+    assert list_sources(client, "empty") == []
+    result = Retriever(client, "empty", index_key="test-missing").retrieve("pump", np.ones(4))
+    assert result.chunks == []
+    assert result.skipped == ["search (no documents uploaded yet)"]
+    assert format_context(result.chunks) == "No relevant context found."
+
+
+def test_collection_is_found_once_it_is_created():
+    client = QdrantClient(":memory:")
+    retriever = Retriever(client, "later", index_key="test-later", config=RetrievalConfig(top_k=2))
+    assert retriever.retrieve("pump", np.ones(4)).chunks == []
+    make_collection(client, "later")
+    assert list_sources(client, "later") == ["manual.pdf"]
+    assert retriever.retrieve("pump", np.eye(4)[0]).chunks
+
+
+def test_layout_is_read_once_per_collection(monkeypatch):
+    client = QdrantClient(":memory:")
+    make_collection(client, "docs")
+    calls = []
+    get_collection = client.get_collection
+    monkeypatch.setattr(client, "get_collection", lambda name: calls.append(name) or get_collection(name))
+    retriever = Retriever(client, "docs", index_key="test-layout")
+    for _ in range(3):
+        retriever.retrieve("valves", np.eye(4)[1])
+    assert calls == ["docs"]
+
+
+def test_hybrid_search_finds_keyword_matches():
+    client = QdrantClient(":memory:")
+    make_collection(client, "hybrid")
+    retriever = Retriever(client, "hybrid", index_key="test-hybrid", config=RetrievalConfig(top_k=1))
+    # The dense vector points at the first chunk; the keywords at the third
+    chunks = retriever.retrieve("operator leaks", np.array([0.6, 0.0, 0.5, 0.0])).chunks
+    assert chunks[0].payload["text"] == "leaks go to the operator"
+    assert chunks[0].sparse_score is not None
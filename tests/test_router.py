@@ -0,0 +1,22 @@
+from router import PATH_CREW, PATH_DIRECT, QueryRouter, RouterConfig
+
+
+def test_short_question_goes_direct_without_documents_or_search():
+    assert QueryRouter().route("what is 2 + 2").path == PATH_DIRECT
+
+
+def test_only_greetings_skip_the_crew_with_search_or_documents():
+    router = QueryRouter()
+    for use_docs, use_internet in [(True, False), (False, True), (True, True)]:
+        assert router.route("hello!", use_docs, use_internet).path == PATH_DIRECT
+        assert router.route("who won", use_docs, use_internet).path == PATH_CREW
+
+
+def test_complex_or_long_questions_use_the_crew():
+    router = QueryRouter(RouterConfig(max_words=5))
+    assert router.route("explain pumps").path == PATH_CREW
+    assert router.route("what is the capital city of France").path == PATH_CREW
+
+
+def test_disabled_router_always_uses_the_crew():
+    assert QueryRouter(RouterConfig(enabled=False)).route("hi").path == PATH_CREW
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from index_manifest import IndexManifest, manifest_section
+from semantic_cache import InMemorySemanticCache, QdrantSemanticCache, SemanticCacheConfig, cache_namespace
+
+MODEL = {"model": "groq/llama3-70b-8192"}
+
+
+def vector(*values):
+    padded = np.zeros(384, dtype=np.float32)
+    padded[:len(values)] = values
+    return padded
+
+
+@pytest.fixture(params=["memory", "qdrant"])
+def make_cache(request):
+    def make(**options):
+        config = SemanticCacheConfig(**options)
+        if request.param == "memory":
+            return InMemorySemanticCache(config)
+        return QdrantSemanticCache(config, client=QdrantClient(":memory:"))
+    return make
+
+
+def test_similar_question_hits_above_the_threshold(make_cache):
+    cache = make_cache(threshold=0.9)
+    cache.store("ns", vector(1, 0), "what is a pump", "A pump moves fluid.")
+    hit = cache.lookup("ns", vector(1, 0.1))
+    assert hit.answer == "A pump moves fluid."
+    assert hit.similarity == pytest.approx(0.995, abs=0.01)
+    assert cache.lookup("ns", vector(1, 1)) is None  # Similarity 0.71
+
+
+def test_namespaces_are_separate(make_cache):
+    cache = make_cache()
+    cache.store("a", vector(1, 0), "q", "answer a")
+    assert cache.lookup("b", vector(1, 0)) is None
+
+
+def test_expired_entries_are_not_served(make_cache, monkeypatch):
+    cache = make_cache(ttl_seconds=60)
+    now = 1_000_000.0
+    monkeypatch.setattr("semantic_cache.time.time", lambda: now)
+    cache.store("ns", vector(1, 0), "q", "old answer")
+    now += 61
+    assert cache.lookup("ns", vector(1, 0)) is None
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, monkeypatch):
+    cache = make_cache(max_entries=2)
+    now = 1_000_000.0
+    monkeypatch.setattr("semantic_cache.time.time", lambda: now)
+    cache.store("ns", vector(1, 0, 0), "first", "1")
+    now += 1
+    cache.store("ns", vector(0, 1, 0), "second", "2")
+    now += 1
+    assert cache.lookup("ns", vector(1, 0, 0)).answer == "1"  # Now more recently used than "second"
+    now += 1
+    cache.store("ns", vector(0, 0, 1), "third", "3")
+    assert cache.lookup("ns", vector(0, 1, 0)) is None
+    assert cache.lookup("ns", vector(1, 0, 0)).answer == "1"
+    assert cache.lookup("ns", vector(0, 0, 1)).answer == "3"
+
+
+def test_document_answers_are_scoped_per_qdrant_instance(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    tenant_a = manifest_section("pdf_chunks", "https://tenant-a:6333")
+    tenant_b = manifest_section("pdf_chunks", "https://tenant-b:6333")
+    for section in (tenant_a, tenant_b):
+        manifest.set(section, "manual.pdf", {"doc_hash": "same", "chunks": []})
+
+    namespace_a = cache_namespace(MODEL, True, False, tenant_a, manifest.version(tenant_a))
+    namespace_b = cache_namespace(MODEL, True, False, tenant_b, manifest.version(tenant_b))
+    assert namespace_a != namespace_b
+
+
+def test_unknown_documents_have_no_version(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    section = manifest_section("pdf_chunks", "https://tenant-a:6333")
+    assert manifest.version(section) is None
+    manifest.set(section, "manual.pdf", {"doc_hash": "h", "chunks": []})
+    assert manifest.version(section) is not None
+    assert manifest.version(section, ["other.pdf"]) is None
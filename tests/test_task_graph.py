@@ -0,0 +1,71 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from task_graph import CONTEXT_DIVIDER, TaskGraph
+
+
+class FakeTask:
+    """Duck-typed crewai Task: sleeps, then returns its name and the context it was given."""
+
+    def __init__(self, name, context=None, delay=0.0):
+        self.name = name
+        self.description = name
+        self.context = context or []
+        self.delay = delay
+        self.agent = SimpleNamespace(role=f"{name} agent")
+        self.received = None
+        self.thread = None
+
+    def execute_sync(self, agent, context):
+        self.received = context
+        self.thread = threading.current_thread().name
+        time.sleep(self.delay)
+        return SimpleNamespace(raw=f"{self.name} output")
+
+
+def test_independent_tasks_run_at_the_same_time():
+    refine, filter_ = FakeTask("refine", delay=0.3), FakeTask("filter", delay=0.3)
+    answer = FakeTask("answer", context=[refine, filter_])
+    result = TaskGraph([refine, filter_, answer]).run()
+
+    assert result.total < 0.5
+    assert refine.thread != filter_.thread
+    timings = {timing.name: timing for timing in result.timings}
+    assert timings["answer"].started >= max(timings["refine"].finished, timings["filter"].finished)
+    assert timings["answer"].depends_on == ["refine", "filter"]
+    assert result.raw == "answer output"
+
+
+def test_dependencies_receive_outputs_in_context_order():
+    refine, filter_ = FakeTask("refine"), FakeTask("filter")
+    answer = FakeTask("answer", context=[filter_, refine])
+    TaskGraph([refine, filter_, answer]).run()
+    assert answer.received == CONTEXT_DIVIDER.join(["filter output", "refine output"])
+    assert refine.received is None
+
+
+def test_stage_callbacks_follow_the_graph():
+    first = FakeTask("first")
+    second = FakeTask("second", context=[first])
+    events = []
+    TaskGraph([first, second]).run(
+        on_stage_start=lambda name: events.append(("start", name)),
+        on_stage_end=lambda name, output: events.append(("end", name, output.raw)),
+    )
+    assert events == [("start", "first"), ("end", "first", "first output"), ("start", "second"), ("end", "second", "second output")]
+
+
+def test_dependency_cycle_is_rejected():
+    a, b = FakeTask("a"), FakeTask("b")
+    a.context, b.context = [b], [a]
+    with pytest.raises(ValueError, match="cycle"):
+        TaskGraph([a, b]).run()
+
+
+def test_dependency_outside_the_graph_is_rejected():
+    outside = FakeTask("outside")
+    with pytest.raises(ValueError, match="not in the graph"):
+        TaskGraph([FakeTask("answer", context=[outside])])
@@ -0,0 +1,36 @@
+import pytest
+
+from llm_gateway import TokenBucket
+
+
+def test_full_bucket_does_not_wait():
+    bucket = TokenBucket(rate_per_minute=600, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+
+def test_empty_bucket_waits_for_refill():
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)  # 10 tokens per second
+    bucket.acquire(2)
+    waited = bucket.acquire()
+    assert waited == pytest.approx(0.1, abs=0.05)
+
+
+def test_request_larger_than_capacity_is_capped():
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    assert bucket.acquire(50) == 0.0
+    assert bucket.tokens == pytest.approx(0.0, abs=0.01)
+
+
+def test_adjust_charges_and_refunds():
+    bucket = TokenBucket(rate_per_minute=60, capacity=10)
+    bucket.adjust(15)
+    assert bucket.tokens == pytest.approx(-5, abs=0.01)
+    bucket.adjust(-100)
+    assert bucket.tokens == 10
+
+
+def test_pause_holds_back_the_next_request():
+    bucket = TokenBucket(rate_per_minute=600, capacity=10)
+    bucket.pause(0.2)
+    waited = bucket.acquire()
+    assert waited == pytest.approx(0.2, abs=0.08)
@@ -0,0 +1,109 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from web_search import CachedWebSearchTool, WebSearch, WebSearchConfig, normalize_query, trim_content
+
+
+class FakeExa:
+    """Stands in for the Exa client of one API key; records the queries it was asked."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.queries = []
+
+    def search_and_contents(self, query, num_results, text, type):
+        self.queries.append(query)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("invalid API key")
+        return SimpleNamespace(results=[
+            SimpleNamespace(title=query, url=f"https://example.com/{normalize_query(query).replace(' ', '-')}",
+                            published_date="", text=f"About {query}."),
+            SimpleNamespace(title="Shared", url="https://example.com/shared", published_date="", text="Shared page."),
+        ])
+
+
+def web_search(config=None, **clients):
+    search = WebSearch(config=config)
+    search._clients.update(clients)
+    return search
+
+
+def test_users_with_different_keys_share_cached_results():
+    alice, bob = FakeExa(), FakeExa()
+    search = web_search(alice=alice, bob=bob)
+    first = search.search("Latest pump news", "alice")
+    assert search.search("latest  pump news?", "bob") == first
+    assert (alice.queries, bob.queries) == (["Latest pump news"], [])
+    assert (search.hits, search.misses) == (1, 1)
+
+
+def test_expired_results_are_fetched_again():
+    client = FakeExa()
+    search = web_search(WebSearchConfig(ttl_seconds=0), key=client)
+    search.search("pumps", "key")
+    search.search("pumps", "key")
+    assert len(client.queries) == 2
+
+
+def test_least_recently_used_query_is_evicted():
+    client = FakeExa()
+    search = web_search(WebSearchConfig(max_entries=2), key=client)
+    for query in ["a", "b", "a", "c", "a", "b"]:
+        search.search(query, "key")
+    assert client.queries == ["a", "b", "c", "b"]
+
+
+def test_identical_queries_in_flight_are_joined():
+    client = FakeExa(delay=0.2)
+    search = web_search(key=client)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(search.search("pumps", "key"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.queries == ["pumps"]
+    assert len(results) == 4 and all(result == results[0] for result in results)
+
+
+def test_joined_search_retries_with_its_own_key_when_the_first_fails():
+    broken, working = FakeExa(delay=0.2, fail=True), FakeExa()
+    search = web_search(broken=broken, working=working)
+    errors = []
+
+    def ask_with_broken_key():
+        try:
+            search.search("pumps", "broken")
+        except RuntimeError as e:
+            errors.append(e)
+
+    owner = threading.Thread(target=ask_with_broken_key)
+    owner.start()
+    time.sleep(0.05)
+    assert search.search("pumps", "working")[0].title == "pumps"
+    owner.join()
+    assert len(errors) == 1
+    assert working.queries == ["pumps"]
+
+
+def test_search_many_deduplicates_by_url_and_skips_failures():
+    search = web_search(key=FakeExa())
+    results = search.search_many(["pumps", "valves", "pumps"], "key")
+    assert [result.url for result in results] == [
+        "https://example.com/pumps", "https://example.com/shared", "https://example.com/valves",
+    ]
+
+
+def test_tool_searches_with_the_session_key():
+    client = FakeExa()
+    tool = CachedWebSearchTool(search=web_search(session=client), api_key="session")
+    assert "URL: https://example.com/pumps" in tool._run(["pumps"])
+    assert client.queries == ["pumps"]
+
+
+def test_trim_content_keeps_matching_passages():
+    text = "Cats sleep a lot. Pumps move water fast. The weather is fine. Pump pressure is 40 bar."
+    assert trim_content(text, "pump pressure water", 60) == "Pumps move water fast. Pump pressure is 40 bar."
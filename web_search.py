@@ -0,0 +1,248 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from telemetry import count, in_current_context, span
+
+DEFAULT_NUM_RESULTS = 5
+MAX_QUERIES_PER_CALL = 4
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n|(?<=[.!?])\s+")
+WORD = re.compile(r"\w+")
+STOPWORDS = {"the", "a", "an", "of", "in", "on", "for", "to", "and", "or", "is", "are", "what", "how", "why", "who", "when"}
+
+
+@dataclass
+class WebSearchConfig:
+    """
+    Parameters:
+        num_results (int): Results per query.
+        max_chars_per_result (int): Page text kept per result after trimming.
+        ttl_seconds (int): How long a query's results are reused.
+        max_entries (int): Cached queries kept; the least recently used are evicted.
+        max_workers (int): Queries searched concurrently.
+    """
+    num_results: int = DEFAULT_NUM_RESULTS
+    max_chars_per_result: int = 1200
+    ttl_seconds: int = 1800
+    max_entries: int = 500
+    max_workers: int = 4
+
+
+@dataclass
+class SearchResult:
+    title: str
+    url: str
+    published: str
+    text: str
+
+
+def normalize_query(query):
+    """Cache key form of a query: lower case, single spaces, no surrounding punctuation."""
+    return " ".join(WORD.findall(query.lower()))
+
+
+def trim_content(text, query, max_chars):
+    """
+    Keeps the passages of a page that share the most words with the query, in page order,
+    up to max_chars, so only the relevant part of each page reaches the LLM.
+    """
+    text = (text or "").strip()
+    if len(text) <= max_chars:
+        return text
+    terms = set(WORD.findall(query.lower())) - STOPWORDS
+    passages = [p.strip() for p in PARAGRAPH_BREAK.split(text) if p.strip()]
+    scored = sorted(
+        range(len(passages)),
+        key=lambda i: (len(terms & set(WORD.findall(passages[i].lower()))), -i),
+        reverse=True,
+    )
+    kept, used = set(), 0
+    for i in scored:
+        if used + len(passages[i]) > max_chars:
+            continue
+        kept.add(i)
+        used += len(passages[i]) + 1
+    if not kept:
+        return text[:max_chars]
+    return " ".join(passages[i] for i in sorted(kept))
+
+
+class WebSearch:
+    """
+    Exa search with a process-wide result cache and concurrent multi-query search.
+
+    Results are cached by normalised query for ttl_seconds, so users asking the same thing
+    share one Exa call whichever API key they search with, and identical queries that are
+    already in flight are joined rather than sent twice. Only the Exa client is kept per key.
+    Page text is trimmed to the passages that match the query.
+
+    Parameters:
+        api_key (str): Exa API key used when a search passes none; EXA_API_KEY by default.
+        base_url (str): Exa API URL; EXA_BASE_URL or the public API by default (the fake server in benchmarks/ for tests).
+        config (WebSearchConfig): Result count, trimming and cache settings.
+    """
+
+    def __init__(self, api_key=None, base_url=None, config=None):
+        self.config = config or WebSearchConfig()
+        self.api_key = api_key
+        self.base_url = base_url or os.environ.get("EXA_BASE_URL")
+        self._clients = {}  # API key -> Exa client
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # normalised query -> (created, results)
+        self._in_flight = {}  # normalised query -> Future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="web-search")
+
+    def _client(self, api_key=None):
+        api_key = api_key or self.api_key or os.environ.get("EXA_API_KEY")
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                from exa_py import Exa
+                client = Exa(api_key=api_key, **({"base_url": self.base_url} if self.base_url else {}))
+                self._clients[api_key] = client
+            return client
+
+    def _fetch(self, query, api_key=None):
+        with span("exa.search", query=query, num_results=self.config.num_results) as search_span:
+            response = self._client(api_key).search_and_contents(
+                query,
+                num_results=self.config.num_results,
+                text={"max_characters": self.config.max_chars_per_result * 4},
+                type="auto",
+            )
+            search_span.set(results=len(response.results))
+        count("exa_requests")
+        return [
+            SearchResult(
+                title=result.title or "",
+                url=result.url,
+                published=result.published_date or "",
+                text=trim_content(result.text, query, self.config.max_chars_per_result),
+            )
+            for result in response.results
+        ]
+
+    def search(self, query, api_key=None):
+        """Results for one query, from the cache when a fresh entry exists; misses are fetched with `api_key`."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and time.time() - entry[0] < self.config.ttl_seconds:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                count("web_search_cache", result="hit")
+                return entry[1]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+        count("web_search_cache", result="miss" if owner else "joined")
+
+        if not owner:
+            try:
+                return future.result()
+            except Exception:
+                # The search that was joined failed, possibly because of its key; try with ours
+                return self._fetch(query, api_key)
+        try:
+            results = self._fetch(query, api_key)
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._cache[key] = (time.time(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.config.max_entries:
+                self._cache.popitem(last=False)
+            self._in_flight.pop(key, None)
+        future.set_result(results)
+        return results
+
+    def clear(self):
+        """Drops every cached result, e.g. between benchmark runs."""
+        with self._lock:
+            self._cache.clear()
+
+    def search_many(self, queries, api_key=None):
+        """
+        Searches several phrasings of a question at once; returns results de-duplicated by URL.
+
+        A failing query is skipped as long as another one succeeds.
+        """
+        queries = list(dict.fromkeys(q for q in queries if normalize_query(q)))[:MAX_QUERIES_PER_CALL]
+        futures = [self._pool.submit(in_current_context(self.search), query, api_key) for query in queries]
+        results, seen, errors = [], set(), []
+        for future in futures:
+            try:
+                batch = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            for result in batch:
+                if result.url not in seen:
+                    seen.add(result.url)
+                    results.append(result)
+        if errors and not results:
+            raise errors[0]
+        return results
+
+
+def format_results(results):
+    if not results:
+        return "No results found."
+    return "\n\n".join(
+        f"Title: {r.title}\nURL: {r.url}\n" + (f"Published: {r.published}\n" if r.published else "") + f"Content: {r.text}"
+        for r in results
+    )
+
+
+_searches = {}
+_searches_lock = threading.Lock()
+
+
+def get_web_search(base_url=None, config=None):
+    """Process-wide WebSearch per Exa URL, so the cache is shared by every session and API key."""
+    key = base_url or os.environ.get("EXA_BASE_URL")
+    with _searches_lock:
+        if key not in _searches:
+            _searches[key] = WebSearch(base_url=base_url, config=config)
+        return _searches[key]
+
+
+class WebSearchInput(BaseModel):
+    queries: list[str] = Field(
+        description=f"One to {MAX_QUERIES_PER_CALL} differently worded search queries for the same question; they are searched in parallel."
+    )
+
+
+class CachedWebSearchTool(BaseTool):
+    """crewai tool for the Internet_Search agent, backed by a shared WebSearch and searching with this session's key."""
+
+    name: str = "web_search"
+    description: str = (
+        "Search the web. Pass every query you want to try in one call as a list; "
+        "they run in parallel and the results come back with their URLs and the relevant page text."
+    )
+    args_schema: type[BaseModel] = WebSearchInput
+    search: WebSearch = Field(exclude=True)
+    api_key: str = Field(default=None, exclude=True, repr=False)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _run(self, queries):
+        if isinstance(queries, str):
+            queries = [queries]
+        return format_results(self.search.search_many(queries, self.api_key))